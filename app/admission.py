@@ -0,0 +1,177 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict
+
+from fastapi import HTTPException, Request
+
+from app.ratelimit import RateLimiter
+
+# Priority classes for model-backed work (lower runs first)
+PRIORITY_ADMIN = 0
+PRIORITY_CONCERN = 1
+PRIORITY_FEEDBACK = 2
+PRIORITY_CHAT = 3
+
+PRIORITY_NAMES = {
+    PRIORITY_ADMIN: "admin",
+    PRIORITY_CONCERN: "concern",
+    PRIORITY_FEEDBACK: "feedback",
+    PRIORITY_CHAT: "chat"
+}
+
+
+class AdmissionController:
+    """Global concurrency limit, priority queueing and load shedding for the model
+
+    At most ``max_concurrent`` model calls run at once; the rest wait in a
+    priority queue. If the expected wait (queue depth x average service time
+    / concurrency) would exceed ``slo_ms`` the call is shed instead, and the
+    caller serves its cheap fallback answer.
+    """
+
+    def __init__(self, max_concurrent: int, slo_ms: float):
+        self.max_concurrent = max_concurrent
+        self.slo_ms = slo_ms
+        self.active = 0
+        self.waiters = []
+        self.sequence = itertools.count()
+        self.avg_service_ms = 0.0
+        self.counters = {name: {"admitted": 0, "queued": 0, "shed": 0} for name in PRIORITY_NAMES.values()}
+
+    def expected_wait_ms(self) -> float:
+        return (len(self.waiters) + 1) * self.avg_service_ms / self.max_concurrent
+
+    async def acquire(self, priority: int) -> bool:
+        """Wait for a model slot; returns False when the call should be shed"""
+        counters = self.counters[PRIORITY_NAMES[priority]]
+        if self.active < self.max_concurrent and not self.waiters:
+            self.active += 1
+            counters["admitted"] += 1
+            return True
+
+        if self.expected_wait_ms() > self.slo_ms:
+            counters["shed"] += 1
+            return False
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.sequence), future))
+        counters["queued"] += 1
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was handed over just before cancellation; pass it on
+                self.release()
+            raise
+        counters["admitted"] += 1
+        return True
+
+    def release(self):
+        """Hand the slot to the highest-priority waiter, or free it"""
+        while self.waiters:
+            _, _, future = heapq.heappop(self.waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def record_service_time(self, elapsed_ms: float):
+        # Exponentially weighted so the estimate follows load changes quickly
+        if self.avg_service_ms == 0.0:
+            self.avg_service_ms = elapsed_ms
+        else:
+            self.avg_service_ms = 0.8 * self.avg_service_ms + 0.2 * elapsed_ms
+
+    async def run(self, priority: int, call: Callable[[], Awaitable], fallback: Callable[[], object]):
+        """Run ``call`` under admission control, or return ``fallback()`` if shed"""
+        if not await self.acquire(priority):
+            return fallback()
+        start = time.perf_counter()
+        try:
+            return await call()
+        finally:
+            self.record_service_time((time.perf_counter() - start) * 1000)
+            self.release()
+
+    def stats(self) -> Dict:
+        return {
+            "active": self.active,
+            "queued": len(self.waiters),
+            "max_concurrent": self.max_concurrent,
+            "slo_ms": self.slo_ms,
+            "avg_service_ms": round(self.avg_service_ms, 1),
+            "by_priority": self.counters
+        }
+
+
+def client_key(request: Request) -> str:
+    """Rate limit key: the session if logged in, otherwise the client IP"""
+    session_id = request.cookies.get("session_id")
+    if session_id and request.app.state.sessions.get(session_id):
+        return f"session:{session_id}"
+    return f"ip:{request.client.host if request.client else 'unknown'}"
+
+
+async def request_priority(request: Request, default: int) -> int:
+    """Admins always get the top priority class"""
+    sessions = request.app.state.sessions
+    session = await sessions.run(sessions.get, request.cookies.get("session_id"))
+    if session and session.get("role") == "admin":
+        return PRIORITY_ADMIN
+    return default
+
+
+def limit_model_client(request: Request):
+    """Dependency applying the per-client token bucket to model-backed routes"""
+    limiter: RateLimiter = request.app.state.client_limiter
+    allowed, retry_after = limiter.acquire(client_key(request))
+    if not allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many requests. Please slow down.",
+            headers={"Retry-After": str(max(1, round(retry_after)))}
+        )
+
+
+async def run_model_call(
+    request: Request,
+    priority: int,
+    call: Callable[[], Awaitable],
+    fallback: Callable[[], object],
+    has_fallback: bool = True
+):
+    """Run a model-backed call for this request under admission control
+
+    When the model is not loaded the fallback is already what would be
+    served, so it is returned directly without taking a slot. While the
+    degradation controller reports overload, requests with a good fallback
+    match (``has_fallback``) skip the model entirely.
+    """
+    granite_model = request.app.state.granite_model
+    if granite_model.model is None:
+        return fallback()
+
+    admission: AdmissionController = request.app.state.admission
+    degradation = request.app.state.degradation
+    degraded = degradation.update(len(admission.waiters))
+    if degraded and has_fallback:
+        degradation.count("degraded_fallback")
+        return fallback()
+
+    shed = False
+
+    def shed_fallback():
+        nonlocal shed
+        shed = True
+        return fallback()
+
+    start = time.perf_counter()
+    result = await admission.run(await request_priority(request, priority), call, shed_fallback)
+    if shed:
+        degradation.count("shed")
+    else:
+        degradation.record_latency((time.perf_counter() - start) * 1000)
+        degradation.count("degraded_llm" if degraded else "llm")
+    return result
@@ -1,295 +1,264 @@
-import torch
-from transformers import AutoModelForCausalLM, AutoTokenizer
 import asyncio
-from typing import Dict, Any
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
 import re
-import json
-import os
 
-class GraniteModel:
-    """IBM Granite 3.3 2B Instruct model for citizen engagement"""
+from app import config
+from app.answers import AnswerStore
+from app.conversation import Conversation, ConversationStore, common_prefix_length
+from app.corpus import KnowledgeCorpus
+from app.language import QueryNormalizer
+from app.profiling import span
+
+# Phrases that make _is_response_adequate reject a response outright
+GENERIC_INDICATORS = [
+    "as an ai",
+    "as a language model",
+    "i'm a bot",
+    "i'm an assistant",
+    "i cannot provide",
+    "please consult"
+]
+
+SENTIMENT_LABELS = ("POSITIVE", "NEGATIVE", "NEUTRAL")
+
+# torch and transformers take seconds to import; they are only loaded by
+# GraniteModel.load_model, so the web tier and the fallback engine start
+# (and run) without them
+torch = None
+transformers = None
+
+
+def load_ml_libraries():
+    """Import torch and transformers into this module on first use"""
+    global torch, transformers
+    if torch is None:
+        import torch
+        import transformers
+
+MAX_PROMPT_TOKENS = 2048
+
+
+class PromptTemplate:
+    """Prompt with one placeholder whose fixed parts are tokenized once
+
+    The text around the placeholder is tokenized when the tokenizer loads;
+    per request only the user text is tokenized (through an LRU cache) and
+    the id lists are spliced together. A space before the placeholder is
+    moved into the user segment so the split falls on a word boundary, the
+    same place the tokenizer's pre-tokenizer would split the full prompt.
+    """
     
-    def __init__(self):
-        self.model = None
-        self.tokenizer = None
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model_name = "ibm-granite/granite-3.3-2b-instruct"
-        self.fallback_responses = self._load_fallback_responses()
-    async def load_model(self):
-        """Safely load the IBM Granite model and use fallback on failure."""
-        try:
-            print("Loading IBM Granite model...")
-            self.tokenizer = AutoTokenizer.from_pretrained(
-                self.model_name,
-                trust_remote_code=True
-            )
-
-            self.model = AutoModelForCausalLM.from_pretrained(
-                self.model_name,
-                torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
-                device_map="auto" if self.device == "cuda" else None,
-                trust_remote_code=True,
-                low_cpu_mem_usage=True
-            )
-
-            if self.device == "cpu":
-                self.model = self.model.to(self.device)
-
-            if self.tokenizer.pad_token is None:
-                self.tokenizer.pad_token = self.tokenizer.eos_token
-
-            print(f"✅ Model loaded successfully on {self.device}")
-
-        except Exception as e:
-            print(f"❌ Error loading model: {e}")
-            self.model = None
-            self.tokenizer = None
-
-        
-    def _load_fallback_responses(self) -> Dict[str, str]:
-        """Load fallback responses from JSON file or use built-in responses"""
-        try:
-            # Try to load from external JSON file
-            if os.path.exists("fallback_responses.json"):
-                with open("fallback_responses.json", "r", encoding="utf-8") as f:
-                    return json.load(f)
-        except Exception as e:
-            print(f"Could not load external fallback responses: {e}")
-        
-        # Return built-in fallback responses
-        return self._get_builtin_fallback_responses()
+    def __init__(self, text: str, placeholder: str):
+        self.prefix, self.suffix = text.split(placeholder)
+        self.lead = ""
+        if self.prefix.endswith(" "):
+            self.prefix = self.prefix[:-1]
+            self.lead = " "
+        self.prefix_ids = None
+        self.suffix_ids = None
     
-    def _get_builtin_fallback_responses(self) -> Dict[str, str]:
-        """Built-in comprehensive fallback responses for government services"""
-        return {
-            "aadhaar": """Aadhaar Card Application Process:
-
-SUMMARY: Aadhaar is a 12-digit unique identification number issued by UIDAI to Indian residents based on biometric and demographic data.
-
-STEP-BY-STEP PROCEDURE:
-1. Locate nearest Aadhaar Enrollment Center using UIDAI website
-2. Fill enrollment form with accurate details
-3. Submit required documents (POI, POA, DOB proof)
-4. Provide biometric data (10 fingerprints, iris scan, photograph)
-5. Verify details and submit application
-6. Collect enrollment slip with EID number
-7. Track status online after 60 days
-
-REQUIRED DOCUMENTS:
-- Proof of Identity:Passport, PAN card, Voter ID, Driving License, Birth Certificate
-- Proof of Address: Passport, Bank statement, Utility bills, Ration card, Property documents
-- Date of Birth: Birth certificate, 10th marksheet, Passport, PAN card
-
-PROCESSING TIME & FEES:
-- Processing: 60-90 days
-- Enrollment: FREE for first time
-- Updates: ₹50 (demographic), ₹100 (biometric)
-
-CONTACT INFORMATION:
-- Website: uidai.gov.in
-- Helpline: 1947
-- Email: help@uidai.gov.in""",
-
-            "pan_card": """PAN Card Application Process:
-
-SUMMARY: Permanent Account Number (PAN) is a 10-character alphanumeric identifier issued by Income Tax Department for tax-related transactions.
-
-STEP-BY-STEP PROCEDURE:
-1. Visit NSDL/UTIITSL website or authorized centers
-2. Fill Form 49A (Indian citizens) or 49AA (foreign citizens)
-3. Attach required documents and photographs
-4. Pay application fee
-5. Submit application online or offline
-6. Track application status using acknowledgment number
-7. Receive PAN card by post within 15-20 days
+    def render(self, value: str) -> str:
+        return self.prefix + self.lead + value + self.suffix
+    
+    def compile(self, tokenizer):
+        self.prefix_ids = tokenizer(self.prefix, add_special_tokens=True)["input_ids"]
+        self.suffix_ids = tokenizer(self.suffix, add_special_tokens=False)["input_ids"]
+    
+    @property
+    def compiled(self) -> bool:
+        return self.prefix_ids is not None
 
-REQUIRED DOCUMENTS:
-- Identity Proof: Aadhaar, Passport, Voter ID, Driving License
-- Address Proof: Aadhaar, Passport, Bank statement, Utility bills
-- Date of Birth: Birth certificate, 10th marksheet, Passport
-- Photographs: 2 recent passport-size photos
 
-PROCESSING TIME & FEES:
-- Processing: 15-20 days
-- Normal: ₹107 (online), ₹114 (offline)
-- Tatkal: ₹1,020 (online), ₹1,028 (offline)
+CITIZEN_PROMPT = PromptTemplate("""You are an expert government service assistant with comprehensive knowledge of Indian government procedures, schemes, and services. Provide detailed, accurate, and helpful information to citizens.
 
-CONTACT INFORMATION:
-- Website: incometaxindia.gov.in
-- NSDL: tin-nsdl.com
-- UTIITSL: utiitsl.com
-- Helpline: 020-27218080""",
+Question: {user_query}
 
-            "voter_id": """Voter ID Card Application Process:
+Please provide a comprehensive response that includes:
 
-SUMMARY: Voter ID (EPIC) is an identity document issued by Election Commission of India to eligible citizens for voting in elections.
+SUMMARY: Brief overview of the service/procedure
 
 STEP-BY-STEP PROCEDURE:
-1. Visit National Voters' Service Portal (nvsp.in)
-2. Fill online Form 6 for new registration
-3. Upload required documents and photograph
-4. Submit application online
-5. Print acknowledgment receipt
-6. Booth Level Officer (BLO) verification
-7. Receive Voter ID card within 30 days
+1. Detailed sequential steps
+2. Where to go/apply
+3. What to do at each stage
 
 REQUIRED DOCUMENTS:
-- Age Proof: Birth certificate, 10th marksheet, Passport, Driving License
-- Address Proof: Aadhaar, Passport, Bank statement, Utility bills, Ration card
-- Photograph: Recent passport-size photo
+- List all necessary documents
+- Mention acceptable alternatives
+- Specify original vs photocopy requirements
 
 PROCESSING TIME & FEES:
-- Processing: 30 days
-- Fees: FREE
-- Duplicate card: ₹25
+- Expected processing duration
+- Government fees (if applicable)
+- Additional charges to consider
 
 CONTACT INFORMATION:
-- Website: nvsp.in
-- Helpline: 1950
-- Email: complaints@eci.gov.in""",
-
-            "ayushman_bharat": """Ayushman Bharat Pradhan Mantri Jan Arogya Yojana (PM-JAY):
-
-SUMMARY: World's largest health insurance scheme providing ₹5 lakh annual coverage to over 10 crore poor and vulnerable families.
-
-STEP-BY-STEP PROCEDURE:
-1. Check eligibility using SECC 2011 database
-2. Visit nearest Common Service Center (CSC)
-3. Provide Aadhaar number and family details
-4. Biometric authentication
-5. Generate Ayushman card instantly
-6. Use card at empaneled hospitals for cashless treatment
-
-REQUIRED DOCUMENTS:
-- Aadhaar Card: Mandatory for all family members
-- Ration Card: For family verification
-- Mobile Number: For OTP verification
-
-PROCESSING TIME & FEES:
-- Card Generation: Instant at CSC
-- Fees: Completely FREE
-- Coverage: ₹5 lakh per family per year
+- Official website links
+- Helpline numbers
+- Email addresses
+- Physical office locations (if relevant)
 
-CONTACT INFORMATION:
-- Website: pmjay.gov.in
-- Helpline: 14555
-- Email: info@nha.gov.in""",
+IMPORTANT NOTES:
+- Eligibility criteria
+- Common mistakes to avoid
+- Deadlines or time limits
+- Additional tips for smooth processing
 
-            "grievance_redressal": """Public Grievance Redressal System:
+Provide specific, actionable information that citizens can immediately use. Be comprehensive but clear.
 
-SUMMARY: Centralized platform for citizens to lodge complaints against government departments and track resolution status.
+Response:""", "{user_query}")
 
-STEP-BY-STEP PROCEDURE:
-1. Visit CPGRAMS portal (pgportal.gov.in)
-2. Register with mobile number and email
-3. Login and click 'Lodge Grievance'
-4. Select ministry/department
-5. Provide detailed complaint with supporting documents
-6. Submit and note registration number
-7. Track status regularly using registration number
+# The same instructions as a system message for chat-template conversations
+CITIZEN_SYSTEM_PROMPT = (
+    CITIZEN_PROMPT.prefix.rsplit("\n\nQuestion:", 1)[0]
+    + CITIZEN_PROMPT.suffix.rsplit("\n\nResponse:", 1)[0]
+)
 
-REQUIRED DOCUMENTS:
-- Supporting Evidence: Photos, documents related to grievance
-- Identity Proof: Any government ID for verification
-- Contact Details: Valid mobile and email
+SENTIMENT_PROMPT = PromptTemplate("""You are an expert sentiment analyzer. Analyze the following text and determine if it expresses a Positive, Negative, or Neutral sentiment.
 
-PROCESSING TIME & FEES:
-- Processing: 30 days maximum
-- Fees: Completely FREE
-- Appeal: 30 days if not satisfied
+Rules:
+- Positive: satisfaction, praise, gratitude, happiness, approval, success
+- Negative: complaints, anger, frustration, disappointment, criticism, failure
+- Neutral: factual information, questions, balanced opinions
 
-CONTACT INFORMATION:
-- Website: pgportal.gov.in
-- Helpline: 1100
-- Email: grievances@gov.in""",
+Text: "{text}"
 
-            "health_schemes": """Major Government Health Schemes:
+Think step by step:
+1. What emotions does this text express?
+2. Are there positive or negative words?
+3. What is the overall tone?
 
-SUMMARY: Comprehensive healthcare coverage through various government schemes for different categories of citizens.
+Classification (respond with only one word):""", "{text}")
 
-MAJOR SCHEMES:
-1. Ayushman Bharat PM-JAY: ₹5 lakh coverage for poor families
-2. CGHS: Central Government Health Scheme for employees
-3. ESIC: Employees' State Insurance for organized sector workers
-4. PMSBY: Pradhan Mantri Suraksha Bima Yojana - ₹2 lakh accident insurance
-5. State Health Schemes: Various state-specific programs
 
-STEP-BY-STEP PROCEDURE:
-1. Identify applicable scheme based on eligibility
-2. Visit nearest enrollment center
-3. Submit required documents
-4. Complete registration process
-5. Receive health card/policy document
-6. Use benefits at empaneled hospitals
+class GenerationGuard:
+    """Stops generation early once the output is decided (a transformers stopping criterion)
 
-REQUIRED DOCUMENTS:
-- Aadhaar Card: Mandatory for most schemes
-- Income Certificate: For means-tested schemes
-- Bank Account: For premium payments
-- Employment Proof: For employment-based schemes
+    Every ``check_every`` tokens the partial output is decoded. Citizen answers
+    are aborted as soon as they contain a phrase that guarantees rejection;
+    sentiment classifications stop once a label has been produced.
+    """
+    
+    def __init__(self, model: "GraniteModel", prompt_length: int, sentiment: bool, check_every: int = 16):
+        self.model = model
+        self.prompt_length = prompt_length
+        self.sentiment = sentiment
+        self.check_every = 1 if sentiment else check_every
+        self.aborted = False
+        self.answered = False
+    
+    def __call__(self, input_ids, scores, **kwargs):
+        generated = input_ids.shape[1] - self.prompt_length
+        stop = False
+        if generated > 0 and generated % self.check_every == 0:
+            with self.model.tokenizer_lock:
+                text = self.model.tokenizer.decode(input_ids[0, self.prompt_length:], skip_special_tokens=True)
+            if self.sentiment:
+                self.answered = any(label in text.upper() for label in SENTIMENT_LABELS)
+                stop = self.answered
+            else:
+                partial = self.model._clean_response(text).lower()
+                self.aborted = any(indicator in partial for indicator in GENERIC_INDICATORS)
+                stop = self.aborted
+        return torch.full((input_ids.shape[0],), stop, dtype=torch.bool, device=input_ids.device)
+
+
+class FallbackRouter:
+    """Predicts when a fallback answer will win so the model can be skipped
+
+    Two signals are used: a strong keyword match (several distinct keywords
+    of one service in the query) and, per service, how often model answers
+    were recently discarded by the adequacy/confidence checks.
+    """
+    
+    def __init__(self, strong_match: int = 2, window: int = 20, min_samples: int = 5, discard_rate: float = 0.8):
+        self.strong_match = strong_match
+        self.window = window
+        self.min_samples = min_samples
+        self.discard_rate = discard_rate
+        self.outcomes = {}
+    
+    def record(self, service: Optional[str], discarded: bool):
+        if service is None:
+            return
+        self.outcomes.setdefault(service, deque(maxlen=self.window)).append(discarded)
+    
+    def should_skip_model(self, service: Optional[str], strength: int) -> bool:
+        if service is None:
+            return False
+        if strength >= self.strong_match:
+            return True
+        outcomes = self.outcomes.get(service)
+        if outcomes is None or len(outcomes) < self.min_samples:
+            return False
+        return sum(outcomes) / len(outcomes) >= self.discard_rate
 
-PROCESSING TIME & FEES:
-- Processing: 7-30 days
-- Fees: Varies by scheme (many are free)
-- Premium: ₹12-₹330 per year for insurance schemes
 
-CONTACT INFORMATION:
-- Ayushman Bharat: 14555
-- CGHS: cghs.gov.in
-- ESIC: esic.nic.in""",
-
-            "default": """Welcome to Citizen Services Assistant
-
-I can help you with information about various government services and procedures:
-
-POPULAR SERVICES:
-• Aadhaar Card (enrollment, updates, corrections)
-• PAN Card (new application, corrections, duplicate)
-• Voter ID (registration, address change, corrections)
-• Driving License (learner's, permanent, renewal)
-• Passport (new, renewal, tatkal services)
-• Ration Card (new application, additions, corrections)
-• Income Tax (ITR filing, TDS, refunds)
-• Pension Schemes (old age, widow, disability)
-• Birth/Death Certificates
-• Marriage Registration
-
-HEALTH & WELFARE:
-• Ayushman Bharat (PM-JAY health insurance)
-• Government Health Schemes
-• Disability Certificates
-• Scholarship Applications
-• Grievance Redressal System
-
-HOW TO GET HELP:
-1. Ask specific questions about any government service
-2. I'll provide step-by-step procedures
-3. Required documents and eligibility criteria
-4. Processing time, fees, and contact information
-5. Official websites and helpline numbers
-
-EXAMPLES:
-
-• "How to apply for PAN card?"
-• "Documents needed for Ayushman Bharat?"
-• "Voter ID address change process"
-• "File grievance against government department"
-
-For urgent matters, contact the relevant department directly."""
+class GraniteModel:
+    """IBM Granite 3.3 2B Instruct model for citizen engagement"""
+    
+    def __init__(self):
+        self.model = None
+        self.tokenizer = None
+        self.device = "cpu"
+        self.model_name = "ibm-granite/granite-3.3-2b-instruct"
+        # Knowledge-base answers and their keywords (one file per service, hot reloaded)
+        self.corpus = KnowledgeCorpus(config.KNOWLEDGE_DIR or None)
+        self.router = FallbackRouter()
+        # Hindi, Telugu and Hinglish queries are mapped to English keywords for the cheap paths
+        self.normalizer = QueryNormalizer(config.LEXICON_DIR or None, config.LANGUAGE_CACHE_SIZE)
+        # Validated answers for the most common intents, generated offline (python -m app.answers)
+        self.answers = AnswerStore(
+            config.ANSWER_STORE_PATH or None,
+            self.model_name,
+            CITIZEN_PROMPT.render,
+            lambda service: self.corpus.current.words.get(service, ()),
+            min_coverage=config.ANSWER_MIN_COVERAGE
+        )
+        self._encode_user_text_cached = lru_cache(maxsize=4096)(self._encode_user_text)
+        # generate() runs off the event loop, as many at once as the admission
+        # controller admits; the tokenizer is shared with those threads
+        self.executor = ThreadPoolExecutor(
+            max_workers=max(config.ADMISSION_MAX_CONCURRENT, 1),
+            thread_name_prefix="generate"
+        )
+        self.tokenizer_lock = threading.Lock()
+        self.conversations = ConversationStore(
+            max_sessions=config.CONVERSATION_MAX_SESSIONS,
+            ttl_seconds=config.CONVERSATION_TTL_SECONDS,
+            max_cache_bytes=config.CONVERSATION_KV_CACHE_MB * 2 ** 20
+        )
+        self.generation_stats = {
+            "generations": 0,
+            "tokens_generated": 0,
+            "skipped_by_router": 0,
+            "aborted_early": 0,
+            "stopped_on_answer": 0,
+            "discarded_after_generation": 0,
+            "tokens_saved": 0,
+            "prompt_tokens": 0,
+            "prompt_tokens_from_cache": 0
         }
-        
+    
     async def load_model(self):
         """Load the IBM Granite model and tokenizer"""
         try:
             print("Loading IBM Granite model...")
+            load_ml_libraries()
+            self.device = "cuda" if torch.cuda.is_available() else "cpu"
+            
             # Load tokenizer
-            self.tokenizer = AutoTokenizer.from_pretrained(
+            self.tokenizer = transformers.AutoTokenizer.from_pretrained(
                 self.model_name,
                 trust_remote_code=True
             )
             
             # Load model with optimizations
-            self.model = AutoModelForCausalLM.from_pretrained(
+            self.model = transformers.AutoModelForCausalLM.from_pretrained(
                 self.model_name,
                 torch_dtype=torch.float16 if self.device == "cuda" else torch.float32,
                 device_map="auto" if self.device == "cuda" else None,
@@ -303,6 +272,13 @@ For urgent matters, contact the relevant department directly."""
             # Set pad token if not available
             if self.tokenizer.pad_token is None:
                 self.tokenizer.pad_token = self.tokenizer.eos_token
+            
+            # Tokenize the fixed parts of the prompts once
+            CITIZEN_PROMPT.compile(self.tokenizer)
+            SENTIMENT_PROMPT.compile(self.tokenizer)
+            self.conversations.bytes_per_token = self._kv_bytes_per_token()
+            if config.TRANSLATION_MODEL:
+                self.normalizer.load_translator(config.TRANSLATION_MODEL)
                 
             print(f"Model loaded successfully on {self.device}")
             
@@ -312,66 +288,16 @@ For urgent matters, contact the relevant department directly."""
             self.model = None
             self.tokenizer = None
     
+    async def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+    
     def create_citizen_prompt(self, user_query: str) -> str:
         """Create an enhanced specialized prompt for citizen engagement"""
-        prompt = f"""You are an expert government service assistant with comprehensive knowledge of Indian government procedures, schemes, and services. Provide detailed, accurate, and helpful information to citizens.
-
-Question: {user_query}
-
-Please provide a comprehensive response that includes:
-
-SUMMARY: Brief overview of the service/procedure
-
-STEP-BY-STEP PROCEDURE:
-1. Detailed sequential steps
-2. Where to go/apply
-3. What to do at each stage
-
-REQUIRED DOCUMENTS:
-- List all necessary documents
-- Mention acceptable alternatives
-- Specify original vs photocopy requirements
-
-PROCESSING TIME & FEES:
-- Expected processing duration
-- Government fees (if applicable)
-- Additional charges to consider
-
-CONTACT INFORMATION:
-- Official website links
-- Helpline numbers
-- Email addresses
-- Physical office locations (if relevant)
-
-IMPORTANT NOTES:
-- Eligibility criteria
-- Common mistakes to avoid
-- Deadlines or time limits
-- Additional tips for smooth processing
-
-Provide specific, actionable information that citizens can immediately use. Be comprehensive but clear.
-
-Response:"""
-        return prompt
+        return CITIZEN_PROMPT.render(user_query)
     
     def create_sentiment_prompt(self, text: str) -> str:
         """Create a prompt for sentiment analysis with enhanced accuracy"""
-        prompt = f"""You are an expert sentiment analyzer. Analyze the following text and determine if it expresses a Positive, Negative, or Neutral sentiment.
-
-Rules:
-- Positive: satisfaction, praise, gratitude, happiness, approval, success
-- Negative: complaints, anger, frustration, disappointment, criticism, failure
-- Neutral: factual information, questions, balanced opinions
-
-Text: "{text}"
-
-Think step by step:
-1. What emotions does this text express?
-2. Are there positive or negative words?
-3. What is the overall tone?
-
-Classification (respond with only one word):"""
-        return prompt
+        return SENTIMENT_PROMPT.render(text)
     
     def _is_response_adequate(self, response: str, user_query: str) -> bool:
         """Check if model response is adequate or needs fallback"""
@@ -405,16 +331,7 @@ Classification (respond with only one word):"""
                 return False
                 
         # Check for generic/irrelevant responses
-        generic_indicators = [
-            "as an ai",
-            "as a language model",
-            "i'm a bot",
-            "i'm an assistant",
-            "i cannot provide",
-            "please consult"
-        ]
-        
-        for indicator in generic_indicators:
+        for indicator in GENERIC_INDICATORS:
             if indicator in response_lower:
                 return False
                 
@@ -436,7 +353,7 @@ Classification (respond with only one word):"""
             return 0.0
             
         response_clean = response.strip().lower()
-        query_lower = user_query.lower()
+        query_lower = self.normalizer.normalize(user_query).text.lower()
         
         confidence = 0.0
         
@@ -469,64 +386,195 @@ Classification (respond with only one word):"""
     
     async def generate_response(self, prompt: str, max_length: int = 512) -> str:
         """Generate response using the Granite model with fallback logic"""
+        response, _ = await self._generate(prompt, max_length)
+        return response
+    
+    def _is_sentiment_prompt(self, prompt: str) -> bool:
+        return "sentiment" in prompt.lower() or "classification:" in prompt.lower()
+    
+    async def _generate(
+        self,
+        prompt: Optional[str],
+        max_length: int,
+        template: Optional[PromptTemplate] = None,
+        user_text: Optional[str] = None,
+        conversation: Optional[Conversation] = None
+    ) -> Tuple[str, bool]:
+        """Generate a response; returns (text, True if the text came from the model)
+
+        Pass either a full ``prompt`` string or a ``template`` and ``user_text``;
+        the prompt string is then only rendered if a fallback needs it. With a
+        ``conversation`` the prompt is built with the tokenizer's chat template
+        from the previous turns, reusing their KV cache.
+        """
+        def fallback():
+            return self._get_fallback_response(prompt if prompt is not None else template.render(user_text))
+        
         if self.model is None or self.tokenizer is None:
             # Use fallback when model isn't loaded
-            return self._get_fallback_response(prompt)
+            return fallback(), False
+        
+        if template is not None:
+            sentiment = template is SENTIMENT_PROMPT
+        else:
+            sentiment = self._is_sentiment_prompt(prompt)
+        stats = self.generation_stats
         
         try:
             # Tokenize input with better settings for Granite
-            inputs = self.tokenizer(
-                prompt,
-                return_tensors="pt",
-                truncation=True,
-                max_length=2048,
-                padding=False
-            ).to(self.device)
+            with span("tokenize"), self.tokenizer_lock:
+                inputs = None
+                if conversation is not None and self.tokenizer.chat_template:
+                    inputs = self._encode_conversation(conversation, user_text)
+                if inputs is None and template is not None and template.compiled:
+                    inputs = self._encode_template(template, user_text)
+                if inputs is None:
+                    inputs = self.tokenizer(
+                        prompt if prompt is not None else template.render(user_text),
+                        return_tensors="pt",
+                        truncation=True,
+                        max_length=MAX_PROMPT_TOKENS,
+                        padding=False
+                    ).to(self.device)
+            
+            prompt_length = inputs["input_ids"].shape[1]
+            stats["prompt_tokens"] += prompt_length
+            guard = GenerationGuard(self, prompt_length, sentiment)
             
             # Generate response with optimized parameters for Granite
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    **inputs,
-                    max_new_tokens=max_length,
-                    temperature=0.2,
-                    do_sample=True,
-                    top_p=0.85,
-                    top_k=40,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id,
-                    repetition_penalty=1.2,
-                    no_repeat_ngram_size=3,
-                    early_stopping=True
-                )
+            # (in the executor, so the event loop keeps serving meanwhile)
+            def generate():
+                with torch.no_grad():
+                    return self.model.generate(
+                        **inputs,
+                        max_new_tokens=max_length,
+                        temperature=0.2,
+                        do_sample=True,
+                        top_p=0.85,
+                        top_k=40,
+                        pad_token_id=self.tokenizer.eos_token_id,
+                        eos_token_id=self.tokenizer.eos_token_id,
+                        repetition_penalty=1.2,
+                        no_repeat_ngram_size=3,
+                        early_stopping=True,
+                        stopping_criteria=transformers.StoppingCriteriaList([guard])
+                    )
             
-            # Decode response and clean it
-            response = self.tokenizer.decode(
-                outputs[0][inputs["input_ids"].shape[1]:],
-                skip_special_tokens=True
-            ).strip()
+            with span("generate"):
+                outputs = await asyncio.get_running_loop().run_in_executor(self.executor, generate)
             
-            # Clean up the response
-            response = self._clean_response(response)
+            if "past_key_values" in inputs:
+                # Keep the cache (prompt + answer) for the conversation's next turn
+                cache = inputs["past_key_values"]
+                self.conversations.store_cache(conversation, cache, outputs[0][:cache.get_seq_length()].tolist())
             
-            # Extract user query from prompt for validation
-            user_query = self._extract_query_from_prompt(prompt)
+            generated_tokens = outputs.shape[1] - prompt_length
+            stats["generations"] += 1
+            stats["tokens_generated"] += generated_tokens
+            
+            if guard.aborted:
+                stats["aborted_early"] += 1
+                stats["tokens_saved"] += max_length - generated_tokens
+                print(f"Model response off track after {generated_tokens} tokens, using fallback")
+                return fallback(), False
+            if guard.answered:
+                stats["stopped_on_answer"] += 1
+                stats["tokens_saved"] += max_length - generated_tokens
+            
+            # Decode response and clean it
+            with span("decode"):
+                response = self.tokenizer.decode(
+                    outputs[0][prompt_length:],
+                    skip_special_tokens=True
+                ).strip()
+                
+                # Clean up the response
+                response = self._clean_response(response)
             
-            # Check if response is adequate
-            if not self._is_response_adequate(response, user_query):
-                print("Model response inadequate, using fallback")
-                return self._get_fallback_response(prompt)
+            # Sentiment labels are validated by _extract_sentiment, not the answer checks below
+            if sentiment:
+                return response, True
             
-            # Check confidence score
-            confidence = self._calculate_response_confidence(response, user_query)
-            if confidence < 0.4:  # Confidence threshold
-                print(f"Low confidence ({confidence:.2f}), using fallback")
-                return self._get_fallback_response(prompt)
+            # Extract user query from prompt for validation
+            user_query = user_text if template is not None else self._extract_query_from_prompt(prompt)
+            if not self._validated(response, user_query):
+                return fallback(), False
             
-            return response
+            return response, True
             
         except Exception as e:
             print(f"Error generating response: {e}")
-            return self._get_fallback_response(prompt)
+            return fallback(), False
+    
+    def _validated(self, response: str, user_query: str) -> bool:
+        """Whether a generated citizen answer passes the adequacy and confidence checks"""
+        # Check if response is adequate
+        if not self._is_response_adequate(response, user_query):
+            print("Model response inadequate, using fallback")
+            self.generation_stats["discarded_after_generation"] += 1
+            return False
+        
+        # Check confidence score
+        confidence = self._calculate_response_confidence(response, user_query)
+        if confidence < 0.4:  # Confidence threshold
+            print(f"Low confidence ({confidence:.2f}), using fallback")
+            self.generation_stats["discarded_after_generation"] += 1
+            return False
+        
+        return True
+    
+    def _encode_user_text(self, text: str) -> Tuple[int, ...]:
+        """Tokenize user text without special tokens (wrapped in an LRU cache on load)"""
+        return tuple(self.tokenizer(text, add_special_tokens=False)["input_ids"])
+    
+    def _encode_template(self, template: PromptTemplate, user_text: str) -> Dict[str, Any]:
+        """Splice cached template ids around the tokenized user text"""
+        user_ids = self._encode_user_text_cached(template.lead + user_text)
+        budget = MAX_PROMPT_TOKENS - len(template.prefix_ids) - len(template.suffix_ids)
+        ids = template.prefix_ids + list(user_ids[:budget]) + template.suffix_ids
+        input_ids = torch.tensor([ids], dtype=torch.long, device=self.device)
+        return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+    
+    def _encode_conversation(self, conversation: Conversation, user_text: str) -> Optional[Dict[str, Any]]:
+        """Chat-template ids for the next turn plus a KV cache holding their longest cached prefix"""
+        def render():
+            text = self.tokenizer.apply_chat_template(
+                conversation.messages(CITIZEN_SYSTEM_PROMPT, user_text),
+                add_generation_prompt=True,
+                tokenize=False
+            )
+            return self.tokenizer(text, add_special_tokens=False)["input_ids"]
+        
+        ids = render()
+        # Fold half the window at a time so the prompt prefix, and with it the
+        # cache, stays unchanged for several turns instead of sliding every turn
+        while len(ids) > MAX_PROMPT_TOKENS and conversation.turns:
+            conversation.fold_oldest(max(1, len(conversation.turns) // 2))
+            ids = render()
+        if len(ids) > MAX_PROMPT_TOKENS:
+            # The question alone is over budget; the template path truncates it
+            return None
+        
+        cache, cached_ids = self.conversations.take_cache(conversation)
+        # generate() needs at least one uncached token to start from
+        reused = min(common_prefix_length(cached_ids, ids), len(ids) - 1)
+        if cache is None or reused == 0:
+            cache, reused = transformers.DynamicCache(), 0
+        elif reused < cache.get_seq_length():
+            cache.crop(reused)
+        self.generation_stats["prompt_tokens_from_cache"] += reused
+        
+        input_ids = torch.tensor([ids], dtype=torch.long, device=self.device)
+        return {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids), "past_key_values": cache}
+    
+    def _kv_bytes_per_token(self) -> int:
+        """Size of one token's keys and values over all layers"""
+        model_config = self.model.config
+        heads = model_config.num_attention_heads
+        head_dim = getattr(model_config, "head_dim", None) or model_config.hidden_size // heads
+        kv_heads = getattr(model_config, "num_key_value_heads", None) or heads
+        dtype_bytes = torch.finfo(self.model.dtype).bits // 8
+        return 2 * model_config.num_hidden_layers * kv_heads * head_dim * dtype_bytes
     
     def _extract_query_from_prompt(self, prompt: str) -> str:
         """Extract user query from the prompt"""
@@ -575,238 +623,42 @@ Classification (respond with only one word):"""
         user_query = self._extract_query_from_prompt(prompt)
         return self._fallback_response(user_query)
     
-    def _fallback_response(self, query: str) -> str:
+    def _match_fallback(self, query: str) -> Optional[str]:
+        """Return the service whose fallback answer matches the query, if any"""
+        return self.corpus.current.match(self.normalizer.normalize(query).text)
+    
+    def _fallback_response(self, query: str, service: Optional[str] = None) -> str:
         """Enhanced fallback responses when model is not available or inadequate"""
-        query_lower = query.lower()
-        
-        # Check for specific service keywords and return appropriate response
-        service_keywords = {
-            "aadhaar": ["aadhar", "aadhaar", "uid", "unique identification"],
-            "pan_card": ["pan", "permanent account", "income tax"],
-            "voter_id": ["voter", "election", "epic", "voting"],
-            "ayushman_bharat": ["ayushman", "pmjay", "health insurance", "medical"],
-            "grievance_redressal": ["grievance", "complaint", "redressal", "cpgrams"],
-            "health_schemes": ["health scheme", "medical scheme", "insurance"]
-        }
-        
-        # Find matching service
-        for service, keywords in service_keywords.items():
-            if any(keyword in query_lower for keyword in keywords):
-                return self.fallback_responses.get(service, self.fallback_responses["default"])
-        
-        # Check for other services
-        if any(word in query_lower for word in ["ration", "pds", "subsidy", "food security"]):
-            return """Ration Card Application Process:
-
-SUMMARY: Ration card provides access to subsidized food grains through Public Distribution System (PDS).
-
-STEP-BY-STEP PROCEDURE:
-1. Visit local Food & Civil Supplies office
-2. Collect application form or download online
-3. Fill form with family details
-4. Attach required documents
-5. Submit application with photographs
-6. Pay prescribed fee
-7. Collect acknowledgment receipt
-8. Verification by inspector
-9. Receive ration card within 30 days
-
-REQUIRED DOCUMENTS:
-- Address proof (Aadhaar, utility bills, rent agreement)
-- Identity proof (Aadhaar, voter ID, passport)
-- Income certificate
-- Family photograph
-- Bank account details
-
-PROCESSING TIME & FEES:
-- Processing: 15-30 days
-- Fees: ₹15-30 (varies by state)
-- APL/BPL classification based on income
-
-CONTACT INFORMATION:
-- Local Food & Civil Supplies Department
-- State government websites
-- Helpline: 1967 (varies by state)"""
-        
-        elif any(word in query_lower for word in ["pension", "retirement", "elderly", "senior", "old age"]):
-            return """Pension Schemes for Citizens:
-
-SUMMARY: Various pension schemes available for different categories of citizens including elderly, widows, and disabled persons.
-
-MAJOR SCHEMES:
-1. Old Age Pension:For senior citizens (60+)
-2. Widow Pension: For widows below poverty line
-3. Disability Pension: For disabled persons
-4. National Pension System (NPS): For all citizens
-
-STEP-BY-STEP PROCEDURE:
-1. Visit local tehsil/block office
-2. Fill application form
-3. Submit required documents
-4. Income and age verification
-5. Medical examination (if required)
-6. Approval by competent authority
-7. Receive pension in bank account
-
-REQUIRED DOCUMENTS:
-- Age proof (birth certificate, school certificate)
-- Income certificate
-- Aadhaar card
-- Bank account details
-- Photographs
-- Medical certificate (for disability pension)
-
-PROCESSING TIME & FEES:
-- Processing: 30-60 days
-- Fees: Usually FREE
-- Pension amount: ₹200-1000 per month (varies by state)
-
-CONTACT INFORMATION:
-- Local Tehsil/Block office
-- District Collector office
-- State social welfare department"""
-        
-        elif any(word in query_lower for word in ["license", "driving", "dl", "permit", "vehicle"]):
-            return """Driving License Application Process:
-
-SUMMARY: Driving License (DL) is mandatory for driving any motor vehicle on Indian roads, issued by Regional Transport Office (RTO).
-
-STEP-BY-STEP PROCEDURE:
-1. Apply online at parivahan.gov.in or visit RTO
-2. Fill Form 1 (application for learner's license)
-3. Submit documents and pay fees
-4. Pass written test to get learner's license
-5. Practice driving for minimum 30 days
-6. Apply for permanent license (Form 2)
-7. Pass practical driving test
-8. Receive permanent driving license
-
-REQUIRED DOCUMENTS:
-- Form 1 and Form 2
-- Age proof (birth certificate, 10th marksheet)
-- Address proof (Aadhaar, voter ID, passport)
-- Medical certificate (for commercial vehicles)
-- Passport-size photographs (4 copies)
-- Learner's license (for permanent DL)
-
-PROCESSING TIME & FEES:
-- Learner's License: ₹150, same day issuance
-- Permanent License: ₹200, 7-15 days
-- Smart Card: ₹200 additional
-- Validity: 20 years (till age 50), 10 years thereafter
-
-CONTACT INFORMATION:
-- Website: parivahan.gov.in
-- Local RTO office
-- Helpline: Varies by state"""
-        
-        elif any(word in query_lower for word in ["tax", "income", "itr", "filing", "return"]):
-            return """Income Tax Return (ITR) Filing:
-
-SUMMARY:Annual declaration of income and tax computation filed with Income Tax Department by eligible taxpayers.
-
-STEP-BY-STEP PROCEDURE:
-1. Gather all tax documents
-2. Choose correct ITR form (ITR-1 to ITR-7)
-3. Login to e-filing portal
-4. Fill ITR form online
-5. Verify tax computation
-6. Submit return electronically
-7. Verify using Aadhaar OTP/EVC/DSC
-8. Download acknowledgment
-
-REQUIRED DOCUMENTS:
-- PAN card
-- Aadhaar card
-- Form 16/16A (TDS certificates)
-- Bank statements
-- Investment proofs (80C, 80D, etc.)
-- Capital gains statements
-- Business income details (if applicable)
-
-PROCESSING TIME & FEES:
-- Filing: Free on income tax portal
-- Due dates: July 31 (individuals), September 30 (audited)
-- Refund processing: 30-45 days
-- Late filing penalty: ₹5,000-10,000
-
-CONTACT INFORMATION:
-- Website: incometaxindiaefiling.gov.in
-- Helpline: 1800-103-0025
-- Email: ito.admin@incometax.gov.in"""
-        
-        elif any(word in query_lower for word in ["passport", "travel", "document"]):
-            return """Passport Application Process:
-
-SUMMARY: Passport is an official travel document issued by Government of India for international travel.
-
-STEP-BY-STEP PROCEDURE:
-1. Register on passportindia.gov.in
-2. Fill online application form
-3. Pay fee online
-4. Book appointment at PSK/POPSK
-5. Visit center with original documents
-6. Document verification and biometric capture
-7. Police verification (if required)
-8. Passport printing and dispatch
-
-REQUIRED DOCUMENTS:
-- Online application form
-- Birth certificate
-- Address proof (Aadhaar, voter ID, utility bills)
-- Identity proof (Aadhaar, PAN, voter ID)
-- Photographs (2 recent passport-size)
-- Annexure H (if applicable)
-
-PROCESSING TIME & FEES:
-- Normal: 30-45 days
-  - 36 pages: ₹1,500
-  - 60 pages: ₹2,000
-- Tatkal: 3-7 days
-  - Additional ₹2,000 over normal fees
-
-CONTACT INFORMATION:
-- Website: passportindia.gov.in
-- Helpline: 1800-258-1800
-- Email: support@passportindia.gov.in"""
-        
-        elif any(word in query_lower for word in ["birth", "death", "certificate", "registration"]):
-            return """Birth/Death Certificate Process:
-
-SUMMARY: Legal documents proving birth/death, mandatory for various government services and legal purposes.
-
-STEP-BY-STEP PROCEDURE:
-1. Visit Registrar office or apply online
-2. Fill registration form
-3. Submit required documents
-4. Pay prescribed fee
-5. Collect receipt/acknowledgment
-6. Receive certificate after verification
-
-REQUIRED DOCUMENTS:
-For Birth Certificate:
-- Hospital discharge summary
-- Parents' identity and address proofs
-- Marriage certificate of parents
-
-For Death Certificate:
-- Medical certificate/Post-mortem report
-- Identity proof of deceased
-- Affidavit by relative
-
-PROCESSING TIME & FEES:
-- Registration: Within 21 days (birth), 24 hours (death)
-- Late registration: Additional fees apply
-- Certificate fees: ₹10-50
-- Processing: Same day to 7 days
-
-CONTACT INFORMATION:
-- Local Registrar office
-- Online: crsorgi.gov.in
-- Municipal corporation offices"""
-        
-        # Return default response if no specific service matches
-        return self.fallback_responses["default"]
+        corpus = self.corpus.current  # one corpus version for the whole lookup
+        if service is None:
+            service = corpus.match(self.normalizer.normalize(query).text)
+        return corpus.answer(service)
+    
+    def precomputed_answer(self, query: str, session_id: Optional[str] = None) -> Optional[str]:
+        """Stored answer when the question is one of the common intents, else None
+
+        Checked by the chat route before the question is queued for the model.
+        """
+        conversation = self.conversations.get(session_id) if session_id else None
+        service = self._match_fallback(query)
+        if service is None and conversation is not None:
+            service = conversation.service
+        normalized = self.normalizer.normalize(query)
+        answer = self.answers.answer(normalized.text, service)
+        if answer is None:
+            return None
+        self.normalizer.record(normalized.language, "chat", "precomputed")
+        if conversation is not None:
+            conversation.service = service
+            conversation.add_turn(query, answer)
+            self.conversations.save(session_id, conversation)
+        return answer
+    
+    def fallback_answer(self, query: str) -> str:
+        """Fallback answer for requests that skip the model (overload, shedding)"""
+        service = self._match_fallback(query)
+        self.normalizer.record(self.normalizer.normalize(query).language, "chat", "fallback" if service else "default")
+        return self._fallback_response(query, service)
     
     def _analyze_sentiment_fallback(self, prompt: str) -> str:
         """Enhanced sentiment analysis fallback with better accuracy"""
@@ -825,7 +677,7 @@ CONTACT INFORMATION:
     
     def _enhanced_keyword_sentiment(self, text: str) -> str:
         """Enhanced keyword-based sentiment analysis"""
-        text_lower = text.lower()
+        text_lower = self.normalizer.normalize(text).text.lower()
         
         # Strong positive indicators
         strong_positive = [
@@ -888,13 +740,30 @@ CONTACT INFORMATION:
     
     async def analyze_sentiment(self, text: str) -> str:
         """Analyze sentiment of given text with improved accuracy"""
-        prompt = self.create_sentiment_prompt(text)
-        response = await self.generate_response(prompt, max_length=30)
+        response, from_model = await self._generate(None, 30, template=SENTIMENT_PROMPT, user_text=text)
         
         # Extract and validate sentiment from response
         sentiment = self._extract_sentiment(response, text)
+        language = self.normalizer.normalize(text).language
+        if not from_model and sentiment == "Neutral" and language != "en":
+            # Nothing in the lexicon; try the translation model if one is loaded
+            translated = await self.normalizer.translate(text)
+            if translated:
+                sentiment = self._enhanced_keyword_sentiment(translated)
+        self.normalizer.record(language, "sentiment", "model" if from_model else self._keyword_outcome(sentiment))
         return sentiment
     
+    def keyword_sentiment(self, text: str) -> str:
+        """Keyword sentiment for requests that skip the model (overload, shedding)"""
+        sentiment = self._enhanced_keyword_sentiment(text)
+        self.normalizer.record(self.normalizer.normalize(text).language, "sentiment", self._keyword_outcome(sentiment))
+        return sentiment
+    
+    @staticmethod
+    def _keyword_outcome(sentiment: str) -> str:
+        # Neutral is also what the keyword analysis returns when nothing matched
+        return "keywords" if sentiment != "Neutral" else "neutral"
+    
     def _extract_sentiment(self, model_response: str, original_text: str) -> str:
         """Extract sentiment from model response with improved accuracy"""
         # Clean the response
@@ -911,24 +780,79 @@ CONTACT INFORMATION:
         # Use enhanced keyword-based analysis as fallback
         return self._enhanced_keyword_sentiment(original_text)
     
-    async def chat_response(self, user_query: str) -> str:
-        """Generate chat response for citizen queries with enhanced fallback logic"""
-        prompt = self.create_citizen_prompt(user_query)
-        response = await self.generate_response(prompt, max_length=400)
-        
-        # Additional validation for chat responses
-        if not self._is_response_adequate(response, user_query):
-            print("Chat response inadequate, using enhanced fallback")
-            response = self._fallback_response(user_query)
-        
+    def _match_strength(self, query: str, service: Optional[str]) -> int:
+        """Number of distinct keywords of ``service`` found in the query"""
+        if service is None:
+            return 0
+        return self.corpus.current.matches(self.normalizer.normalize(query).text).get(service, 0)
+    
+    async def chat_response(self, user_query: str, session_id: Optional[str] = None) -> str:
+        """Generate chat response for citizen queries with enhanced fallback logic
+
+        With a ``session_id`` the previous turns of that session are part of
+        the prompt, so follow-up questions can refer back to them.
+        """
+        conversation = self.conversations.get(session_id) if session_id else None
+        service = self._match_fallback(user_query)
+        language = self.normalizer.normalize(user_query).language
+        if service is None and language != "en":
+            # Not covered by the lexicon; try the translation model if one is loaded
+            translated = await self.normalizer.translate(user_query)
+            if translated:
+                service = self._match_fallback(translated)
+        if service is None and conversation is not None:
+            # Follow-ups ("what documents for that?") stay on the service being discussed
+            service = conversation.service
+        
+        # Skip generation entirely when the fallback answer is predicted to win
+        if self.model is not None and self.router.should_skip_model(service, self._match_strength(user_query, service)):
+            stats = self.generation_stats
+            stats["skipped_by_router"] += 1
+            # Estimate the saving from the average generation length so far
+            stats["tokens_saved"] += stats["tokens_generated"] // stats["generations"] if stats["generations"] else 400
+            response = self._fallback_response(user_query, service)
+            from_model = False
+        else:
+            response, from_model = await self._generate(
+                None, 400, template=CITIZEN_PROMPT, user_text=user_query, conversation=conversation
+            )
+            
+            if self.model is not None:
+                self.router.record(service, discarded=not from_model)
+            
+            # _generate already validated model output; fallbacks use the full query
+            if not from_model:
+                response = self._fallback_response(user_query, service)
+        
+        outcome = "model" if from_model else "fallback" if service else "default"
+        self.normalizer.record(language, "chat", outcome)
+        if conversation is not None:
+            conversation.service = service
+            conversation.add_turn(user_query, response)
+            self.conversations.save(session_id, conversation)
         return response
     
-    def save_fallback_responses_template(self):
-        """Save fallback responses to JSON file for easy editing"""
+    def get_generation_stats(self) -> Dict[str, int]:
+        """Counters for generation work done and avoided"""
+        stats = dict(self.generation_stats)
+        cache = self._encode_user_text_cached.cache_info()
+        stats["token_cache_hits"] = cache.hits
+        stats["token_cache_misses"] = cache.misses
+        conversations = self.conversations.stats()
+        stats["conversations"] = conversations["sessions"]
+        stats["kv_cached_tokens"] = conversations["cached_tokens"]
+        stats["kv_cache_evictions"] = conversations["cache_evictions"]
+        return stats
+    
+    def language_stats(self) -> Dict:
+        """How queries of each language were answered (model, precomputed, fallback, ...)"""
+        return self.normalizer.stats()
+    
+    async def save_fallback_responses_template(self, directory: str = "knowledge"):
+        """Save the fallback answers as answer files for easy editing (point CITIZEN_AI_KNOWLEDGE_DIR at them)"""
         try:
-            with open("fallback_responses.json", "w", encoding="utf-8") as f:
-                json.dump(self.fallback_responses, f, indent=2, ensure_ascii=False)
-            print("Fallback responses saved to fallback_responses.json")
+            await self.corpus.save(directory)
+            print(f"Fallback responses saved to {directory}")
         except Exception as e:
             print(f"Error saving fallback responses: {e}")
     
@@ -957,8 +881,9 @@ CONTACT INFORMATION:
     
     def get_quick_help(self, category: str = None) -> str:
         """Get quick help text for specific category or general help"""
-        if category and category.lower() in self.fallback_responses:
-            return self.fallback_responses[category.lower()]
+        answers = self.corpus.current.answers
+        if category and category.lower() in answers:
+            return answers[category.lower()]
         
         return """Quick Help - Popular Services:
 
@@ -0,0 +1,332 @@
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import re
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.language import HINGLISH_MARKERS, TENGLISH_MARKERS
+
+# Longest wait before retrying a regeneration job that exited with an error
+MAX_REGENERATION_BACKOFF = 6 * 3600.0
+
+# Precomputed intents: the knowledge-base services and their common sub-questions
+SERVICE_NAMES = {
+    "aadhaar": "an Aadhaar card",
+    "pan_card": "a PAN card",
+    "voter_id": "a Voter ID card",
+    "ayushman_bharat": "the Ayushman Bharat health scheme",
+    "grievance_redressal": "a public grievance complaint",
+    "health_schemes": "government health insurance schemes",
+    "ration_card": "a ration card",
+    "pension": "an old age pension",
+    "driving_license": "a driving license",
+    "income_tax": "filing an income tax return",
+    "passport": "a passport",
+    "birth_death_certificate": "a birth or death certificate",
+}
+
+# Sub-question -> (canonical question, words that ask for it); "apply" is the full answer
+SUB_QUESTIONS = {
+    "apply": ("How do I apply for {name}? Explain the complete procedure.", ()),
+    "documents": ("What documents are required for {name}?",
+                  ("document", "documents", "papers", "proof", "proofs", "required", "requirements", "needed")),
+    "fees": ("What are the fees for {name}?", ("fee", "fees", "cost", "costs", "charge", "charges", "price", "much")),
+    "time": ("How long does it take to get {name}?", ("long", "time", "days", "weeks", "duration", "processing", "when")),
+    "eligibility": ("Who is eligible for {name}?", ("eligible", "eligibility", "qualify", "criteria", "who")),
+    "contact": ("Where can I get help with {name}? Give the website, helpline and office details.",
+                ("contact", "helpline", "phone", "number", "email", "website", "office", "where")),
+    "status": ("How do I check the application status for {name}?", ("status", "track", "tracking", "check")),
+}
+
+# Words that do not change which answer fits ("how do i get my new card")
+GENERIC_WORDS = frozenset(
+    "a an the for to of in on at my me i we our is are am be do does did can could should will would "
+    "what how please tell about get getting make made apply applying application applications new card id "
+    "process procedure steps step online offline need want help and or with from this that it "
+    "ke ki ka ko se liye hai hain ho lo ni ku".split()
+) | HINGLISH_MARKERS | TENGLISH_MARKERS
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class AnswerStore:
+    """Validated model answers for the most common chat intents
+
+    An intent is a knowledge-base service plus a sub-question (procedure,
+    documents, fees, processing time, eligibility, contact, status). Answers
+    are generated offline by ``python -m app.answers``, which keeps only
+    answers that pass the same adequacy and confidence checks as live
+    generation (with a stricter confidence bar), and saved as JSON.
+
+    The chat route classifies each question before queueing it for the
+    model: the service comes from the keyword matcher (or the conversation),
+    the sub-question from its own keywords, and a question is only answered
+    from the store when nearly all of its words are explained by the intent,
+    so specific questions ("update address after marriage") still reach the
+    model.
+
+    Each entry records a fingerprint of the model name and the rendered
+    prompt. When either changes, entries become stale: they keep being
+    served until the regeneration job replaces them.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        model_name: str,
+        render_prompt: Callable[[str], str],
+        service_words: Callable[[str], Iterable[str]],
+        min_coverage: float = 0.8
+    ):
+        self.path = path
+        self.model_name = model_name
+        self.render_prompt = render_prompt
+        self.min_coverage = min_coverage
+        self.service_words = service_words  # words of a service's keywords
+        self.entries: Dict[str, Dict] = {}
+        self.mtime = None
+        self.job = None
+        self.counts = {"hits": 0, "no_intent": 0, "low_coverage": 0, "not_stored": 0}
+        self.hits_by_intent: Dict[str, int] = {}
+        self.regenerations = 0
+        self.failures = 0  # regeneration runs in a row that exited with an error
+        self.retry_at = 0.0
+        self.load()
+
+    # Intents
+
+    def intents(self) -> List[Tuple[str, str]]:
+        """(intent key, canonical question) for every precomputed intent"""
+        return [
+            (f"{service}/{sub}", question.format(name=name))
+            for service, name in SERVICE_NAMES.items()
+            for sub, (question, _) in SUB_QUESTIONS.items()
+        ]
+
+    def fingerprint(self, question: str) -> str:
+        """Changes with the model or the prompt an answer was generated with"""
+        text = f"{self.model_name}\n{self.render_prompt(question)}"
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+    def classify(self, text: str, service: Optional[str]) -> Optional[str]:
+        """Intent key for normalized question ``text`` about ``service``, or None"""
+        if service not in SERVICE_NAMES:
+            self.counts["no_intent"] += 1
+            return None
+        words = _WORD.findall(text.lower())
+        asked = set()
+        covered = 0
+        service_words = self.service_words(service)
+        for word in words:
+            if word in GENERIC_WORDS or word in service_words:
+                covered += 1
+                continue
+            for sub, (_, keywords) in SUB_QUESTIONS.items():
+                if word in keywords:
+                    asked.add(sub)
+                    covered += 1
+                    break
+        if words and covered < self.min_coverage * len(words):
+            self.counts["low_coverage"] += 1
+            return None
+        # Several sub-questions at once get the full answer
+        sub = asked.pop() if len(asked) == 1 else "apply"
+        return f"{service}/{sub}"
+
+    def answer(self, text: str, service: Optional[str]) -> Optional[str]:
+        """Precomputed answer for a normalized question, counting the outcome"""
+        intent = self.classify(text, service)
+        if intent is None:
+            return None
+        entry = self.entries.get(intent)
+        if entry is None or not entry.get("answer"):
+            self.counts["not_stored"] += 1
+            return None
+        self.counts["hits"] += 1
+        self.hits_by_intent[intent] = self.hits_by_intent.get(intent, 0) + 1
+        return entry["answer"]
+
+    # Storage
+
+    def load(self):
+        """Read the store from disk (a missing or unreadable file leaves it empty)"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            mtime = os.path.getmtime(self.path)
+            with open(self.path, "r", encoding="utf-8") as f:
+                self.entries = json.load(f)["entries"]
+            self.mtime = mtime
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Could not load precomputed answers from {self.path}: {e}")
+
+    def reload_if_changed(self):
+        if self.path and os.path.exists(self.path) and os.path.getmtime(self.path) != self.mtime:
+            self.load()
+            print(f"Loaded {self.stats()['answered']} precomputed answers")
+
+    def save(self):
+        """Write the store atomically (readers never see a partial file)"""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"model": self.model_name, "entries": self.entries}, f, indent=2, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.path)
+        self.mtime = os.path.getmtime(self.path)
+
+    def stale(self) -> List[Tuple[str, str]]:
+        """Intents without an entry for the current model and prompt
+
+        Rejected answers are kept as entries without text, so intents the
+        model cannot answer well are not retried until the fingerprint changes.
+        """
+        return [
+            (intent, question) for intent, question in self.intents()
+            if self.entries.get(intent, {}).get("fingerprint") != self.fingerprint(question)
+        ]
+
+    # Regeneration
+
+    async def maintain(
+        self,
+        interval: float,
+        regenerate: bool,
+        leader: Callable[[], bool] = lambda: True,
+        ready: Callable[[], bool] = lambda: True
+    ):
+        """Pick up a rewritten store and regenerate stale intents in a separate process
+
+        Generation blocks for seconds per answer, so it runs in a child
+        process (``python -m app.answers``) with its own model, never on the
+        serving event loop. With several web workers only the one for which
+        ``leader()`` is true starts it; the others pick up the new file. It
+        waits while ``ready()`` is false (the serving model is not loaded),
+        and after a failed run the next attempt backs off exponentially.
+        """
+        while True:
+            try:
+                self.reload_if_changed()
+                if (regenerate and leader() and ready() and self.path and time.time() >= self.retry_at
+                        and self.stale()):
+                    print(f"{len(self.stale())} precomputed answers are missing or stale, regenerating")
+                    self.job = await asyncio.create_subprocess_exec(sys.executable, "-m", "app.answers")
+                    code = await self.job.wait()
+                    self.job = None
+                    self.regenerations += 1
+                    if code != 0:
+                        self.failures += 1
+                        delay = min(interval * 2 ** self.failures, MAX_REGENERATION_BACKOFF)
+                        self.retry_at = time.time() + delay
+                        print(f"Answer regeneration exited with code {code}, retrying in {delay:.0f}s")
+                    else:
+                        self.failures = 0
+                    self.reload_if_changed()
+            except Exception as e:
+                print(f"Error maintaining precomputed answers: {e}")
+            await asyncio.sleep(interval)
+
+    def stats(self) -> Dict:
+        current = {intent: self.fingerprint(question) for intent, question in self.intents()}
+        answered = sum(1 for entry in self.entries.values() if entry.get("answer"))
+        top = sorted(self.hits_by_intent.items(), key=lambda item: item[1], reverse=True)[:10]
+        return dict(
+            self.counts,
+            intents=len(current),
+            answered=answered,
+            rejected=len(self.entries) - answered,
+            stale=sum(1 for intent, fingerprint in current.items()
+                      if self.entries.get(intent, {}).get("fingerprint") != fingerprint),
+            regenerating=self.job is not None,
+            regenerations=self.regenerations,
+            failed_regenerations=self.failures,
+            top_intents=dict(top)
+        )
+
+
+async def generate(model, store: AnswerStore, intents: List[Tuple[str, str]], attempts: int, min_confidence: float):
+    """Generate, validate and store answers for ``intents`` (saved after each one)
+
+    ``model._generate`` already rejects answers that fail
+    ``_is_response_adequate`` or the live confidence threshold; of the
+    remaining attempts the most confident one is kept if it reaches
+    ``min_confidence``.
+    """
+    from app.ai_model import CITIZEN_PROMPT
+
+    for number, (intent, question) in enumerate(intents, 1):
+        best, best_confidence = None, 0.0
+        for _ in range(attempts):
+            response, from_model = await model._generate(None, 400, template=CITIZEN_PROMPT, user_text=question)
+            if not from_model:
+                continue
+            confidence = model._calculate_response_confidence(response, question)
+            if confidence > best_confidence:
+                best, best_confidence = response, confidence
+        accepted = best is not None and best_confidence >= min_confidence
+        store.entries[intent] = {
+            "question": question,
+            "answer": best if accepted else None,
+            "confidence": round(best_confidence, 3),
+            "fingerprint": store.fingerprint(question),
+            "generated_at": datetime.now().isoformat()
+        }
+        store.save()
+        print(f"[{number}/{len(intents)}] {intent}: "
+              f"{'stored' if accepted else 'rejected'} (confidence {best_confidence:.2f})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate precomputed answers for the common chat intents")
+    parser.add_argument("--all", action="store_true", help="regenerate every intent, not only stale ones")
+    parser.add_argument("--intent", action="append", help="regenerate only these intents (e.g. pan_card/fees)")
+    args = parser.parse_args()
+
+    from app import config
+    from app.ai_model import GraniteModel
+
+    if not config.ANSWER_STORE_PATH:
+        sys.exit("CITIZEN_AI_ANSWER_STORE is empty; nothing to generate")
+    if hasattr(os, "nice"):
+        os.nice(10)  # stay behind the serving process
+
+    async def run():
+        if config.REMOTE_MODEL_URL:
+            from app.remote_model import RemoteGraniteModel
+            model = RemoteGraniteModel(
+                config.REMOTE_MODEL_URL,
+                model_name=config.REMOTE_MODEL_NAME or None,
+                api_key=config.REMOTE_MODEL_API_KEY,
+                timeout=config.REMOTE_TIMEOUT,
+                http2=config.REMOTE_HTTP2,
+                stream=config.REMOTE_STREAM
+            )
+        else:
+            model = GraniteModel()
+        await model.load_model()
+        if model.model is None:
+            sys.exit("Model could not be loaded; precomputed answers were not generated")
+        store = model.answers
+        if args.intent:
+            intents = [(intent, question) for intent, question in store.intents() if intent in args.intent]
+        else:
+            intents = store.intents() if args.all else store.stale()
+        started = time.perf_counter()
+        await generate(model, store, intents, config.ANSWER_ATTEMPTS, config.ANSWER_MIN_CONFIDENCE)
+        print(f"Generated {len(intents)} answers in {time.perf_counter() - started:.0f}s")
+        if hasattr(model, "shutdown"):
+            await model.shutdown()
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
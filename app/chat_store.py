@@ -0,0 +1,307 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional
+
+from app.records import iso_from_epoch_us, to_epoch_us
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional, gzip is always available
+    zstandard = None
+
+
+class ResponseTable:
+    """Reference-counted store of response texts shared between chat entries"""
+
+    def __init__(self):
+        self.texts = {}
+        self.refcounts = {}
+
+    def add(self, text: str) -> str:
+        ref = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+        if ref not in self.texts:
+            self.texts[ref] = text
+            self.refcounts[ref] = 0
+        self.refcounts[ref] += 1
+        return ref
+
+    def get(self, ref: str) -> str:
+        return self.texts[ref]
+
+    def release(self, ref: str):
+        self.refcounts[ref] -= 1
+        if self.refcounts[ref] <= 0:
+            del self.refcounts[ref]
+            del self.texts[ref]
+
+    def __len__(self):
+        return len(self.texts)
+
+
+class ChatHistoryStore:
+    """Bounded chat history: a hot in-memory ring plus compressed on-disk segments
+
+    Recent entries live in a fixed-size ring buffer; identical answers (most
+    fallback responses) are stored once and referenced by hash. Entries pushed
+    out of the ring are batched into NDJSON segments compressed with zstd (or
+    gzip) and segments older than the retention window are purged. ``flush``
+    also writes the ring, which is reloaded from the newest segments at
+    startup, so ids continue after the last stored entry.
+
+    Full batches are compressed and written by a background thread, so
+    ``append`` never does disk I/O; until a batch is on disk it is kept in
+    ``writing`` and still counts as unspilled.
+    """
+
+    def __init__(
+        self,
+        hot_size: int = 1000,
+        segment_size: int = 1000,
+        spill_dir: Optional[str] = "data/chat_history",
+        retention_days: float = 30
+    ):
+        self.hot = deque()
+        self.hot_size = hot_size
+        self.segment_size = segment_size
+        self.spill_dir = spill_dir
+        self.retention_seconds = retention_days * 86400
+        self.responses = ResponseTable()
+        self.pending = []
+        self.writing = []  # batches handed to the writer thread, oldest first
+        self.writer = ThreadPoolExecutor(1, thread_name_prefix="chat-spill")
+        self.lock = threading.Lock()
+        self.total = 0
+        self.spilled = 0
+        self.durable = 0  # highest id already written to a segment
+        self.purged_segments = 0
+        self.compression = "zst" if zstandard is not None else "gz"
+
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            self.total = self.durable = self._last_spilled_id()
+            self.purge()
+            self._load_hot()
+
+    def append(self, question: str, response: str, timestamp: Optional[str] = None) -> Dict:
+        """Store a chat exchange and return it in the public entry format"""
+        with self.lock:
+            self.total += 1
+            entry = (
+                self.total,
+                question,
+                self.responses.add(response),
+                to_epoch_us(timestamp or datetime.now())
+            )
+            self.hot.append(entry)
+            if len(self.hot) > self.hot_size:
+                self._evict(self.hot.popleft())
+            return self._to_dict(entry)
+
+    def unspilled(self) -> List[Dict]:
+        """Entries not yet written to an on-disk segment, oldest first"""
+        with self.lock:
+            in_flight = [entry for batch in self.writing for entry in batch]
+            return in_flight + self.pending + [self._to_dict(e) for e in self.hot if e[0] > self.durable]
+
+    def restore(self, entry: Dict):
+        """Re-add an entry under its original id (e.g. after a restart); already stored ids are skipped"""
+        with self.lock:
+            if entry["id"] <= self.total:
+                return
+            self.total = entry["id"] - 1
+        self.append(entry["user_question"], entry["ai_response"], entry["timestamp"])
+
+    def recent(self, count: int) -> List[Dict]:
+        """Most recent entries, oldest first (matches the old list slicing)"""
+        with self.lock:
+            start = max(len(self.hot) - count, 0)
+            return [self._to_dict(self.hot[i]) for i in range(start, len(self.hot))]
+
+    def entries_after(self, after_id: int) -> List[Dict]:
+        """Every retained entry with an id above ``after_id``, oldest first
+
+        Reads segments from disk when ``after_id`` is older than the entries in
+        memory, so call it from a thread (or at startup), not the event loop.
+        """
+        with self.lock:
+            in_memory = [e for batch in self.writing for e in batch if e["id"] > after_id]
+            in_memory += [e for e in self.pending if e["id"] > after_id]
+            in_memory += [self._to_dict(e) for e in self.hot if e[0] > after_id]
+            if self.writing:
+                first_in_memory = self.writing[0][0]["id"]
+            elif self.pending:
+                first_in_memory = self.pending[0]["id"]
+            else:
+                first_in_memory = self.hot[0][0] if self.hot else self.total + 1
+        if first_in_memory <= after_id + 1:
+            return in_memory
+        spilled = [e for e in self.iter_spilled() if after_id < e["id"] < first_in_memory]
+        return spilled + in_memory
+
+    def __len__(self):
+        return self.total
+
+    def _to_dict(self, entry) -> Dict:
+        entry_id, question, ref, timestamp = entry
+        return {
+            "id": entry_id,
+            "user_question": question,
+            "ai_response": self.responses.get(ref),
+            "timestamp": iso_from_epoch_us(timestamp)
+        }
+
+    def _evict(self, entry):
+        if self.spill_dir and entry[0] > self.durable:
+            self.pending.append(self._to_dict(entry))
+        self.responses.release(entry[2])
+        if len(self.pending) >= self.segment_size:
+            batch = self.pending
+            self.pending = []
+            self.writing.append(batch)
+            self.writer.submit(self._write_batch, batch)
+
+    def _write_batch(self, batch: List[Dict]):
+        # Runs in the writer thread; batches are written one at a time, in order
+        try:
+            self._write_segment(batch)
+        except OSError as e:
+            print(f"Could not write chat history segment: {e}")
+            with self.lock:
+                # Put the batch back so the next flush or snapshot still has it
+                self.writing.remove(batch)
+                self.pending[:0] = batch
+            return
+        with self.lock:
+            self.writing.remove(batch)
+            self.spilled += len(batch)
+            self.durable = max(self.durable, batch[-1]["id"])
+        self.purge()
+
+    # On-disk segments
+
+    def flush(self):
+        """Write pending entries and the hot ring to a segment (e.g. on shutdown)"""
+        if not self.spill_dir:
+            return
+        # Let batches already handed to the writer land first, so segments stay in id order
+        self.writer.submit(lambda: None).result()
+        with self.lock:
+            entries = self.pending + [self._to_dict(e) for e in self.hot if e[0] > self.durable]
+            if entries:
+                self._write_segment(entries)
+                self.pending = []
+                self.spilled += len(entries)
+                self.durable = max(self.durable, entries[-1]["id"])
+
+    def _write_segment(self, entries: List[Dict]):
+        # Each segment carries its own response table so it can be read standalone
+        table = {}
+        lines = []
+        for entry in entries:
+            text = entry["ai_response"]
+            ref = hashlib.blake2b(text.encode("utf-8"), digest_size=8).hexdigest()
+            table.setdefault(ref, text)
+            lines.append(json.dumps({
+                "id": entry["id"],
+                "user_question": entry["user_question"],
+                "response_ref": ref,
+                "timestamp": entry["timestamp"]
+            }, ensure_ascii=False))
+        payload = "\n".join([json.dumps({"responses": table}, ensure_ascii=False)] + lines).encode("utf-8")
+
+        name = f"chat-{entries[0]['id']:012d}-{entries[-1]['id']:012d}-{int(time.time())}.ndjson.{self.compression}"
+        path = os.path.join(self.spill_dir, name)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(self._compress(payload))
+        os.replace(tmp_path, path)
+
+    def _compress(self, payload: bytes) -> bytes:
+        if self.compression == "zst":
+            return zstandard.ZstdCompressor(level=10).compress(payload)
+        return gzip.compress(payload, compresslevel=6)
+
+    def _decompress(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            data = f.read()
+        if path.endswith(".zst"):
+            if zstandard is None:
+                raise RuntimeError(f"zstandard is required to read {path}")
+            return zstandard.ZstdDecompressor().decompress(data)
+        return gzip.decompress(data)
+
+    def _segments(self) -> List[str]:
+        if not self.spill_dir or not os.path.isdir(self.spill_dir):
+            return []
+        names = [n for n in os.listdir(self.spill_dir) if n.startswith("chat-") and not n.endswith(".tmp")]
+        return sorted(os.path.join(self.spill_dir, n) for n in names)
+
+    def _last_spilled_id(self) -> int:
+        segments = self._segments()
+        if not segments:
+            return 0
+        return int(os.path.basename(segments[-1]).split("-")[2])
+
+    def _load_hot(self):
+        """Refill the ring with the newest stored entries (they stay on disk)"""
+        entries = []
+        for path in reversed(self._segments()):
+            entries = list(self._read_segment(path)) + entries
+            if len(entries) >= self.hot_size:
+                break
+        for entry in entries[-self.hot_size:] if self.hot_size else []:
+            self.hot.append((
+                entry["id"],
+                entry["user_question"],
+                self.responses.add(entry["ai_response"]),
+                to_epoch_us(entry["timestamp"])
+            ))
+
+    def iter_spilled(self) -> Iterator[Dict]:
+        """Stream entries from on-disk segments, oldest first"""
+        for path in self._segments():
+            yield from self._read_segment(path)
+
+    def _read_segment(self, path: str) -> Iterator[Dict]:
+        lines = self._decompress(path).decode("utf-8").split("\n")
+        table = json.loads(lines[0])["responses"]
+        for line in lines[1:]:
+            record = json.loads(line)
+            yield {
+                "id": record["id"],
+                "user_question": record["user_question"],
+                "ai_response": table[record["response_ref"]],
+                "timestamp": record["timestamp"]
+            }
+
+    def purge(self) -> int:
+        """Delete segments written before the retention window"""
+        cutoff = time.time() - self.retention_seconds
+        removed = 0
+        for path in self._segments():
+            written_at = int(os.path.basename(path).split("-")[3].split(".")[0])
+            if written_at < cutoff:
+                os.remove(path)
+                removed += 1
+        self.purged_segments += removed
+        return removed
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                "total": self.total,
+                "hot_entries": len(self.hot),
+                "unique_responses": len(self.responses),
+                "pending_spill": len(self.pending) + sum(len(batch) for batch in self.writing),
+                "spilled": self.spilled,
+                "segments": len(self._segments()),
+                "purged_segments": self.purged_segments,
+                "compression": self.compression
+            }
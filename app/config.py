@@ -0,0 +1,153 @@
+import os
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    """Read a boolean flag from the environment"""
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment"""
+    try:
+        return int(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment"""
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _env_str(name: str, default: str) -> str:
+    """Read a string setting from the environment"""
+    return os.environ.get(name, default)
+
+
+# Slow request profiling (opt-in)
+PROFILING_ENABLED = _env_bool("CITIZEN_AI_PROFILING")
+PROFILING_SLOW_MS = _env_float("CITIZEN_AI_PROFILING_SLOW_MS", 2000.0)
+PROFILING_BUFFER_SIZE = _env_int("CITIZEN_AI_PROFILING_BUFFER", 50)
+PROFILING_INTERVAL_MS = _env_float("CITIZEN_AI_PROFILING_INTERVAL_MS", 10.0)
+
+# Chat history retention
+CHAT_HISTORY_HOT_SIZE = _env_int("CITIZEN_AI_CHAT_HOT_SIZE", 1000)
+CHAT_HISTORY_SEGMENT_SIZE = _env_int("CITIZEN_AI_CHAT_SEGMENT_SIZE", 1000)
+CHAT_HISTORY_DIR = _env_str("CITIZEN_AI_CHAT_DIR", "data/chat_history")
+CHAT_HISTORY_RETENTION_DAYS = _env_float("CITIZEN_AI_CHAT_RETENTION_DAYS", 30.0)
+
+# Columnar analytics export
+EXPORT_DIR = _env_str("CITIZEN_AI_EXPORT_DIR", "data/export")
+EXPORT_INTERVAL_SECONDS = _env_float("CITIZEN_AI_EXPORT_INTERVAL", 300.0)
+
+# Sessions (backend: memory, sqlite, redis or signed)
+SESSION_BACKEND = _env_str("CITIZEN_AI_SESSION_BACKEND", "memory")
+SESSION_TTL_SECONDS = _env_float("CITIZEN_AI_SESSION_TTL", 8 * 3600.0)
+SESSION_MAX_SIZE = _env_int("CITIZEN_AI_SESSION_MAX", 10000)
+SESSION_SWEEP_SECONDS = _env_float("CITIZEN_AI_SESSION_SWEEP_INTERVAL", 60.0)
+SESSION_SQLITE_PATH = _env_str("CITIZEN_AI_SESSION_DB", "data/sessions.db")
+SESSION_REDIS_URL = _env_str("CITIZEN_AI_REDIS_URL", "redis://localhost:6379/0")
+SESSION_SECRET = _env_str("CITIZEN_AI_SESSION_SECRET", "")
+
+# Authentication
+ADMIN_PASSWORD_HASH = _env_str("CITIZEN_AI_ADMIN_PASSWORD_HASH", "")
+AUTH_HASH_WORKERS = _env_int("CITIZEN_AI_AUTH_WORKERS", 4)
+AUTH_MAX_PENDING = _env_int("CITIZEN_AI_AUTH_MAX_PENDING", 64)
+AUTH_CACHE_TTL_SECONDS = _env_float("CITIZEN_AI_AUTH_CACHE_TTL", 60.0)
+LOGIN_BURST = _env_float("CITIZEN_AI_LOGIN_BURST", 5.0)
+LOGIN_PER_MINUTE = _env_float("CITIZEN_AI_LOGIN_PER_MINUTE", 5.0)
+
+# Admission control for model-backed routes
+ADMISSION_MAX_CONCURRENT = _env_int("CITIZEN_AI_MODEL_CONCURRENCY", 2)
+ADMISSION_SLO_MS = _env_float("CITIZEN_AI_MODEL_SLO_MS", 10000.0)
+CLIENT_BURST = _env_float("CITIZEN_AI_CLIENT_BURST", 10.0)
+CLIENT_PER_MINUTE = _env_float("CITIZEN_AI_CLIENT_PER_MINUTE", 30.0)
+
+# Graceful degradation to fallback answers under load
+DEGRADE_LATENCY_HIGH_MS = _env_float("CITIZEN_AI_DEGRADE_LATENCY_HIGH_MS", 8000.0)
+DEGRADE_LATENCY_LOW_MS = _env_float("CITIZEN_AI_DEGRADE_LATENCY_LOW_MS", 4000.0)
+DEGRADE_QUEUE_HIGH = _env_int("CITIZEN_AI_DEGRADE_QUEUE_HIGH", 8)
+DEGRADE_QUEUE_LOW = _env_int("CITIZEN_AI_DEGRADE_QUEUE_LOW", 2)
+DEGRADE_MIN_HOLD_SECONDS = _env_float("CITIZEN_AI_DEGRADE_MIN_HOLD", 30.0)
+
+# Multi-process model serving (0 keeps the model in the web process)
+MODEL_WORKERS = _env_int("CITIZEN_AI_MODEL_WORKERS", 0)
+MODEL_SOCKET_DIR = _env_str("CITIZEN_AI_MODEL_SOCKET_DIR", "/tmp")
+MODEL_ROUTING = _env_str("CITIZEN_AI_MODEL_ROUTING", "least_loaded")
+MODEL_REQUEST_TIMEOUT = _env_float("CITIZEN_AI_MODEL_TIMEOUT", 120.0)
+MODEL_HEALTH_INTERVAL = _env_float("CITIZEN_AI_MODEL_HEALTH_INTERVAL", 10.0)
+
+# Multi-turn chat context
+CONVERSATION_MAX_SESSIONS = _env_int("CITIZEN_AI_CONVERSATION_MAX_SESSIONS", 1000)
+CONVERSATION_TTL_SECONDS = _env_float("CITIZEN_AI_CONVERSATION_TTL", 1800.0)
+CONVERSATION_KV_CACHE_MB = _env_int("CITIZEN_AI_KV_CACHE_MB", 512)
+
+# Response compression
+COMPRESSION_MIN_SIZE = _env_int("CITIZEN_AI_COMPRESSION_MIN_SIZE", 1024)
+
+# Template rendering
+TEMPLATE_CACHE_DIR = _env_str("CITIZEN_AI_TEMPLATE_CACHE_DIR", "data/template_cache")
+TEMPLATE_AUTO_RELOAD = _env_bool("CITIZEN_AI_TEMPLATE_AUTO_RELOAD")
+
+# Set to 0 to run the web tier without torch/transformers (knowledge-base answers only)
+MODEL_ENABLED = _env_bool("CITIZEN_AI_MODEL_ENABLED", True)
+
+# Near-duplicate concern detection (MinHash/LSH)
+CONCERN_DEDUP_PERMUTATIONS = _env_int("CITIZEN_AI_DEDUP_PERMUTATIONS", 48)
+CONCERN_DEDUP_BANDS = _env_int("CITIZEN_AI_DEDUP_BANDS", 16)
+CONCERN_DEDUP_THRESHOLD = _env_float("CITIZEN_AI_DEDUP_THRESHOLD", 0.6)
+
+# Full-text search index (empty path keeps it in memory only)
+SEARCH_INDEX_PATH = _env_str("CITIZEN_AI_SEARCH_INDEX", "data/search.idx")
+SEARCH_SAVE_INTERVAL_SECONDS = _env_float("CITIZEN_AI_SEARCH_SAVE_INTERVAL", 300.0)
+
+# Concern triage (suggested category and urgency, classified in micro-batches)
+TRIAGE_BATCH_SIZE = _env_int("CITIZEN_AI_TRIAGE_BATCH_SIZE", 64)
+TRIAGE_MAX_DELAY_MS = _env_float("CITIZEN_AI_TRIAGE_MAX_DELAY_MS", 200.0)
+
+# Write-ahead log and snapshots of feedback, concerns, chats and sessions (empty directory disables)
+PERSISTENCE_DIR = _env_str("CITIZEN_AI_PERSISTENCE_DIR", "")
+WAL_COMMIT_DELAY_MS = _env_float("CITIZEN_AI_WAL_COMMIT_DELAY_MS", 2.0)
+SNAPSHOT_INTERVAL_SECONDS = _env_float("CITIZEN_AI_SNAPSHOT_INTERVAL", 300.0)
+
+# Hindi, Telugu and Hinglish queries (extra lexicon files and an optional local translation model)
+LANGUAGE_CACHE_SIZE = _env_int("CITIZEN_AI_LANGUAGE_CACHE_SIZE", 4096)
+LEXICON_DIR = _env_str("CITIZEN_AI_LEXICON_DIR", "")
+TRANSLATION_MODEL = _env_str("CITIZEN_AI_TRANSLATION_MODEL", "")
+
+# Precomputed answers for common intents (empty path disables; generate with python -m app.answers)
+ANSWER_STORE_PATH = _env_str("CITIZEN_AI_ANSWER_STORE", "data/answers.json")
+ANSWER_MIN_COVERAGE = _env_float("CITIZEN_AI_ANSWER_MIN_COVERAGE", 0.8)
+ANSWER_MIN_CONFIDENCE = _env_float("CITIZEN_AI_ANSWER_MIN_CONFIDENCE", 0.6)
+ANSWER_ATTEMPTS = _env_int("CITIZEN_AI_ANSWER_ATTEMPTS", 3)
+ANSWER_REFRESH_SECONDS = _env_float("CITIZEN_AI_ANSWER_REFRESH_INTERVAL", 600.0)
+ANSWER_AUTO_REGENERATE = _env_bool("CITIZEN_AI_ANSWER_AUTO_REGENERATE", False)
+
+# Knowledge-base answer files (empty uses app/knowledge); changed files are picked up while running
+KNOWLEDGE_DIR = _env_str("CITIZEN_AI_KNOWLEDGE_DIR", "")
+KNOWLEDGE_RELOAD_SECONDS = _env_float("CITIZEN_AI_KNOWLEDGE_RELOAD_INTERVAL", 5.0)
+
+# Remote model server (OpenAI-compatible, e.g. vLLM or TGI); a URL replaces the in-process model
+REMOTE_MODEL_URL = _env_str("CITIZEN_AI_REMOTE_MODEL_URL", "")
+REMOTE_MODEL_NAME = _env_str("CITIZEN_AI_REMOTE_MODEL_NAME", "")
+REMOTE_MODEL_API_KEY = _env_str("CITIZEN_AI_REMOTE_MODEL_API_KEY", "")
+REMOTE_MAX_CONNECTIONS = _env_int("CITIZEN_AI_REMOTE_MAX_CONNECTIONS", 32)
+REMOTE_TIMEOUT = _env_float("CITIZEN_AI_REMOTE_TIMEOUT", 60.0)
+REMOTE_CONNECT_TIMEOUT = _env_float("CITIZEN_AI_REMOTE_CONNECT_TIMEOUT", 5.0)
+REMOTE_RETRIES = _env_int("CITIZEN_AI_REMOTE_RETRIES", 2)
+REMOTE_BREAKER_FAILURES = _env_int("CITIZEN_AI_REMOTE_BREAKER_FAILURES", 5)
+REMOTE_BREAKER_RESET_SECONDS = _env_float("CITIZEN_AI_REMOTE_BREAKER_RESET", 30.0)
+REMOTE_HTTP2 = _env_bool("CITIZEN_AI_REMOTE_HTTP2", True)
+REMOTE_STREAM = _env_bool("CITIZEN_AI_REMOTE_STREAM", True)
+
+# Shared state for several web workers (uvicorn --workers N): one SQLite database on the host
+# holds the record log, conversations, leader lease and worker metrics (empty path disables)
+SHARED_STATE_PATH = _env_str("CITIZEN_AI_SHARED_STATE_DB", "")
+SHARED_HEARTBEAT_SECONDS = _env_float("CITIZEN_AI_SHARED_HEARTBEAT_INTERVAL", 5.0)
+SHARED_LEASE_SECONDS = _env_float("CITIZEN_AI_SHARED_LEASE", 15.0)
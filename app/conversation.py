@@ -0,0 +1,151 @@
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+
+class Conversation:
+    """Turns of one chat session and the model's KV cache for them
+
+    Older turns that no longer fit the token budget are folded into a short
+    summary of what the citizen asked, which stays in the system message.
+    ``cache_ids`` are the token ids the cache holds keys/values for, so the
+    next turn only has to prefill what comes after their common prefix.
+    """
+
+    def __init__(self, max_summary_questions: int = 8):
+        self.turns = []  # (question, answer)
+        self.summarized = []  # questions folded out of the window
+        self.max_summary_questions = max_summary_questions
+        self.service = None  # last fallback service the conversation was about
+        self.cache = None
+        self.cache_ids = []
+        self.last_used = time.monotonic()
+        self.version = 0  # turns saved to shared state
+
+    @property
+    def summary(self) -> str:
+        if not self.summarized:
+            return ""
+        asked = "; ".join(f'"{question}"' for question in self.summarized)
+        return f"Earlier in this conversation the citizen asked: {asked}."
+
+    def add_turn(self, question: str, answer: str):
+        self.turns.append((question, answer))
+
+    def fold_oldest(self, count: int):
+        """Move the oldest ``count`` turns into the summary"""
+        for question, _ in self.turns[:count]:
+            self.summarized.append(question if len(question) <= 120 else question[:117] + "...")
+        del self.turns[:count]
+        del self.summarized[:-self.max_summary_questions]
+
+    def messages(self, system: str, question: str) -> List[Dict[str, str]]:
+        """Chat messages for the next turn, in the tokenizer's chat template format"""
+        summary = self.summary
+        messages = [{"role": "system", "content": f"{system}\n\n{summary}" if summary else system}]
+        for previous, answer in self.turns:
+            messages.append({"role": "user", "content": previous})
+            messages.append({"role": "assistant", "content": answer})
+        messages.append({"role": "user", "content": question})
+        return messages
+
+
+class ConversationStore:
+    """Per-session conversations with LRU eviction of idle KV caches
+
+    Conversations expire after ``ttl_seconds`` of inactivity and at most
+    ``max_sessions`` are kept. KV caches are much larger than the turns, so
+    they have their own cap: once cached tokens x ``bytes_per_token`` exceeds
+    ``max_cache_bytes``, the caches of the least recently used sessions are
+    dropped (their next turn prefills the whole conversation again).
+
+    With ``shared`` set (shared-state deployments), turns are saved for the
+    other web workers and a conversation continued elsewhere is picked up
+    from there, so follow-ups work whichever worker takes them.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 1800.0, max_cache_bytes: int = 512 * 2 ** 20):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.max_cache_bytes = max_cache_bytes
+        self.bytes_per_token = 0  # set once the model config is known
+        self.conversations = OrderedDict()
+        self.cached_tokens = 0
+        self.cache_evictions = 0
+        self.shared = None
+
+    def __len__(self) -> int:
+        return len(self.conversations)
+
+    def get(self, session_id: str) -> Conversation:
+        """Conversation for a session, created on first use"""
+        now = time.monotonic()
+        conversation = self.conversations.get(session_id)
+        if conversation is not None and now - conversation.last_used > self.ttl_seconds:
+            self.drop(session_id)
+            conversation = None
+        if conversation is None:
+            conversation = Conversation()
+            self.conversations[session_id] = conversation
+            while len(self.conversations) > self.max_sessions:
+                _, oldest = self.conversations.popitem(last=False)
+                self._release(oldest)
+        self.conversations.move_to_end(session_id)
+        conversation.last_used = now
+        if self.shared is not None and self.shared.load_conversation(session_id, conversation):
+            # Another worker answered since; the cache no longer matches the turns
+            self._release(conversation)
+        return conversation
+
+    def save(self, session_id: str, conversation: Conversation):
+        """Make a conversation's new turn visible to the other workers (shared state only)"""
+        if self.shared is not None:
+            self.shared.save_conversation(session_id, conversation)
+
+    def drop(self, session_id: str):
+        conversation = self.conversations.pop(session_id, None)
+        if conversation is not None:
+            self._release(conversation)
+
+    def take_cache(self, conversation: Conversation) -> Tuple[object, List[int]]:
+        """Remove and return a conversation's cache so no other call can use it meanwhile"""
+        cache, ids = conversation.cache, conversation.cache_ids
+        self._release(conversation)
+        return cache, ids
+
+    def store_cache(self, conversation: Conversation, cache, ids: List[int]):
+        """Keep a conversation's cache, evicting idle caches over the memory cap"""
+        self._release(conversation)
+        if self.bytes_per_token and len(ids) * self.bytes_per_token > self.max_cache_bytes:
+            return
+        conversation.cache = cache
+        conversation.cache_ids = ids
+        self.cached_tokens += len(ids)
+        for other in list(self.conversations.values()):
+            if self.cached_tokens * self.bytes_per_token <= self.max_cache_bytes:
+                break
+            if other is not conversation and other.cache is not None:
+                self._release(other)
+                self.cache_evictions += 1
+
+    def _release(self, conversation: Conversation):
+        self.cached_tokens -= len(conversation.cache_ids)
+        conversation.cache = None
+        conversation.cache_ids = []
+
+    def stats(self) -> Dict:
+        return {
+            "sessions": len(self.conversations),
+            "cached_sessions": sum(1 for c in self.conversations.values() if c.cache is not None),
+            "cached_tokens": self.cached_tokens,
+            "cache_mb": round(self.cached_tokens * self.bytes_per_token / 2 ** 20, 1),
+            "cache_evictions": self.cache_evictions
+        }
+
+
+def common_prefix_length(a: List[int], b: List[int]) -> int:
+    length = min(len(a), len(b))
+    for i in range(length):
+        if a[i] != b[i]:
+            return i
+    return length
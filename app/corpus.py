@@ -0,0 +1,230 @@
+import asyncio
+import hashlib
+import os
+import re
+import sys
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+DEFAULT_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), "knowledge")
+
+# Precedence of answer files without an Order header
+DEFAULT_ORDER = 1000
+
+_WORD = re.compile(r"[a-z0-9]+")
+_HEADER = re.compile(r"^([A-Za-z-]+):\s*(.*)$")
+
+
+class CorpusError(ValueError):
+    """A knowledge corpus directory could not be loaded"""
+
+
+def _variants(word: str) -> FrozenSet[str]:
+    """Query words that count as ``word`` ("documents" matches the keyword "document")"""
+    return frozenset((word, word + "s", word + "es"))
+
+
+def _continues(tokens: List[str], start: int, rest: Tuple[FrozenSet[str], ...]) -> bool:
+    """Whether the rest of a multi-word keyword follows at ``tokens[start]``"""
+    if start + len(rest) > len(tokens):
+        return False
+    return all(tokens[start + offset] in forms for offset, forms in enumerate(rest))
+
+
+def parse_answer_file(text: str) -> Tuple[Dict[str, str], str]:
+    """Split an answer file into its header fields and the answer
+
+    The header runs up to the first blank line::
+
+        Keywords: passport, travel, document
+        Order: 11
+
+        Passport Application Process:
+        ...
+    """
+    header_text, separator, body = text.partition("\n\n")
+    if not separator:
+        raise CorpusError("missing blank line between header and answer")
+    header = {}
+    for line in header_text.splitlines():
+        match = _HEADER.match(line)
+        if match is None:
+            raise CorpusError(f"invalid header line {line!r}")
+        header[match.group(1).lower()] = match.group(2).strip()
+    return header, body.strip()
+
+
+class CorpusSnapshot:
+    """One immutable version of the knowledge corpus
+
+    Answers are interned (identical texts share one string) and keywords are
+    indexed by their first word, so matching a query costs one dict lookup
+    per query word instead of a substring scan per keyword.
+    """
+
+    def __init__(self, entries: List[Tuple[str, int, List[str], str]], version: int, digest: str):
+        self.version = version
+        self.digest = digest
+        self.loaded_at = time.time()
+        bodies = {}
+        self.answers: Dict[str, str] = {}
+        self.keywords: Dict[str, Tuple[str, ...]] = {}
+        self.order: Dict[str, int] = {}
+        # Query word -> (service, keyword, accepted forms of the keyword's other words)
+        self.index: Dict[str, List[Tuple[str, str, Tuple[FrozenSet[str], ...]]]] = {}
+        for service, order, keywords, answer in entries:
+            service = sys.intern(service)
+            self.answers[service] = bodies.setdefault(answer, answer)
+            self.keywords[service] = tuple(keywords)
+            self.order[service] = order
+            for keyword in keywords:
+                words = _WORD.findall(keyword.lower())
+                if not words:
+                    continue
+                rest = tuple(_variants(word) for word in words[1:])
+                for form in _variants(words[0]):
+                    self.index.setdefault(sys.intern(form), []).append((service, keyword, rest))
+        self.words: Dict[str, FrozenSet[str]] = {
+            service: frozenset(word for keyword in keywords for word in _WORD.findall(keyword.lower()))
+            for service, keywords in self.keywords.items()
+        }
+
+    def __len__(self) -> int:
+        return len(self.answers)
+
+    def matches(self, text: str) -> Dict[str, int]:
+        """Services whose keywords occur in ``text``, with the number of distinct keywords found"""
+        tokens = _WORD.findall(text.lower())
+        index = self.index
+        found = {}
+        for position, token in enumerate(tokens):
+            entries = index.get(token)
+            if entries is None:
+                continue
+            for service, keyword, rest in entries:
+                if rest and not _continues(tokens, position + 1, rest):
+                    continue
+                found.setdefault(service, set()).add(keyword)
+        return {service: len(keywords) for service, keywords in found.items()}
+
+    def match(self, text: str) -> Optional[str]:
+        """The matching service that comes first in the corpus order, if any"""
+        found = self.matches(text)
+        if not found:
+            return None
+        return min(found, key=self.order.__getitem__)
+
+    def answer(self, service: Optional[str]) -> str:
+        return self.answers.get(service) or self.answers["default"]
+
+
+class KnowledgeCorpus:
+    """Fallback answers loaded from a directory of answer files, hot reloaded
+
+    Each ``<service>.txt`` file holds a header (``Keywords:`` comma-separated
+    phrases, ``Order:`` match precedence, lowest first) and the answer text;
+    ``default.txt`` answers queries no service matches. ``watch`` polls the
+    directory for changes and loads a new snapshot in a thread; the snapshot
+    replaces ``current`` in one assignment once it has loaded completely, so
+    a request always sees one whole version. A directory that fails to load
+    leaves the previous version in place. ``version`` increases with every
+    reload and ``digest`` identifies the content, for caches keyed on answers.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = directory or DEFAULT_DIRECTORY
+        self.signature = self._signature()
+        self.current = self._load(version=1)
+        self.reloads = 0
+        self.errors = 0
+        self.last_error = None
+
+    def _signature(self) -> Tuple:
+        """Names, sizes and modification times of the answer files"""
+        try:
+            return tuple(sorted(
+                (entry.name, entry.stat().st_size, entry.stat().st_mtime_ns)
+                for entry in os.scandir(self.directory)
+                if entry.name.endswith(".txt") and entry.is_file()
+            ))
+        except OSError as e:
+            raise CorpusError(f"cannot read {self.directory}: {e}") from e
+
+    def _load(self, version: int) -> CorpusSnapshot:
+        entries = []
+        digest = hashlib.sha256()
+        for name, _, _ in self.signature:
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    text = f.read()
+                header, answer = parse_answer_file(text)
+                order = int(header.get("order", DEFAULT_ORDER))
+            except (OSError, ValueError) as e:
+                raise CorpusError(f"{path}: {e}") from e
+            if not answer:
+                raise CorpusError(f"{path}: empty answer")
+            keywords = [keyword.strip() for keyword in header.get("keywords", "").split(",") if keyword.strip()]
+            entries.append((name[:-len(".txt")], order, keywords, answer))
+            digest.update(f"{name}\0{text}\0".encode("utf-8"))
+        if not any(service == "default" for service, _, _, _ in entries):
+            raise CorpusError(f"{self.directory} has no default.txt")
+        return CorpusSnapshot(entries, version, digest.hexdigest()[:16])
+
+    def reload(self) -> bool:
+        """Load the directory again if any file changed; True if a new version was installed"""
+        signature = self._signature()
+        if signature == self.signature:
+            return False
+        previous, self.signature = self.signature, signature
+        try:
+            snapshot = self._load(self.current.version + 1)
+        except CorpusError:
+            self.signature = previous  # retried on the next poll
+            raise
+        self.current = snapshot
+        self.reloads += 1
+        return True
+
+    async def watch(self, interval: float):
+        """Poll the directory and swap in changed answers"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await asyncio.to_thread(self.reload):
+                    print(f"Knowledge corpus reloaded: version {self.current.version}, {len(self.current)} answers")
+            except CorpusError as e:
+                self.errors += 1
+                if str(e) != self.last_error:
+                    print(f"Keeping knowledge corpus version {self.current.version}: {e}")
+                self.last_error = str(e)
+
+    def _write(self, directory: str):
+        os.makedirs(directory, exist_ok=True)
+        snapshot = self.current
+        for service, answer in snapshot.answers.items():
+            header = f"Keywords: {', '.join(snapshot.keywords[service])}".rstrip()
+            if snapshot.order[service] != DEFAULT_ORDER:
+                header += f"\nOrder: {snapshot.order[service]}"
+            path = os.path.join(directory, f"{service}.txt")
+            temporary = f"{path}.tmp"
+            with open(temporary, "w", encoding="utf-8") as f:
+                f.write(f"{header}\n\n{answer}\n")
+            os.replace(temporary, path)
+
+    async def save(self, directory: str):
+        """Write the current answers as answer files (in a thread, each file replaced atomically)"""
+        await asyncio.to_thread(self._write, directory)
+
+    def stats(self) -> Dict:
+        snapshot = self.current
+        return {
+            "directory": self.directory,
+            "version": snapshot.version,
+            "digest": snapshot.digest,
+            "answers": len(snapshot),
+            "keywords": sum(len(keywords) for keywords in snapshot.keywords.values()),
+            "loaded_at": snapshot.loaded_at,
+            "reloads": self.reloads,
+            "reload_errors": self.errors
+        }
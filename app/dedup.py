@@ -0,0 +1,221 @@
+import hashlib
+import heapq
+import random
+import re
+import zlib
+from array import array
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from app.records import ColumnarStore
+
+# MinHash permutations are x -> (a * x + b) mod 2^32 with odd a, a bijection on 32-bit shingle hashes
+_MASK = (1 << 32) - 1
+
+STOPWORDS = frozenset(
+    "a about after all also am an and any are as at be been being but by can could did do does "
+    "for from get got had has have he her his how i if in into is it its me my near no not of on "
+    "or our please same she so some than that the their them there these they this to too up us "
+    "very was we were what when where which while who why will with would you your".split()
+)
+
+CLOSED_STATUSES = ("Resolved", "Closed")
+
+
+class Match(NamedTuple):
+    cluster_id: int
+    similarity: float
+    exact_duplicate_of: Optional[int]
+
+
+def shingles(title: str, description: str) -> Set[int]:
+    """Hashed content words of a concern's text
+
+    Single words rather than n-grams: reports of the same issue by different
+    citizens share vocabulary far more often than word order. A trailing
+    plural "s" is dropped so "potholes" matches "pothole".
+    """
+    words = re.findall(r"[a-z0-9]+", f"{title} {description}".lower())
+    return {
+        zlib.crc32((word[:-1] if len(word) > 3 and word.endswith("s") else word).encode("utf-8"))
+        for word in words if word not in STOPWORDS
+    }
+
+
+def text_digest(title: str, description: str) -> bytes:
+    """Key for exact duplicates: same words in the same order, ignoring case and punctuation"""
+    normalized = " ".join(re.findall(r"[a-z0-9]+", f"{title} {description}".lower()))
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest()
+
+
+def jaccard(a: Set[int], b: Set[int]) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+
+class ConcernDeduplicator:
+    """MinHash/LSH index that groups reports of the same issue into clusters
+
+    Each open cluster is represented by its first concern; only those
+    representatives are in the LSH bands, so the index grows with the number
+    of distinct open issues rather than with stored concerns. A new concern
+    is hashed into ``bands`` buckets; representatives sharing a bucket are
+    verified by exact Jaccard similarity of their shingles. Cluster
+    membership of every stored concern is one 32-bit slot in an array.
+
+    With 48 permutations in 16 bands of 3 rows, pairs at 0.6 similarity
+    share a bucket with ~98% probability and pairs at 0.2 with ~12%. Query
+    cost is bounded however large the index grows: buckets stop accepting
+    members at ``max_bucket`` (such buckets hold only very common words), and
+    only the ``max_candidates`` representatives sharing the most buckets are
+    verified by exact Jaccard similarity against ``threshold``.
+    """
+
+    def __init__(
+        self,
+        store: ColumnarStore,
+        num_perm: int = 48,
+        bands: int = 16,
+        threshold: float = 0.6,
+        max_bucket: int = 64,
+        max_candidates: int = 8,
+        seed: int = 1
+    ):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.store = store
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_bucket = max_bucket
+        self.max_candidates = max_candidates
+        rng = random.Random(seed)
+        self.permutations = [(rng.getrandbits(32) | 1, rng.getrandbits(32)) for _ in range(num_perm)]
+        self.buckets: List[Dict[int, List[int]]] = [{} for _ in range(bands)]  # band key -> representative ids
+        self.exact: Dict[bytes, int] = {}  # text digest -> first open concern with that text
+        self.cluster_of = array("I")  # concern id - 1 -> cluster id (its representative's id)
+        self.cluster_sizes: Dict[int, int] = {}  # open clusters only
+        self.duplicated: Set[int] = set()  # open clusters with more than one report
+        self.duplicates = 0
+        self.exact_duplicates = 0
+        self._last = None  # (text, digest, shingles, band keys) of the last hashed concern
+
+    def signature(self, hashes: Set[int]) -> List[int]:
+        if not hashes:
+            hashes = {0}
+        return [min((a * h + b) & _MASK for h in hashes) for a, b in self.permutations]
+
+    def _band_keys(self, signature: List[int]) -> Tuple[int, ...]:
+        rows = self.rows
+        return tuple(hash(tuple(signature[i:i + rows])) for i in range(0, len(signature), rows))
+
+    def _hash(self, title: str, description: str):
+        # check() and add() see the same text back to back; hash it once
+        if self._last is None or self._last[0] != (title, description):
+            hashes = shingles(title, description)
+            keys = self._band_keys(self.signature(hashes))
+            self._last = ((title, description), text_digest(title, description), hashes, keys)
+        return self._last[1:]
+
+    def _texts(self, concern_id: int) -> Tuple[str, str]:
+        return self.store.value(concern_id, "title"), self.store.value(concern_id, "description")
+
+    def check(self, title: str, description: str) -> Optional[Match]:
+        """Find the open cluster a new concern belongs to, if any"""
+        digest, hashes, keys = self._hash(title, description)
+        exact = self.exact.get(digest)
+        if exact is not None:
+            return Match(self.cluster_of[exact - 1], 1.0, exact)
+
+        # Representatives sharing more bands are more similar; verify those first
+        shared = Counter()
+        for bucket, key in zip(self.buckets, keys):
+            members = bucket.get(key)
+            if members:
+                shared.update(members)
+        best = None
+        for representative, _ in shared.most_common(self.max_candidates):
+            similarity = jaccard(hashes, shingles(*self._texts(representative)))
+            if similarity >= self.threshold and (best is None or similarity > best.similarity):
+                best = Match(representative, similarity, None)
+        return best
+
+    def add(self, concern_id: int, title: str, description: str, match: Optional[Match] = None):
+        """Record a stored concern, joining ``match``'s cluster or starting a new one"""
+        while len(self.cluster_of) < concern_id:
+            self.cluster_of.append(0)
+        digest, _, keys = self._hash(title, description)
+        self.exact.setdefault(digest, concern_id)
+        if match is not None and match.cluster_id in self.cluster_sizes:
+            self.cluster_of[concern_id - 1] = match.cluster_id
+            self.cluster_sizes[match.cluster_id] += 1
+            self.duplicated.add(match.cluster_id)
+            self.duplicates += 1
+            if match.exact_duplicate_of is not None:
+                self.exact_duplicates += 1
+            return
+        self.cluster_of[concern_id - 1] = concern_id
+        self.cluster_sizes[concern_id] = 1
+        for bucket, key in zip(self.buckets, keys):
+            members = bucket.setdefault(key, [])
+            if len(members) < self.max_bucket:
+                members.append(concern_id)
+
+    def close(self, concern_id: int):
+        """Take a resolved/closed concern out of the index (its cluster closes with its representative)"""
+        cluster_id = self.cluster_id(concern_id)
+        digest, _, keys = self._hash(*self._texts(concern_id))
+        if self.exact.get(digest) == concern_id:
+            del self.exact[digest]
+        if cluster_id != concern_id or cluster_id not in self.cluster_sizes:
+            if cluster_id in self.cluster_sizes:
+                self.cluster_sizes[cluster_id] -= 1
+                if self.cluster_sizes[cluster_id] == 1:
+                    self.duplicated.discard(cluster_id)
+            return
+        del self.cluster_sizes[cluster_id]
+        self.duplicated.discard(cluster_id)
+        for bucket, key in zip(self.buckets, keys):
+            members = bucket.get(key)
+            if members and cluster_id in members:
+                members.remove(cluster_id)
+                if not members:
+                    del bucket[key]
+
+    def status_changed(self, concern_id: int, previous: str, status: str):
+        """Closed concerns stop attracting duplicates; reopened ones are matched again"""
+        if status in CLOSED_STATUSES and previous not in CLOSED_STATUSES:
+            self.close(concern_id)
+        elif status not in CLOSED_STATUSES and previous in CLOSED_STATUSES:
+            title, description = self._texts(concern_id)
+            self.add(concern_id, title, description, self.check(title, description))
+
+    def cluster_id(self, concern_id: int) -> int:
+        return self.cluster_of[concern_id - 1] if 0 < concern_id <= len(self.cluster_of) else 0
+
+    def rebuild(self):
+        """Index the open concerns already in the store (e.g. after a restart)"""
+        statuses = self.store.columns["status"]
+        closed = {self.store.categoricals["status"].encode(status) for status in CLOSED_STATUSES}
+        for concern_id in range(1, len(self.store) + 1):
+            if statuses[concern_id - 1] in closed:
+                continue
+            title, description = self._texts(concern_id)
+            self.add(concern_id, title, description, self.check(title, description))
+
+    def top_clusters(self, n: int = 5) -> List[Dict]:
+        # Only clusters with duplicates are candidates; most open clusters have one report
+        largest = heapq.nlargest(n, self.duplicated, key=lambda cluster_id: (self.cluster_sizes[cluster_id], -cluster_id))
+        return [
+            {"cluster_id": cluster_id, "reports": self.cluster_sizes[cluster_id], "title": self.store.value(cluster_id, "title")}
+            for cluster_id in largest
+        ]
+
+    def stats(self) -> Dict:
+        return {
+            "open_clusters": len(self.cluster_sizes),
+            "clusters_with_duplicates": len(self.duplicated),
+            "duplicates": self.duplicates,
+            "exact_duplicates": self.exact_duplicates,
+            "top_clusters": self.top_clusters()
+        }
@@ -0,0 +1,87 @@
+import time
+from collections import deque
+from typing import Dict
+
+PATHS = ("llm", "degraded_fallback", "degraded_llm", "shed")
+
+
+class DegradationController:
+    """Switches to fallback answers while the model is overloaded
+
+    The controller watches recent end-to-end model latency (queue wait plus
+    generation) and the admission queue length. It enters degraded mode when
+    the p90 latency or the queue passes the high watermarks and only leaves
+    once both are back under the low watermarks and ``min_hold_seconds`` have
+    passed, so it does not flap around a single threshold. In degraded mode
+    queries with a good fallback match are answered from the knowledge base
+    immediately; the model is kept for queries that have none.
+    """
+
+    def __init__(
+        self,
+        latency_high_ms: float,
+        latency_low_ms: float,
+        queue_high: int,
+        queue_low: int,
+        window: int = 50,
+        window_seconds: float = 60.0,
+        min_hold_seconds: float = 30.0
+    ):
+        self.latency_high_ms = latency_high_ms
+        self.latency_low_ms = latency_low_ms
+        self.queue_high = queue_high
+        self.queue_low = queue_low
+        self.min_hold_seconds = min_hold_seconds
+        self.window_seconds = window_seconds
+        self.latencies = deque(maxlen=window)  # (recorded_at, elapsed_ms)
+        self.degraded = False
+        self.changed_at = time.monotonic()
+        self.transitions = 0
+        self.degraded_seconds = 0.0
+        self.paths = {path: 0 for path in PATHS}
+
+    def p90_latency_ms(self) -> float:
+        # Samples age out, so a degraded period with few LLM calls can still recover
+        cutoff = time.monotonic() - self.window_seconds
+        ordered = sorted(ms for recorded_at, ms in self.latencies if recorded_at >= cutoff)
+        if not ordered:
+            return 0.0
+        return ordered[int((len(ordered) - 1) * 0.9)]
+
+    def update(self, queue_length: int) -> bool:
+        """Re-evaluate the mode from current signals; returns True when degraded"""
+        now = time.monotonic()
+        latency = self.p90_latency_ms()
+        if not self.degraded:
+            if latency > self.latency_high_ms or queue_length >= self.queue_high:
+                self._switch(True, now)
+        elif now - self.changed_at >= self.min_hold_seconds:
+            if latency < self.latency_low_ms and queue_length <= self.queue_low:
+                self._switch(False, now)
+        return self.degraded
+
+    def _switch(self, degraded: bool, now: float):
+        if self.degraded:
+            self.degraded_seconds += now - self.changed_at
+        self.degraded = degraded
+        self.changed_at = now
+        self.transitions += 1
+        print(f"Model {'overloaded, serving fallback answers' if degraded else 'recovered, resuming LLM answers'}")
+
+    def record_latency(self, elapsed_ms: float):
+        self.latencies.append((time.monotonic(), elapsed_ms))
+
+    def count(self, path: str):
+        self.paths[path] += 1
+
+    def stats(self) -> Dict:
+        degraded_seconds = self.degraded_seconds
+        if self.degraded:
+            degraded_seconds += time.monotonic() - self.changed_at
+        return {
+            "degraded": self.degraded,
+            "p90_latency_ms": round(self.p90_latency_ms(), 1),
+            "transitions": self.transitions,
+            "degraded_seconds": round(degraded_seconds, 1),
+            "paths": dict(self.paths)
+        }
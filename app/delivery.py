@@ -0,0 +1,234 @@
+import gzip
+import hashlib
+import mimetypes
+import os
+from typing import Dict, Optional
+
+from fastapi import Request
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/javascript",
+    "application/xml",
+    "image/svg+xml"
+)
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+def accepted_encoding(accept_encoding: str) -> Optional[str]:
+    """Best supported content coding from an Accept-Encoding header"""
+    offered = {}
+    for part in accept_encoding.lower().split(","):
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                quality = 0.0
+        offered[name.strip()] = quality
+    if brotli is not None and offered.get("br", 0) > 0:
+        return "br"
+    if offered.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=5 if level is None else level)
+    return gzip.compress(body, compresslevel=6 if level is None else level, mtime=0)
+
+
+def etag_for(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: a compressed representation carries a W/ prefix
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def _header(scope, name: bytes) -> str:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return ""
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses with brotli or gzip
+
+    Only complete (single message) bodies of at least ``min_size`` bytes
+    with a text-like content type are compressed; streamed and already
+    encoded responses pass through unchanged. Strong ETags become weak on
+    the compressed representation, as the bytes no longer match.
+    """
+
+    def __init__(self, app, min_size: int = 1024):
+        self.app = app
+        self.min_size = min_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = accepted_encoding(_header(scope, b"accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_wrapper(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                # Held back until the body shows whether to compress
+                start = message
+                return
+            if message["type"] != "http.response.body" or start is None:
+                await send(message)
+                return
+            held, start = start, None
+            body = message.get("body", b"")
+            if message.get("more_body") or not self._compressible(held, body):
+                await send(held)
+                await send(message)
+                return
+            body = compress(body, encoding)
+            headers = [
+                (key, value) for key, value in held["headers"]
+                if key not in (b"content-length", b"etag")
+            ]
+            for key, value in held["headers"]:
+                if key == b"etag" and not value.startswith(b"W/"):
+                    headers.append((b"etag", b"W/" + value))
+                elif key == b"etag":
+                    headers.append((key, value))
+            headers += [
+                (b"content-encoding", encoding.encode("ascii")),
+                (b"content-length", str(len(body)).encode("ascii")),
+                (b"vary", b"Accept-Encoding")
+            ]
+            await send({**held, "headers": headers})
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_wrapper)
+
+    def _compressible(self, start, body: bytes) -> bool:
+        if len(body) < self.min_size or start["status"] < 200 or start["status"] in (204, 304):
+            return False
+        content_type = ""
+        for key, value in start["headers"]:
+            if key == b"content-encoding":
+                return False
+            if key == b"content-type":
+                content_type = value.decode("latin-1")
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class StaticAsset:
+    """One static file held in memory with its precompressed variants"""
+
+    def __init__(self, path: str, body: bytes):
+        self.path = path
+        self.body = body
+        self.digest = hashlib.blake2b(body, digest_size=8).hexdigest()
+        self.etag = f'"{self.digest}"'
+        self.media_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+        if self.media_type.startswith("text/") or self.media_type == "application/javascript":
+            self.media_type += "; charset=utf-8"
+        stem, ext = os.path.splitext(path)
+        self.fingerprinted = f"{stem}.{self.digest}{ext}"
+        self.encoded = {}
+        if self.media_type.startswith(COMPRESSIBLE_TYPES):
+            for encoding in ("br", "gzip") if brotli is not None else ("gzip",):
+                compressed = compress(body, encoding, level=11 if encoding == "br" else 9)
+                if len(compressed) < len(body):
+                    self.encoded[encoding] = compressed
+
+
+class StaticAssets:
+    """In-memory static file server with fingerprinted, precompressed assets
+
+    Files under ``directory`` are read and compressed once when the app is
+    built. ``url(path)`` returns a content-hash fingerprinted URL such as
+    ``/static/css/style.3f2a9c1d0b7e4a56.css`` that is served with a
+    one-year immutable Cache-Control; a changed file gets a new URL. The
+    plain paths keep working and are revalidated with their ETag.
+    """
+
+    def __init__(self, directory: str, prefix: str = "/static"):
+        self.directory = directory
+        self.prefix = prefix
+        self.assets: Dict[str, StaticAsset] = {}
+        self.by_fingerprint: Dict[str, StaticAsset] = {}
+        self.build()
+
+    def build(self):
+        assets = {}
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                full_path = os.path.join(root, name)
+                path = os.path.relpath(full_path, self.directory).replace(os.sep, "/")
+                with open(full_path, "rb") as f:
+                    assets[path] = StaticAsset(path, f.read())
+        self.assets = assets
+        self.by_fingerprint = {asset.fingerprinted: asset for asset in assets.values()}
+
+    def url(self, path: str) -> str:
+        asset = self.assets.get(path)
+        return f"{self.prefix}/{asset.fingerprinted if asset else path}"
+
+    async def __call__(self, scope, receive, send):
+        path = scope["path"]
+        if path.startswith(self.prefix):
+            path = path[len(self.prefix):]
+        path = path.lstrip("/")
+        if scope["method"] not in ("GET", "HEAD"):
+            response = Response(status_code=405, headers={"Allow": "GET, HEAD"})
+        elif path in self.by_fingerprint:
+            response = asset_response(scope, self.by_fingerprint[path], IMMUTABLE)
+        elif path in self.assets:
+            response = asset_response(scope, self.assets[path], "no-cache")
+        else:
+            response = Response("Not Found", status_code=404, media_type="text/plain")
+        await response(scope, receive, send)
+
+
+def asset_response(scope, asset: StaticAsset, cache_control: str) -> Response:
+    """Serve an in-memory asset: 304 on a matching ETag, else the best precompressed variant"""
+    headers = {"Cache-Control": cache_control, "ETag": asset.etag, "Vary": "Accept-Encoding"}
+    if etag_matches(_header(scope, b"if-none-match"), asset.etag):
+        return Response(status_code=304, headers=headers)
+    body = asset.body
+    encoding = accepted_encoding(_header(scope, b"accept-encoding"))
+    if encoding in asset.encoded:
+        body = asset.encoded[encoding]
+        headers["Content-Encoding"] = encoding
+    if scope["method"] == "HEAD":
+        headers["Content-Length"] = str(len(body))
+        body = b""
+    return Response(body, media_type=asset.media_type, headers=headers)
+
+
+def cached_json(request: Request, content, cache_control: str = "private, no-cache") -> Response:
+    """JSON response with an ETag; answers 304 when the client already has it"""
+    response = JSONResponse(content, headers={"Cache-Control": cache_control})
+    etag = etag_for(response.body)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": cache_control})
+    response.headers["ETag"] = etag
+    return response
@@ -0,0 +1,195 @@
+import io
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# pyarrow is optional and slow to import; it is loaded on the first export
+pa = pc = ds = ipc = pq = None
+
+from app.records import ColumnarStore, naive_local, to_epoch_us
+
+DATASETS = ("feedback", "concerns", "concern_events", "chats")
+# Columns that change after a record is added; parts are never rewritten, so
+# they are left out and the current value comes from another dataset
+MUTABLE_COLUMNS = {"concerns": ("status",)}
+SUMMARY_DIMENSIONS = ("category", "priority", "sentiment", "week")
+
+
+class ExportUnavailable(RuntimeError):
+    """Raised when pyarrow is not installed"""
+
+
+def _require_pyarrow():
+    global pa, pc, ds, ipc, pq
+    if pa is not None:
+        return
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.dataset as ds
+        import pyarrow.ipc as ipc
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ExportUnavailable("Analytics export requires pyarrow (pip install pyarrow)")
+
+
+class ColumnarExporter:
+    """Incremental Parquet export of feedback, concerns and chats
+
+    Every call to ``export_new`` writes only records added since the previous
+    export as a new part file (one row group each) under ``<directory>/<dataset>/``.
+    Existing parts are never rewritten; the high-water mark is the last id in
+    the newest part's file name, so restarts resume where they left off.
+    Exports are serialized so concurrent callers never write overlapping parts.
+
+    Concern rows are exported without their status, which changes after
+    submission. Status changes are exported as the ``concern_events``
+    dataset instead; a concern's current status is the ``status`` of its
+    event with the highest ``version`` ("Open" if it has none).
+    """
+
+    def __init__(self, directory: str = "data/export"):
+        self.directory = directory
+        self.exported_rows = {name: 0 for name in DATASETS}
+        self.lock = threading.Lock()
+
+    def _dataset_dir(self, dataset: str) -> str:
+        path = os.path.join(self.directory, dataset)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def _parts(self, dataset: str) -> List[str]:
+        path = self._dataset_dir(dataset)
+        return sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith(".parquet")
+        )
+
+    def high_water_mark(self, dataset: str) -> int:
+        parts = self._parts(dataset)
+        if not parts:
+            return 0
+        return int(os.path.basename(parts[-1]).split("-")[2].split(".")[0])
+
+    # Building Arrow tables
+
+    def _store_table(self, store: ColumnarStore, start: int, exclude=()) -> "pa.Table":
+        """Arrow table of rows [start, len(store)) built column by column"""
+        end = len(store)
+        arrays = {"id": pa.array(range(start + 1, end + 1), type=pa.int64())}
+        schema = dict(store.schema)
+        for name in store.fields:
+            if name in exclude:
+                continue
+            column = store.columns[name][start:end]
+            kind = schema[name]
+            if kind == "text":
+                arrays[name] = pa.array([store.arena.get(i) for i in column], type=pa.string())
+            elif kind == "timestamp":
+                arrays[name] = pa.array(column, type=pa.int64()).cast(pa.timestamp("us"))
+            elif kind == "int":
+                arrays[name] = pa.array(column, type=pa.int64())
+            else:
+                # Categorical codes map directly onto an Arrow dictionary array
+                arrays[name] = pa.DictionaryArray.from_arrays(
+                    pa.array(column, type=pa.uint16()),
+                    pa.array(store.categoricals[name].labels, type=pa.string())
+                )
+        return pa.table(arrays)
+
+    def _chat_table(self, chat_history, start: int) -> Optional["pa.Table"]:
+        entries = chat_history.entries_after(start)
+        if not entries:
+            return None
+        return pa.table({
+            "id": pa.array([e["id"] for e in entries], type=pa.int64()),
+            "user_question": pa.array([e["user_question"] for e in entries], type=pa.string()),
+            "ai_response": pa.array([e["ai_response"] for e in entries], type=pa.string()).dictionary_encode(),
+            "timestamp": pa.array([to_epoch_us(e["timestamp"]) for e in entries], type=pa.int64()).cast(pa.timestamp("us"))
+        })
+
+    # Export
+
+    def export_new(self, state) -> Dict[str, int]:
+        """Append records added since the last export; returns rows written per dataset"""
+        _require_pyarrow()
+        with self.lock:
+            return self._export_new(state)
+
+    def _export_new(self, state) -> Dict[str, int]:
+        # The high-water mark is read and advanced (by the new part) under the lock
+        written = {}
+        for dataset in DATASETS:
+            start = self.high_water_mark(dataset)
+            if dataset == "chats":
+                table = self._chat_table(state.chat_history, start)
+            else:
+                store = {
+                    "feedback": state.feedback_data,
+                    "concerns": state.concerns,
+                    "concern_events": state.workflow.events
+                }[dataset]
+                exclude = MUTABLE_COLUMNS.get(dataset, ())
+                table = self._store_table(store, start, exclude) if len(store) > start else None
+
+            if table is None or table.num_rows == 0:
+                written[dataset] = 0
+                continue
+
+            first_id = table["id"][0].as_py()
+            last_id = table["id"][-1].as_py()
+            name = f"part-{first_id:012d}-{last_id:012d}.parquet"
+            path = os.path.join(self._dataset_dir(dataset), name)
+            pq.write_table(table, path + ".tmp", compression="zstd")
+            os.replace(path + ".tmp", path)
+            self.exported_rows[dataset] += table.num_rows
+            written[dataset] = table.num_rows
+        return written
+
+    def read(self, dataset: str, start: Optional[datetime] = None, end: Optional[datetime] = None) -> "pa.Table":
+        """All exported rows of a dataset whose timestamp falls in [start, end)"""
+        _require_pyarrow()
+        if dataset not in DATASETS:
+            raise ValueError(f"Unknown dataset: {dataset}")
+        parts = self._parts(dataset)
+        if not parts:
+            return pa.table({})
+        parts_dataset = ds.dataset(parts, format="parquet")
+        condition = None
+        if start is not None:
+            condition = ds.field("timestamp") >= pa.scalar(naive_local(start), type=pa.timestamp("us"))
+        if end is not None:
+            upper = ds.field("timestamp") < pa.scalar(naive_local(end), type=pa.timestamp("us"))
+            condition = upper if condition is None else condition & upper
+        return parts_dataset.to_table(filter=condition)
+
+    def serialize(self, table: "pa.Table", fmt: str = "parquet") -> bytes:
+        """Encode a table as Parquet or Arrow IPC file bytes"""
+        sink = io.BytesIO()
+        if fmt == "arrow":
+            # IPC files allow one dictionary per field, parts each bring their own
+            table = table.unify_dictionaries()
+            with ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        else:
+            pq.write_table(table, sink, compression="zstd")
+        return sink.getvalue()
+
+    def concern_summary(self, start: Optional[datetime] = None, end: Optional[datetime] = None) -> List[Dict]:
+        """Concern counts grouped by category x priority x sentiment x week"""
+        table = self.read("concerns", start, end)
+        if table.num_rows == 0:
+            return []
+        week = pc.floor_temporal(table["timestamp"], unit="week", week_starts_monday=True)
+        grouped = pa.table({
+            "category": table["category"].cast(pa.string()),
+            "priority": table["priority"].cast(pa.string()),
+            "sentiment": table["sentiment"].cast(pa.string()),
+            "week": week.cast(pa.date32()),
+            "id": table["id"]
+        }).group_by(list(SUMMARY_DIMENSIONS)).aggregate([("id", "count")])
+        grouped = grouped.rename_columns(list(SUMMARY_DIMENSIONS) + ["count"])
+        rows = grouped.sort_by([("week", "ascending"), ("count", "descending")]).to_pylist()
+        for row in rows:
+            row["week"] = row["week"].isoformat()
+        return rows
@@ -0,0 +1,342 @@
+import asyncio
+import json
+import os
+import re
+from functools import lru_cache
+from typing import Dict, Iterable, NamedTuple, Optional, Tuple
+
+LANGUAGES = ("en", "hi", "hinglish", "te", "tenglish")
+
+# Romanized Hindi / Telugu function words that mark a Latin-script query as non-English
+HINGLISH_MARKERS = frozenset(
+    "kaise kya hai hain mera meri mere mujhe humko karna karne kare karu kab kahan kaha kyun kyon "
+    "nahi nahin liye aur bhi bahut chahiye hoga kaun apna apni raha rahi gaya tha mein banega "
+    "banwana milega kaunsa kitna kitne".split()
+)
+TENGLISH_MARKERS = frozenset(
+    "ela enti emiti ekkada eppudu kavali cheyali cheyyali ledu undi unnayi naku nenu meeru "
+    "bagundi chala andi entha evaru ivvandi cheppandi kosam".split()
+)
+
+# Lexicons map native-script or romanized words and phrases to the English
+# keywords the fallback matcher and keyword sentiment look for. Native-script
+# keys are transliterated the same way as queries, so spelling variants that
+# transliterate alike match too.
+LEXICONS: Dict[str, Dict[str, str]] = {
+    "hi": {
+        # Services
+        "आधार": "aadhaar", "पैन": "pan", "पैन कार्ड": "pan card", "आयकर": "income tax",
+        "इनकम टैक्स": "income tax", "टैक्स": "tax", "मतदाता": "voter", "वोटर": "voter",
+        "मतदान": "voting", "चुनाव": "election", "matdata": "voter", "chunav": "election",
+        "आयुष्मान": "ayushman", "स्वास्थ्य बीमा": "health insurance", "बीमा": "insurance",
+        "इलाज": "medical", "bima": "insurance", "ilaj": "medical", "शिकायत": "complaint",
+        "shikayat": "complaint", "राशन": "ration", "rashan": "ration", "राशन कार्ड": "ration card",
+        "पेंशन": "pension", "पेन्शन": "pension", "वृद्धावस्था": "old age", "बुढ़ापा": "old age",
+        "budhapa": "old age", "बुजुर्ग": "elderly", "bujurg": "elderly", "सेवानिवृत्ति": "retirement",
+        "लाइसेंस": "license", "ड्राइविंग": "driving", "गाड़ी": "vehicle", "gadi": "vehicle",
+        "वाहन": "vehicle", "vahan": "vehicle", "पासपोर्ट": "passport", "यात्रा": "travel",
+        "जन्म": "birth", "janam": "birth", "janm": "birth", "मृत्यु": "death", "mrityu": "death",
+        "प्रमाण पत्र": "certificate", "प्रमाणपत्र": "certificate", "praman patra": "certificate",
+        "pramanpatra": "certificate", "सर्टिफिकेट": "certificate", "आवेदन": "apply", "avedan": "apply",
+        "दस्तावेज": "documents", "dastavej": "documents", "कागज": "documents", "kagaj": "documents",
+        "फीस": "fees", "शुल्क": "fees",
+        # Sentiment
+        "अच्छा": "good", "अच्छी": "good", "accha": "good", "achha": "good", "acha": "good",
+        "acchi": "good", "achhi": "good", "बहुत अच्छा": "very good", "bahut accha": "very good",
+        "bahut achha": "very good", "बढ़िया": "great", "badhiya": "great", "badiya": "great",
+        "शानदार": "excellent", "shandar": "excellent", "धन्यवाद": "thank", "dhanyavad": "thank",
+        "dhanyawad": "thank", "शुक्रिया": "thank", "shukriya": "thank", "खुश": "happy", "khush": "happy",
+        "संतुष्ट": "satisfied", "santusht": "satisfied", "आसान": "easy", "asan": "easy",
+        "jaldi": "quick", "जल्दी": "quick", "खराब": "bad", "kharab": "bad", "बेकार": "useless",
+        "bekar": "useless", "बहुत खराब": "very poor", "bahut kharab": "very poor",
+        "सबसे खराब": "worst", "sabse kharab": "worst", "बकवास": "pathetic", "bakwas": "pathetic",
+        "परेशान": "upset", "pareshan": "upset", "नाराज": "angry", "naraj": "angry", "naraz": "angry",
+        "गुस्सा": "angry", "gussa": "angry", "समस्या": "problem", "samasya": "problem",
+        "दिक्कत": "problem", "dikkat": "problem", "परेशानी": "problem", "pareshani": "problem",
+        "धीमा": "slow", "dhima": "slow", "टूटा": "broken", "टूटी": "broken", "toota": "broken",
+        "tuta": "broken", "tuti": "broken", "काम नहीं कर रहा": "not working",
+        "kaam nahi kar raha": "not working", "काम नहीं": "not working", "kaam nahi": "not working",
+        "निराश": "disappointed", "nirash": "disappointed",
+        # Question words (neutral)
+        "कैसे": "how", "kaise": "how", "क्या": "what", "kya": "what", "कब": "when", "kab": "when",
+        "कहाँ": "where", "kahan": "where", "kaha": "where", "क्यों": "why", "kyon": "why", "kyun": "why",
+        "जानकारी": "information", "jankari": "information",
+    },
+    "te": {
+        # Services
+        "ఆధార్": "aadhaar", "పాన్": "pan", "పాన్ కార్డ్": "pan card", "ఆదాయపు పన్ను": "income tax",
+        "పన్ను": "tax", "pannu": "tax", "ఓటరు": "voter", "ఓటర్": "voter", "ఓటు": "voting",
+        "votu": "voting", "ఎన్నికలు": "election", "ennikalu": "election", "ఆయుష్మాన్": "ayushman",
+        "ఆరోగ్యశ్రీ": "health insurance", "aarogyasri": "health insurance", "బీమా": "insurance",
+        "వైద్యం": "medical", "vaidyam": "medical", "ఫిర్యాదు": "complaint", "firyadu": "complaint",
+        "phiryadu": "complaint", "రేషన్": "ration", "రేషన్ కార్డు": "ration card", "పెన్షన్": "pension",
+        "పింఛను": "pension", "పింఛన్": "pension", "pinchanu": "pension", "pinchan": "pension",
+        "వృద్ధాప్య": "old age", "vruddhapya": "old age", "లైసెన్స్": "license", "డ్రైవింగ్": "driving",
+        "వాహనం": "vehicle", "vahanam": "vehicle", "పాస్‌పోర్ట్": "passport", "పాస్పోర్ట్": "passport",
+        "ప్రయాణం": "travel", "జనన": "birth", "janana": "birth", "పుట్టిన": "birth", "puttina": "birth",
+        "మరణ": "death", "marana": "death", "ధృవీకరణ పత్రం": "certificate", "సర్టిఫికెట్": "certificate",
+        "దరఖాస్తు": "apply", "darakhastu": "apply", "పత్రాలు": "documents", "patralu": "documents",
+        "ఫీజు": "fees",
+        # Sentiment
+        "బాగుంది": "good", "bagundi": "good", "చాలా బాగుంది": "very good", "chala bagundi": "very good",
+        "మంచి": "good", "manchi": "good", "అద్భుతం": "excellent", "adbhutam": "excellent",
+        "ధన్యవాదాలు": "thank", "dhanyavadalu": "thank", "సంతోషం": "happy", "santosham": "happy",
+        "సులభం": "easy", "sulabham": "easy", "బాలేదు": "bad", "baledu": "bad", "బాగాలేదు": "bad",
+        "bagaledu": "bad", "చెడ్డ": "bad", "chedda": "bad", "సమస్య": "problem", "samasya": "problem",
+        "ఇబ్బంది": "problem", "ibbandi": "problem", "కోపం": "angry", "kopam": "angry",
+        "నిరాశ": "disappointed", "nirasha": "disappointed", "నెమ్మదిగా": "slow", "nemmadiga": "slow",
+        "పని చేయడం లేదు": "not working", "పనిచేయడం లేదు": "not working",
+        "pani cheyadam ledu": "not working", "విరిగిన": "broken", "virigina": "broken",
+        "ఉపయోగం లేదు": "useless", "upayogam ledu": "useless", "దారుణం": "terrible", "darunam": "terrible",
+        # Question words (neutral)
+        "ఎలా": "how", "ela": "how", "ఏమిటి": "what", "emiti": "what", "enti": "what",
+        "ఎప్పుడు": "when", "eppudu": "when", "ఎక్కడ": "where", "ekkada": "where",
+        "ఎందుకు": "why", "enduku": "why", "సమాచారం": "information", "samacharam": "information",
+    },
+}
+
+# Marker words plus the romanized single words of each lexicon
+_ROMANIZED = {
+    language: markers | {word for word in LEXICONS[language] if word.isascii() and " " not in word}
+    for language, markers in (("hi", HINGLISH_MARKERS), ("te", TENGLISH_MARKERS))
+}
+
+# Script-specific transliteration to a loose Latin spelling (vowel length is not kept)
+_DEVANAGARI = {
+    "vowels": dict(zip("अआइईउऊऋएऐओऔ", ["a", "a", "i", "i", "u", "u", "ri", "e", "ai", "o", "au"])),
+    "signs": dict(zip("ािीुूृेैोौॅॉ", ["a", "i", "i", "u", "u", "ri", "e", "ai", "o", "au", "e", "o"])),
+    "consonants": dict(zip(
+        "कखगघङचछजझञटठडढणतथदधनपफबभमयरलवशषसह",
+        ["k", "kh", "g", "gh", "n", "ch", "chh", "j", "jh", "n", "t", "th", "d", "dh", "n",
+         "t", "th", "d", "dh", "n", "p", "ph", "b", "bh", "m", "y", "r", "l", "v", "sh", "sh", "s", "h"]
+    )),
+    "nukta": {"ज": "z", "फ": "f", "ड": "r", "ढ": "rh", "क": "q", "ख": "kh", "ग": "g"},
+    "virama": "्", "nukta_sign": "़", "nasal": "ंँ", "visarga": "ः",
+    "drop_final_a": True,  # Hindi drops the inherent vowel at the end of a word
+}
+_TELUGU = {
+    "vowels": dict(zip("అఆఇఈఉఊఋఎఏఐఒఓఔ", ["a", "a", "i", "i", "u", "u", "ru", "e", "e", "ai", "o", "o", "au"])),
+    "signs": dict(zip("ాిీుూృెేైొోౌ", ["a", "i", "i", "u", "u", "ru", "e", "e", "ai", "o", "o", "au"])),
+    "consonants": dict(zip(
+        "కఖగఘఙచఛజఝఞటఠడఢణతథదధనపఫబభమయరలవశషసహళఱ",
+        ["k", "kh", "g", "gh", "n", "ch", "chh", "j", "jh", "n", "t", "th", "d", "dh", "n",
+         "t", "th", "d", "dh", "n", "p", "ph", "b", "bh", "m", "y", "r", "l", "v", "sh", "sh", "s", "h", "l", "r"]
+    )),
+    "nukta": {},
+    "virama": "్", "nukta_sign": "", "nasal": "ంఁ", "visarga": "ః",
+    "drop_final_a": False,
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+|[ऀ-ॿ]+|[ఀ-౿‌‍]+")
+_REPEATED_VOWEL = re.compile(r"([aeiou])\1+")
+
+
+def _script(token: str) -> Optional[dict]:
+    if "ऀ" <= token[0] <= "ॿ":
+        return _DEVANAGARI
+    if "ఀ" <= token[0] <= "౿" or token[0] in "‌‍":
+        return _TELUGU
+    return None
+
+
+def transliterate(token: str) -> str:
+    """Latin spelling of one Devanagari or Telugu word (other words are returned as-is)"""
+    table = _script(token)
+    if table is None:
+        return token
+    out = []
+    pending_a = False  # a consonant is waiting for its vowel
+    for i, char in enumerate(token):
+        if char in table["consonants"]:
+            if pending_a:
+                out.append("a")
+            nukta = i + 1 < len(token) and token[i + 1] == table["nukta_sign"]
+            out.append(table["nukta"].get(char, table["consonants"][char]) if nukta else table["consonants"][char])
+            pending_a = True
+        elif char in table["signs"]:
+            out.append(table["signs"][char])
+            pending_a = False
+        elif char == table["virama"]:
+            pending_a = False
+        elif char in table["vowels"]:
+            if pending_a:
+                out.append("a")
+            out.append(table["vowels"][char])
+            pending_a = False
+        elif char in table["nasal"]:
+            if pending_a:
+                out.append("a")
+            out.append("n")
+            pending_a = False
+        elif char == table["visarga"]:
+            if pending_a:
+                out.append("a")
+            out.append("h")
+            pending_a = False
+        # Nukta and zero-width joiners carry no sound of their own
+    if pending_a and not table["drop_final_a"]:
+        out.append("a")
+    return "".join(out)
+
+
+def _lookup_key(token: str) -> str:
+    """Spelling-insensitive form used for lexicon lookups ("aadhaar" == "adhar")"""
+    return _REPEATED_VOWEL.sub(r"\1", transliterate(token).replace("ee", "i").replace("oo", "u").replace("w", "v"))
+
+
+def tokenize(text: str):
+    return _TOKEN.findall(text.lower())
+
+
+def detect_language(text: str) -> str:
+    """One of LANGUAGES, from the script of the text or, for Latin script, marker words"""
+    devanagari = telugu = latin = 0
+    for char in text:
+        if "ऀ" <= char <= "ॿ":
+            devanagari += 1
+        elif "ఀ" <= char <= "౿":
+            telugu += 1
+        elif char.isascii() and char.isalpha():
+            latin += 1
+    if devanagari or telugu:
+        if devanagari >= telugu and devanagari * 3 >= latin:
+            return "hi"
+        if telugu > devanagari and telugu * 3 >= latin:
+            return "te"
+    words = set(re.findall(r"[a-z]+", text.lower()))
+    hinglish = len(words & _ROMANIZED["hi"])
+    tenglish = len(words & _ROMANIZED["te"])
+    if max(hinglish, tenglish) >= 2 or (max(hinglish, tenglish) == 1 and len(words) <= 3):
+        return "hinglish" if hinglish >= tenglish else "tenglish"
+    return "en"
+
+
+class Normalized(NamedTuple):
+    language: str
+    text: str  # English keywords for the keyword paths (the text itself for English)
+    matched: int  # lexicon entries found
+
+
+class QueryNormalizer:
+    """Language detection and lexicon normalization in front of the keyword paths
+
+    Non-English text is tokenized, Devanagari and Telugu words are
+    transliterated, and lexicon words and phrases (longest match first) are
+    replaced by the English keywords the fallback matcher and keyword
+    sentiment understand; Latin-script words are kept, so mixed Hinglish
+    queries ("mera PAN card kaise banega") keep their English parts.
+    Results are cached. Lexicons can be extended per language with
+    ``<language>.json`` files (``{"word or phrase": "english"}``) in
+    ``lexicon_dir``. An optional translation model handles non-English
+    queries the lexicon does not cover.
+    """
+
+    def __init__(self, lexicon_dir: Optional[str] = None, cache_size: int = 4096):
+        self.lexicons: Dict[str, Dict[Tuple[str, ...], str]] = {}
+        self.longest: Dict[str, int] = {}
+        for language, entries in LEXICONS.items():
+            entries = dict(entries)
+            path = os.path.join(lexicon_dir, f"{language}.json") if lexicon_dir else None
+            if path and os.path.exists(path):
+                try:
+                    with open(path, "r", encoding="utf-8") as f:
+                        entries.update(json.load(f))
+                except (OSError, ValueError) as e:
+                    print(f"Could not load lexicon {path}: {e}")
+            self.lexicons[language] = {
+                tuple(_lookup_key(token) for token in tokenize(phrase)): english
+                for phrase, english in entries.items()
+            }
+            self.longest[language] = max(len(key) for key in self.lexicons[language])
+        self.normalize = lru_cache(maxsize=cache_size)(self._normalize)
+        self.translator = None
+        self._translate_cached = lru_cache(maxsize=cache_size)(self._translate)
+        self.outcomes: Dict[str, Dict[str, Dict[str, int]]] = {}
+
+    def _normalize(self, text: str) -> Normalized:
+        language = detect_language(text)
+        if language == "en":
+            return Normalized(language, text, 0)
+        lexicon_language = "te" if language in ("te", "tenglish") else "hi"
+        lexicon = self.lexicons[lexicon_language]
+        longest = self.longest[lexicon_language]
+        tokens = tokenize(text)
+        keys = [_lookup_key(token) for token in tokens]
+        words = []
+        matched = 0
+        i = 0
+        while i < len(tokens):
+            for length in range(min(longest, len(tokens) - i), 0, -1):
+                english = lexicon.get(tuple(keys[i:i + length]))
+                if english is not None:
+                    words.append(english)
+                    matched += 1
+                    i += length
+                    break
+            else:
+                if _script(tokens[i]) is None:
+                    words.append(tokens[i])
+                i += 1
+        if "?" in text:
+            words.append("?")
+        return Normalized(language, " ".join(words), matched)
+
+    # Optional translation model
+
+    def load_translator(self, model_name: str):
+        """Load a local translation model (needs transformers; call from the model loader)"""
+        try:
+            import transformers
+            self.translator = transformers.pipeline("translation", model=model_name)
+            print(f"Translation model {model_name} loaded")
+        except Exception as e:
+            print(f"Could not load translation model {model_name}: {e}")
+            self.translator = None
+
+    def _translate(self, text: str) -> str:
+        return self.translator(text, max_length=256)[0]["translation_text"]
+
+    async def translate(self, text: str) -> Optional[str]:
+        """English translation of ``text`` (cached), or None without a translation model"""
+        if self.translator is None:
+            return None
+        try:
+            return await asyncio.to_thread(self._translate_cached, text)
+        except Exception as e:
+            print(f"Error translating query: {e}")
+            return None
+
+    # Metrics
+
+    def record(self, language: str, path: str, outcome: str):
+        """Count how a ``path`` ("chat" or "sentiment") was served for a language"""
+        counts = self.outcomes.setdefault(language, {}).setdefault(path, {})
+        counts[outcome] = counts.get(outcome, 0) + 1
+
+    def stats(self, others: Iterable[Dict] = ()) -> Dict:
+        """Per-language outcome counts and the share served without the model
+
+        ``others`` are ``outcomes`` tables of other processes (model workers)
+        to add to this process's counts.
+        """
+        outcomes = {}
+        for table in (self.outcomes, *others):
+            for language, paths in table.items():
+                for path, counts in paths.items():
+                    totals = outcomes.setdefault(language, {}).setdefault(path, {})
+                    for outcome, count in counts.items():
+                        totals[outcome] = totals.get(outcome, 0) + count
+        languages = {}
+        for language, paths in outcomes.items():
+            languages[language] = {}
+            for path, counts in paths.items():
+                total = sum(counts.values())
+                cheap = counts.get("precomputed", 0) + counts.get("fallback", 0) + counts.get("keywords", 0)
+                languages[language][path] = dict(counts, total=total, cheap_hit_rate=round(cheap / total, 3))
+        cache = self.normalize.cache_info()
+        return {
+            "languages": languages,
+            "cache_hits": cache.hits,
+            "cache_misses": cache.misses,
+            "translation_model": self.translator is not None
+        }
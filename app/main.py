@@ -1,11 +1,8 @@
 from fastapi import FastAPI, Request, Form, Depends, HTTPException, status
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-import uvicorn
 from datetime import datetime
-from typing import Optional
+from typing import Dict, Optional
 import json
 
 # Import our modules
@@ -15,51 +12,280 @@ from app.routes.chat import router as chat_router
 from app.routes.feedback import router as feedback_router
 from app.routes.concern import router as concern_router
 from app.routes.dashboard import router as dashboard_router
+from app.profiling import SlowRequestMiddleware, create_profiler
+from app.chat_store import ChatHistoryStore
+from app.records import create_concern_store, create_feedback_store
+from app.dedup import ConcernDeduplicator
+from app.search import SearchIndex
+from app.triage import TriagePipeline
+from app.workflow import ConcernWorkflow
+from app.persistence import Persistence
+from app.shared import SharedState, SharedStateMiddleware
+from app.export import ColumnarExporter, ExportUnavailable
+from app.sessions import create_session_store
+from app.security import PasswordVerifier, hash_password
+from app.ratelimit import RateLimiter
+from app.admission import AdmissionController
+from app.degradation import DegradationController
+from app.delivery import CompressionMiddleware, StaticAssets
+from app.templating import StaticPages, templates
+import asyncio
+from app import config
 
 # Initialize FastAPI app
 app = FastAPI(title="Citizen AI - Intelligent Citizen Engagement Platform")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Opt-in slow request profiling (CITIZEN_AI_PROFILING=1)
+app.state.profiler = create_profiler()
+if app.state.profiler is not None:
+    app.add_middleware(SlowRequestMiddleware, profiler=app.state.profiler)
 
-# Initialize templates
-templates = Jinja2Templates(directory="app/templates")
+# Compress text responses (brotli when installed, otherwise gzip)
+app.add_middleware(CompressionMiddleware, min_size=config.COMPRESSION_MIN_SIZE)
 
-# Initialize AI model (will be loaded on startup)
-granite_model = None
+# Static files: read, fingerprinted and precompressed once at startup
+app.state.static_assets = StaticAssets("app/static")
+app.mount("/static", app.state.static_assets, name="static")
 
-from fastapi import Request
-from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
+# Shared templates; pages that do not depend on the request are rendered once
+templates.env.globals["static_url"] = app.state.static_assets.url
+app.state.static_pages = StaticPages(
+    templates, ["index.html", "chat.html", "feedback.html", "concern.html", "login.html"]
+)
+app.state.static_pages.render()
 
-templates = Jinja2Templates(directory="app/templates")
-
-@app.get("/", response_class=HTMLResponse)
-async def home(request: Request):
-    return templates.TemplateResponse("index.html", {"request": request})
+# Initialize AI model (will be loaded on startup)
+granite_model = None
 
+# With shared state every worker rebuilds its stores from the shared log, so per-worker
+# files (write-ahead log, chat segments, search index) are not written
+SHARED_STATE = bool(config.SHARED_STATE_PATH)
 
 # In-memory storage for demo purposes
-app.state.users = {"admin": {"password": "admin123", "role": "admin"}}
-app.state.sessions = {}
-app.state.feedback_data = []
-app.state.concerns = []
-app.state.chat_history = []
+app.state.users = {
+    "admin": {"password_hash": config.ADMIN_PASSWORD_HASH or hash_password("admin123"), "role": "admin"}
+}
+app.state.password_verifier = PasswordVerifier(
+    max_workers=config.AUTH_HASH_WORKERS,
+    max_pending=config.AUTH_MAX_PENDING,
+    cache_ttl=config.AUTH_CACHE_TTL_SECONDS
+)
+app.state.login_limiter = RateLimiter(
+    capacity=config.LOGIN_BURST,
+    rate=config.LOGIN_PER_MINUTE / 60
+)
+app.state.client_limiter = RateLimiter(
+    capacity=config.CLIENT_BURST,
+    rate=config.CLIENT_PER_MINUTE / 60
+)
+app.state.admission = AdmissionController(
+    max_concurrent=config.ADMISSION_MAX_CONCURRENT,
+    slo_ms=config.ADMISSION_SLO_MS
+)
+app.state.degradation = DegradationController(
+    latency_high_ms=config.DEGRADE_LATENCY_HIGH_MS,
+    latency_low_ms=config.DEGRADE_LATENCY_LOW_MS,
+    queue_high=config.DEGRADE_QUEUE_HIGH,
+    queue_low=config.DEGRADE_QUEUE_LOW,
+    min_hold_seconds=config.DEGRADE_MIN_HOLD_SECONDS
+)
+app.state.sessions = create_session_store()
+app.state.feedback_data = create_feedback_store()
+app.state.concerns = create_concern_store()
+app.state.concern_dedup = ConcernDeduplicator(
+    app.state.concerns,
+    num_perm=config.CONCERN_DEDUP_PERMUTATIONS,
+    bands=config.CONCERN_DEDUP_BANDS,
+    threshold=config.CONCERN_DEDUP_THRESHOLD
+)
+app.state.workflow = ConcernWorkflow(app.state.concerns)
+app.state.triage = TriagePipeline(
+    app.state.concerns,
+    batch_size=config.TRIAGE_BATCH_SIZE,
+    max_delay_ms=config.TRIAGE_MAX_DELAY_MS
+)
+app.state.exporter = ColumnarExporter(config.EXPORT_DIR)
+app.state.chat_history = ChatHistoryStore(
+    hot_size=config.CHAT_HISTORY_HOT_SIZE,
+    segment_size=config.CHAT_HISTORY_SEGMENT_SIZE,
+    spill_dir=None if SHARED_STATE else config.CHAT_HISTORY_DIR or None,
+    retention_days=config.CHAT_HISTORY_RETENTION_DAYS
+)
+# Rebuilds the stores above from snapshot + write-ahead log at startup (when enabled)
+app.state.persistence = Persistence(
+    None if SHARED_STATE else config.PERSISTENCE_DIR,
+    app.state,
+    commit_delay_ms=config.WAL_COMMIT_DELAY_MS
+)
+# Records, conversations and metrics shared with the other web workers (when configured)
+app.state.shared = SharedState(
+    config.SHARED_STATE_PATH,
+    app.state,
+    heartbeat_seconds=config.SHARED_HEARTBEAT_SECONDS,
+    lease_seconds=config.SHARED_LEASE_SECONDS,
+    conversation_ttl=config.CONVERSATION_TTL_SECONDS
+)
+if SHARED_STATE:
+    app.add_middleware(SharedStateMiddleware, shared=app.state.shared)
+# Replaced by the saved index at startup
+app.state.search_index = SearchIndex(app.state.concerns, app.state.feedback_data, app.state.chat_history)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize the AI model on startup"""
     global granite_model
+    persistence = app.state.persistence
+    if persistence.enabled:
+        persistence.recover()
+        app.state.concern_dedup.rebuild()
+        asyncio.create_task(persistence.wal.run())
+        if config.SNAPSHOT_INTERVAL_SECONDS > 0:
+            asyncio.create_task(periodic_snapshot())
+    # Indexes catch up with recovered records; triage works through them in the background
+    app.state.search_index = SearchIndex.open(
+        None if SHARED_STATE else config.SEARCH_INDEX_PATH,
+        app.state.concerns, app.state.feedback_data, app.state.chat_history
+    )
+    shared = app.state.shared
+    if shared.enabled:
+        shared.open()
+        shared.recover()
+    if not config.MODEL_ENABLED:
+        # Fallback engine only: torch and transformers are never imported
+        granite_model = GraniteModel()
+        app.state.granite_model = granite_model
+        print("Model disabled, serving knowledge-base answers")
+    else:
+        await load_granite_model()
+    if shared.enabled:
+        granite_model.conversations.shared = shared
+        if config.MODEL_ENABLED and not config.REMOTE_MODEL_URL:
+            print("Shared state: every web worker loads its own model; "
+                  "set CITIZEN_AI_REMOTE_MODEL_URL to share one model server")
+        asyncio.create_task(shared.run(worker_stats))
+    if config.KNOWLEDGE_RELOAD_SECONDS > 0:
+        asyncio.create_task(granite_model.corpus.watch(config.KNOWLEDGE_RELOAD_SECONDS))
+    if config.ANSWER_REFRESH_SECONDS > 0:
+        # Regeneration needs a model; it runs in its own process, never in this one,
+        # and only once the serving model has loaded
+        regenerate = config.ANSWER_AUTO_REGENERATE and config.MODEL_ENABLED
+        asyncio.create_task(granite_model.answers.maintain(
+            config.ANSWER_REFRESH_SECONDS,
+            regenerate,
+            leader=shared.is_leader,
+            ready=lambda: app.state.granite_model.model is not None
+        ))
+    if config.EXPORT_INTERVAL_SECONDS > 0:
+        asyncio.create_task(periodic_export())
+    asyncio.create_task(sweep_sessions())
+    asyncio.create_task(app.state.triage.run())
+    if config.SEARCH_INDEX_PATH and config.SEARCH_SAVE_INTERVAL_SECONDS > 0 and not SHARED_STATE:
+        asyncio.create_task(periodic_index_save())
+
+async def load_granite_model():
+    """Load the model in-process or start the worker pool"""
+    global granite_model
     print("Loading IBM Granite model...")
-    granite_model = GraniteModel()
+    if config.REMOTE_MODEL_URL:
+        from app.remote_model import RemoteGraniteModel
+        granite_model = RemoteGraniteModel(
+            config.REMOTE_MODEL_URL,
+            model_name=config.REMOTE_MODEL_NAME or None,
+            api_key=config.REMOTE_MODEL_API_KEY,
+            max_connections=config.REMOTE_MAX_CONNECTIONS,
+            timeout=config.REMOTE_TIMEOUT,
+            connect_timeout=config.REMOTE_CONNECT_TIMEOUT,
+            retries=config.REMOTE_RETRIES,
+            breaker_failures=config.REMOTE_BREAKER_FAILURES,
+            breaker_reset=config.REMOTE_BREAKER_RESET_SECONDS,
+            http2=config.REMOTE_HTTP2,
+            stream=config.REMOTE_STREAM,
+            health_interval=config.MODEL_HEALTH_INTERVAL
+        )
+    elif config.MODEL_WORKERS > 0:
+        from app.model_server import ModelWorkerPool
+        granite_model = ModelWorkerPool(
+            workers=config.MODEL_WORKERS,
+            socket_dir=config.MODEL_SOCKET_DIR,
+            routing=config.MODEL_ROUTING,
+            request_timeout=config.MODEL_REQUEST_TIMEOUT,
+            health_interval=config.MODEL_HEALTH_INTERVAL
+        )
+    else:
+        granite_model = GraniteModel()
     await granite_model.load_model()
     app.state.granite_model = granite_model
     print("Model loaded successfully!")
 
+def worker_stats() -> Dict:
+    """This worker's counters, published to the other workers with shared state"""
+    return {
+        "admission": app.state.admission.stats(),
+        "degradation": app.state.degradation.stats(),
+        "generation": granite_model.get_generation_stats(),
+        "precomputed_answers": granite_model.answers.counts,
+        "remote_model": getattr(granite_model, "remote_status", dict)()
+    }
+
+async def sweep_sessions():
+    """Drop expired sessions in the background (lookups also expire lazily)"""
+    while True:
+        await asyncio.sleep(config.SESSION_SWEEP_SECONDS)
+        try:
+            await app.state.sessions.run(app.state.sessions.sweep)
+        except Exception as e:
+            print(f"Error sweeping sessions: {e}")
+
+async def periodic_export():
+    """Append new records to the columnar export in the background"""
+    while True:
+        await asyncio.sleep(config.EXPORT_INTERVAL_SECONDS)
+        if not app.state.shared.is_leader():
+            continue  # another worker exports the same records
+        try:
+            await asyncio.to_thread(app.state.exporter.export_new, app.state)
+        except ExportUnavailable:
+            return
+        except Exception as e:
+            print(f"Error exporting analytics data: {e}")
+
+async def periodic_index_save():
+    """Write the search index to disk when it has changed"""
+    while True:
+        await asyncio.sleep(config.SEARCH_SAVE_INTERVAL_SECONDS)
+        index = app.state.search_index
+        if index.version == index.saved_version:
+            continue
+        try:
+            await asyncio.to_thread(index.save, config.SEARCH_INDEX_PATH)
+        except Exception as e:
+            print(f"Error saving search index: {e}")
+
+async def periodic_snapshot():
+    """Snapshot the stores and drop the write-ahead log segments it covers"""
+    while True:
+        await asyncio.sleep(config.SNAPSHOT_INTERVAL_SECONDS)
+        try:
+            await app.state.persistence.snapshot()
+        except Exception as e:
+            print(f"Error writing snapshot: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Persist buffered chat history, a final snapshot and the search index on shutdown"""
+    await app.state.persistence.close()
+    app.state.chat_history.flush()
+    if config.SEARCH_INDEX_PATH and not SHARED_STATE:
+        app.state.search_index.save(config.SEARCH_INDEX_PATH)
+    app.state.shared.close()
+    app.state.password_verifier.shutdown()
+    if hasattr(granite_model, "shutdown"):
+        await granite_model.shutdown()
+
 @app.get("/", response_class=HTMLResponse)
 async def home(request: Request):
     """Home page"""
-    return templates.TemplateResponse("index.html", {"request": request})
+    return request.app.state.static_pages.response(request, "index.html")
 
 # Include routers
 app.include_router(auth_router, prefix="/auth", tags=["authentication"])
@@ -69,4 +295,5 @@ app.include_router(concern_router, prefix="/concern", tags=["concerns"])
 app.include_router(dashboard_router, prefix="/dashboard", tags=["dashboard"])
 
 if __name__ == "__main__":
+    import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
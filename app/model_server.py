@@ -0,0 +1,351 @@
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import struct
+import zlib
+import time
+from typing import Dict, List, Optional
+
+from app import config
+from app.ai_model import GraniteModel
+
+# Frame: request id (uint32), opcode/status (uint8), payload length (uint32), JSON payload
+HEADER = struct.Struct("!IBI")
+
+OP_PING = 0
+OP_CHAT = 1
+OP_SENTIMENT = 2
+OP_STATS = 3
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+# Longest wait before respawning a worker that keeps dying
+MAX_RESTART_BACKOFF = 300.0
+
+
+async def read_frame(reader: asyncio.StreamReader):
+    header = await reader.readexactly(HEADER.size)
+    request_id, code, length = HEADER.unpack(header)
+    payload = json.loads(await reader.readexactly(length)) if length else None
+    return request_id, code, payload
+
+
+def encode_frame(request_id: int, code: int, payload) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return HEADER.pack(request_id, code, len(body)) + body
+
+
+# Worker process
+
+def worker_main(socket_path: str, torch_threads: int):
+    """Entry point of a model worker process: load a replica and serve requests"""
+    if torch_threads > 0:
+        import torch
+        torch.set_num_threads(torch_threads)
+    asyncio.run(_serve(socket_path))
+
+
+async def _serve(socket_path: str):
+    model = GraniteModel()
+    await model.load_model()
+    if config.KNOWLEDGE_RELOAD_SECONDS > 0:
+        asyncio.create_task(model.corpus.watch(config.KNOWLEDGE_RELOAD_SECONDS))
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        # Requests on a connection are answered in order, each awaited before
+        # the next frame is read, so each replica runs one generation at a time
+        try:
+            while True:
+                request_id, op, payload = await read_frame(reader)
+                try:
+                    if op == OP_CHAT:
+                        result = await model.chat_response(payload["query"], payload.get("session_id"))
+                    elif op == OP_SENTIMENT:
+                        result = await model.analyze_sentiment(payload["text"])
+                    elif op == OP_STATS:
+                        result = {"generation": model.get_generation_stats(), "languages": model.normalizer.outcomes}
+                    else:
+                        result = {"loaded": model.model is not None, "pid": os.getpid()}
+                    writer.write(encode_frame(request_id, STATUS_OK, result))
+                except Exception as e:
+                    writer.write(encode_frame(request_id, STATUS_ERROR, str(e)))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    server = await asyncio.start_unix_server(handle, path=socket_path)
+    async with server:
+        await server.serve_forever()
+
+
+# Dispatcher side
+
+class WorkerHandle:
+    """Connection to one worker process and its in-flight requests"""
+
+    def __init__(self, index: int, socket_path: str):
+        self.index = index
+        self.socket_path = socket_path
+        self.process = None
+        self.reader = None
+        self.writer = None
+        self.reader_task = None
+        self.pending = {}
+        self.request_ids = itertools.count(1)
+        self.ready = False
+        self.loaded = False
+        self.restarting = None  # restart task in progress
+        self.backoff = 0.0  # wait before the next respawn; doubles until a health check passes
+        self.restarts = 0
+        self.completed = 0
+        self.stats = {}
+        self.outcomes = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self.pending)
+
+    async def connect(self):
+        self.reader, self.writer = await asyncio.open_unix_connection(self.socket_path)
+        self.reader_task = asyncio.create_task(self._read_responses(self.reader, self.writer))
+
+    async def _read_responses(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request_id, status, payload = await read_frame(reader)
+                future = self.pending.pop(request_id, None)
+                if future is None or future.done():
+                    continue
+                self.completed += 1
+                if status == STATUS_OK:
+                    future.set_result(payload)
+                else:
+                    future.set_exception(RuntimeError(payload))
+        except (asyncio.IncompleteReadError, ConnectionError, OSError):
+            pass
+        finally:
+            # A restart may already have replaced this connection
+            if self.writer is writer:
+                self.disconnect(ConnectionError(f"Model worker {self.index} disconnected"))
+
+    def disconnect(self, error: Exception):
+        self.ready = False
+        for future in self.pending.values():
+            if not future.done():
+                future.set_exception(error)
+        self.pending.clear()
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+    async def call(self, op: int, payload, timeout: float):
+        if self.writer is None:
+            raise ConnectionError(f"Model worker {self.index} is not connected")
+        request_id = next(self.request_ids)
+        future = asyncio.get_running_loop().create_future()
+        self.pending[request_id] = future
+        self.writer.write(encode_frame(request_id, op, payload))
+        await self.writer.drain()
+        try:
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self.pending.pop(request_id, None)
+
+
+class ModelWorkerPool(GraniteModel):
+    """GraniteModel that runs generation in N worker processes
+
+    Each worker owns a model replica and a share of the CPU threads. The
+    web process only keeps the cheap fallback/keyword paths; generation
+    requests go over a Unix socket to the least-loaded (or next) healthy
+    worker. Chat turns of one conversation stick to the same worker while it
+    is healthy, so that worker's KV cache for the conversation is reused.
+    A supervisor task restarts workers that die or stop answering, each in
+    its own task with exponential backoff, so one failing worker does not
+    hold up the health checks of the others.
+    Fallbacks are served locally whenever no worker can take the request.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        socket_dir: str = "/tmp",
+        routing: str = "least_loaded",
+        request_timeout: float = 120.0,
+        health_interval: float = 10.0
+    ):
+        super().__init__()
+        self.routing = routing
+        self.request_timeout = request_timeout
+        self.health_interval = health_interval
+        self.torch_threads = max(1, (os.cpu_count() or 1) // workers)
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = [
+            WorkerHandle(i, os.path.join(socket_dir, f"citizen-ai-model-{os.getpid()}-{i}.sock"))
+            for i in range(workers)
+        ]
+        self.round_robin = itertools.cycle(range(workers))
+        self.supervisor = None
+
+    async def load_model(self):
+        """Start the worker processes and wait for their models to load"""
+        for worker in self.workers:
+            self._spawn(worker)
+        await asyncio.gather(*(self._wait_ready(worker, timeout=600) for worker in self.workers))
+        self._update_model_flag()
+        self.supervisor = asyncio.create_task(self._supervise())
+        print(f"Model worker pool ready: {sum(w.ready for w in self.workers)}/{len(self.workers)} workers, "
+              f"{self.torch_threads} torch threads each")
+
+    def _spawn(self, worker: WorkerHandle):
+        if os.path.exists(worker.socket_path):
+            os.remove(worker.socket_path)
+        worker.process = self.context.Process(
+            target=worker_main,
+            args=(worker.socket_path, self.torch_threads),
+            name=f"model-worker-{worker.index}",
+            daemon=True
+        )
+        worker.process.start()
+
+    async def _wait_ready(self, worker: WorkerHandle, timeout: float):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline and worker.process.is_alive():
+            if os.path.exists(worker.socket_path):
+                try:
+                    await worker.connect()
+                    status = await worker.call(OP_PING, None, timeout=10)
+                    worker.loaded = status["loaded"]
+                    worker.ready = True
+                    return
+                except (OSError, asyncio.TimeoutError):
+                    worker.disconnect(ConnectionError("connect failed"))
+            await asyncio.sleep(0.5)
+        print(f"Model worker {worker.index} failed to start")
+
+    def _update_model_flag(self):
+        # Routes check `model is None` to go straight to the fallback path
+        self.model = "worker-pool" if any(w.ready and w.loaded for w in self.workers) else None
+
+    async def _supervise(self):
+        while True:
+            await asyncio.sleep(self.health_interval)
+            for worker in self.workers:
+                if worker.restarting is not None:
+                    continue
+                if not worker.process.is_alive() or not worker.ready:
+                    self._schedule_restart(worker)
+                elif worker.in_flight == 0:
+                    # Only ping idle workers: a busy one answers after its generation
+                    try:
+                        stats = await worker.call(OP_STATS, None, timeout=10)
+                        worker.stats, worker.outcomes = stats["generation"], stats["languages"]
+                        worker.backoff = 0.0
+                    except (asyncio.TimeoutError, ConnectionError, RuntimeError):
+                        self._schedule_restart(worker)
+            self._update_model_flag()
+
+    def _schedule_restart(self, worker: WorkerHandle):
+        worker.ready = False
+        worker.restarting = asyncio.create_task(self._restart(worker))
+
+    async def _restart(self, worker: WorkerHandle):
+        try:
+            worker.disconnect(ConnectionError(f"Model worker {worker.index} restarting"))
+            if worker.process.is_alive():
+                worker.process.kill()
+                await asyncio.to_thread(worker.process.join, 5)
+            if worker.backoff:
+                print(f"Restarting model worker {worker.index} in {worker.backoff:g}s")
+                await asyncio.sleep(worker.backoff)
+            else:
+                print(f"Restarting model worker {worker.index}")
+            worker.backoff = min(max(worker.backoff * 2, self.health_interval), MAX_RESTART_BACKOFF)
+            worker.restarts += 1
+            self._spawn(worker)
+            await self._wait_ready(worker, timeout=600)
+            self._update_model_flag()
+        finally:
+            worker.restarting = None
+
+    def _pick_worker(self, affinity: Optional[str] = None) -> Optional[WorkerHandle]:
+        healthy = [w for w in self.workers if w.ready and w.loaded]
+        if not healthy:
+            return None
+        if affinity is not None:
+            worker = self.workers[zlib.crc32(affinity.encode("utf-8")) % len(self.workers)]
+            if worker in healthy:
+                return worker
+        if self.routing == "round_robin":
+            for _ in range(len(self.workers)):
+                worker = self.workers[next(self.round_robin)]
+                if worker in healthy:
+                    return worker
+        return min(healthy, key=lambda w: w.in_flight)
+
+    async def _dispatch(self, op: int, payload: Dict, affinity: Optional[str] = None):
+        worker = self._pick_worker(affinity)
+        if worker is None:
+            raise ConnectionError("No model worker available")
+        return await worker.call(op, payload, self.request_timeout)
+
+    async def chat_response(self, user_query: str, session_id: Optional[str] = None) -> str:
+        try:
+            response = await self._dispatch(OP_CHAT, {"query": user_query, "session_id": session_id}, affinity=session_id)
+        except (ConnectionError, asyncio.TimeoutError, RuntimeError) as e:
+            print(f"Model worker error, using fallback: {e}")
+            return self.fallback_answer(user_query)
+        # The worker counts how it answered (model, fallback, ...); see language_stats
+        return response
+
+    async def analyze_sentiment(self, text: str) -> str:
+        try:
+            sentiment = await self._dispatch(OP_SENTIMENT, {"text": text})
+        except (ConnectionError, asyncio.TimeoutError, RuntimeError) as e:
+            print(f"Model worker error, using fallback: {e}")
+            return self.keyword_sentiment(text)
+        return sentiment
+
+    def get_generation_stats(self) -> Dict[str, int]:
+        """Generation counters summed over workers (as of the last health check)"""
+        totals = {}
+        for worker in self.workers:
+            for key, value in worker.stats.items():
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def language_stats(self) -> Dict:
+        """Language outcomes of this process plus the workers' (as of the last health check)"""
+        return self.normalizer.stats([worker.outcomes for worker in self.workers])
+
+    def worker_status(self) -> List[Dict]:
+        return [{
+            "index": w.index,
+            "pid": w.process.pid if w.process else None,
+            "alive": bool(w.process and w.process.is_alive()),
+            "ready": w.ready,
+            "model_loaded": w.loaded,
+            "in_flight": w.in_flight,
+            "completed": w.completed,
+            "restarts": w.restarts
+        } for w in self.workers]
+
+    async def shutdown(self):
+        if self.supervisor is not None:
+            self.supervisor.cancel()
+        for worker in self.workers:
+            if worker.restarting is not None:
+                worker.restarting.cancel()
+            worker.disconnect(ConnectionError("Model worker pool shutting down"))
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+                await asyncio.to_thread(worker.process.join, 5)
+            if os.path.exists(worker.socket_path):
+                os.remove(worker.socket_path)
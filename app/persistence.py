@@ -0,0 +1,428 @@
+import asyncio
+import json
+import os
+import struct
+import sys
+import time
+import zlib
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+from app.records import ColumnarStore
+from app.sessions import MemorySessionStore
+
+FORMAT_VERSION = 1
+SNAPSHOT_NAME = "snapshot.bin"
+
+# Log record: LSN, payload length, CRC-32 of the payload, then the JSON payload
+_RECORD = struct.Struct("<QII")
+
+
+def _segment_name(first_lsn: int) -> str:
+    return f"wal-{first_lsn:016d}.log"
+
+
+def _fsync_directory(directory: str):
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # not supported on every platform
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class WriteAheadLog:
+    """Append-only mutation log with group commit
+
+    ``append`` frames a record and queues it; a background task writes
+    everything queued since its last pass and makes it durable with a
+    single fsync, then resolves the futures of all records in that batch.
+    While one batch is being synced, the next one collects, so under load
+    many requests share each fsync. The log is split into segment files
+    named after their first LSN so segments covered by a snapshot can be
+    deleted whole.
+    """
+
+    def __init__(self, directory: str, commit_delay_ms: float = 2.0):
+        self.directory = directory
+        self.commit_delay = commit_delay_ms / 1000
+        self.lsn = 0  # last assigned log sequence number
+        self.buffer: List = []  # framed records, or an int LSN to start a new segment at
+        self.waiters: List[asyncio.Future] = []
+        self.file = None
+        self.wakeup: Optional[asyncio.Event] = None
+        self.commits = 0
+        self.records = 0
+        self.bytes_written = 0
+
+    def segments(self) -> List[Tuple[int, str]]:
+        names = [n for n in os.listdir(self.directory) if n.startswith("wal-") and n.endswith(".log")]
+        return sorted((int(n[4:-4]), os.path.join(self.directory, n)) for n in names)
+
+    def read(self, after_lsn: int = 0):
+        """Yield (lsn, kind, data) of every intact record above ``after_lsn``
+
+        A segment is read up to its first torn or corrupt record: anything
+        after it was never acknowledged to a client. Reading continues in
+        the next segment only if it carries on from the last good LSN.
+        """
+        previous = None
+        for _, path in self.segments():
+            with open(path, "rb") as f:
+                data = f.read()
+            position = 0
+            while position < len(data):
+                if position + _RECORD.size > len(data):
+                    print(f"Ignoring a torn record at the end of {path}")
+                    break
+                lsn, length, crc = _RECORD.unpack_from(data, position)
+                start = position + _RECORD.size
+                payload = data[start:start + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    print(f"Ignoring a damaged record at the end of {path}")
+                    break
+                if previous is not None and lsn != previous + 1:
+                    print(f"Write-ahead log has a gap after LSN {previous}; stopping replay")
+                    return
+                previous = lsn
+                position = start + length
+                if lsn > after_lsn:
+                    kind, record = json.loads(payload)
+                    yield lsn, kind, record
+
+    def start(self, lsn: int):
+        """Continue the log after ``lsn`` in a fresh segment (a damaged tail is never appended to)"""
+        self.lsn = lsn
+        self.file = open(os.path.join(self.directory, _segment_name(lsn + 1)), "wb")
+        _fsync_directory(self.directory)
+        self.wakeup = asyncio.Event()
+
+    def append(self, kind: str, data) -> asyncio.Future:
+        """Queue a record; the returned future resolves once it is durable"""
+        self.lsn += 1
+        payload = json.dumps([kind, data], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        self.buffer.append(_RECORD.pack(self.lsn, len(payload), zlib.crc32(payload)) + payload)
+        return self.sync()
+
+    def sync(self) -> asyncio.Future:
+        """Future resolved once everything appended so far is durable"""
+        future = asyncio.get_running_loop().create_future()
+        self.waiters.append(future)
+        self.wakeup.set()
+        return future
+
+    def rotate(self):
+        """Start a new segment with the next record"""
+        self.buffer.append(self.lsn + 1)
+        self.wakeup.set()
+
+    def _write(self, items: List) -> int:
+        chunk = []
+        for item in items:
+            if isinstance(item, int):
+                self._flush(chunk)
+                chunk = []
+                self._open_segment(item)
+            else:
+                chunk.append(item)
+        self._flush(chunk)
+        return sum(1 for item in items if not isinstance(item, int))
+
+    def _flush(self, chunk: List[bytes]):
+        if not chunk:
+            return
+        data = b"".join(chunk)
+        self.file.write(data)
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.records += len(chunk)
+        self.bytes_written += len(data)
+
+    def _open_segment(self, first_lsn: int):
+        path = os.path.join(self.directory, _segment_name(first_lsn))
+        if os.path.basename(self.file.name) == os.path.basename(path):
+            return
+        self.file.close()
+        self.file = open(path, "wb")
+        _fsync_directory(self.directory)
+
+    async def run(self):
+        """Background task: write and fsync queued records in batches"""
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            if self.commit_delay:
+                # Give concurrent requests a moment to join this batch
+                await asyncio.sleep(self.commit_delay)
+            items, waiters = self.buffer, self.waiters
+            self.buffer, self.waiters = [], []
+            try:
+                written = await asyncio.to_thread(self._write, items)
+            except Exception as e:
+                print(f"Error writing the write-ahead log: {e}")
+                for waiter in waiters:
+                    if not waiter.done():
+                        waiter.set_exception(e)
+                continue
+            if written:
+                self.commits += 1
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(None)
+
+    def prune(self, lsn: int) -> int:
+        """Delete segments holding only records at or below ``lsn``"""
+        segments = self.segments()
+        removed = 0
+        for (_, path), (next_first, _) in zip(segments, segments[1:]):
+            if next_first <= lsn + 1:
+                os.remove(path)
+                removed += 1
+        return removed
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+    def stats(self) -> Dict:
+        return {
+            "lsn": self.lsn,
+            "records": self.records,
+            "commits": self.commits,
+            "records_per_commit": round(self.records / self.commits, 2) if self.commits else None,
+            "bytes": self.bytes_written,
+            "segments": len(self.segments())
+        }
+
+
+def _dump_store(store: ColumnarStore, count: int) -> Tuple[Dict, List[bytes]]:
+    """Header entry and raw arrays of the first ``count`` records"""
+    # Columns first: labels and arena entries only grow, so they cover every copied code and offset
+    columns = [store.columns[name][:count].tobytes() for name in store.fields]
+    offsets = store.arena.offsets[:]
+    data = bytes(store.arena.data[:offsets[-1]])
+    meta = {
+        "count": count,
+        "labels": {name: list(categorical.labels) for name, categorical in store.categoricals.items()},
+        "arena": [len(offsets), len(data)]
+    }
+    return meta, columns + [offsets.tobytes(), data]
+
+
+class _Reader:
+    def __init__(self, view: memoryview):
+        self.view = view
+        self.position = 0
+
+    def take(self, typecode: str, n: int) -> array:
+        result = array(typecode)
+        size = n * result.itemsize
+        result.frombytes(self.view[self.position:self.position + size])
+        self.position += size
+        return result
+
+    def take_bytes(self, n: int) -> bytearray:
+        result = bytearray(self.view[self.position:self.position + n])
+        self.position += n
+        return result
+
+
+def _load_store(store: ColumnarStore, meta: Dict, reader: _Reader):
+    count = meta["count"]
+    for name in store.fields:
+        store.columns[name] = reader.take(store.columns[name].typecode, count)
+    n_offsets, n_data = meta["arena"]
+    store.arena.offsets = reader.take("Q", n_offsets)
+    store.arena.data = reader.take_bytes(n_data)
+    for name, labels in meta["labels"].items():
+        for label in labels:
+            store.categoricals[name].encode(label)
+    store.count = count
+    store.version += 1
+
+
+class Persistence:
+    """Crash-safe persistence of the in-memory stores: write-ahead log plus snapshots
+
+    Routes call ``log`` after each mutation and reply once it returns, so
+    every acknowledged write is on disk. A background task periodically
+    writes a compact binary snapshot (the stores' raw column arrays) and
+    deletes the log segments it covers. ``recover`` rebuilds the stores
+    from the snapshot plus the log tail.
+
+    Snapshots are taken while requests keep writing: the LSN is read
+    first, so a snapshot may already contain some later changes. Replay
+    is idempotent (records carry their ids, status events their versions),
+    so applying the log from that LSN is always correct.
+
+    With ``directory`` unset, nothing is logged and ``log`` returns at once.
+    """
+
+    def __init__(self, directory: Optional[str], state, commit_delay_ms: float = 2.0):
+        self.directory = directory or None
+        self.state = state
+        self.wal = WriteAheadLog(self.directory, commit_delay_ms) if self.directory else None
+        self.snapshot_lsn = 0
+        self.snapshots = 0
+        self.last_snapshot_seconds = None
+        self.recovery = None
+        self.snapshotting = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.wal is not None
+
+    def _stores(self) -> Dict[str, ColumnarStore]:
+        return {
+            "feedback": self.state.feedback_data,
+            "concerns": self.state.concerns,
+            "concern_events": self.state.workflow.events
+        }
+
+    def _persist_sessions(self) -> bool:
+        # Other backends keep sessions outside the process already
+        return isinstance(self.state.sessions, MemorySessionStore)
+
+    async def log(self, kind: str, data: Dict):
+        """Make a mutation durable; returns once it has been fsynced"""
+        if self.wal is None:
+            return
+        if kind.startswith("session") and not self._persist_sessions():
+            return
+        await self.wal.append(kind, data)
+
+    # Recovery
+
+    def apply(self, kind: str, data: Dict):
+        """Re-apply one logged mutation (skipped if the state already has it)"""
+        state = self.state
+        if kind in ("feedback", "concern"):
+            store = state.feedback_data if kind == "feedback" else state.concerns
+            if data["id"] > len(store):
+                store.add(data)
+        elif kind == "concern_status":
+            state.workflow.apply(data)
+        elif kind == "chat":
+            state.chat_history.restore(data)
+        elif kind == "session":
+            state.sessions.restore(data["id"], data["data"], data["created"] + state.sessions.ttl)
+        elif kind == "session_end":
+            state.sessions.delete(data["id"])
+        else:
+            print(f"Skipping unknown write-ahead log record {kind!r}")
+
+    def recover(self) -> Dict:
+        """Load the latest snapshot and replay the log after it; call before serving requests"""
+        if self.wal is None:
+            return {}
+        started = time.perf_counter()
+        os.makedirs(self.directory, exist_ok=True)
+        self.snapshot_lsn = self._load_snapshot()
+        loaded = time.perf_counter() - started
+        lsn = self.snapshot_lsn
+        replayed = 0
+        for lsn, kind, data in self.wal.read(self.snapshot_lsn):
+            self.apply(kind, data)
+            replayed += 1
+        self.wal.start(max(lsn, self.snapshot_lsn))
+        self.recovery = {
+            "snapshot_lsn": self.snapshot_lsn,
+            "replayed": replayed,
+            "snapshot_seconds": round(loaded, 3),
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+        print(
+            f"Recovered {len(self.state.feedback_data)} feedback and {len(self.state.concerns)} concerns "
+            f"(snapshot at LSN {self.snapshot_lsn}, {replayed} log records) in {self.recovery['seconds']}s"
+        )
+        return self.recovery
+
+    def _load_snapshot(self) -> int:
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        if not os.path.exists(path):
+            return 0
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+                raise RuntimeError(f"Snapshot {path} was written by an incompatible version")
+            reader = _Reader(memoryview(f.read()))
+        for name, store in self._stores().items():
+            _load_store(store, header["stores"][name], reader)
+        self.state.workflow.restore_events()
+        for entry in header["chat"]:
+            self.state.chat_history.restore(entry)
+        if self._persist_sessions():
+            for session_id, data, expires_at in header["sessions"]:
+                self.state.sessions.restore(session_id, data, expires_at)
+        return header["lsn"]
+
+    # Snapshots
+
+    async def snapshot(self):
+        """Write a snapshot if anything changed since the last one, then prune the log"""
+        if self.wal is None or self.wal.lsn == self.snapshot_lsn or self.snapshotting:
+            return
+        self.snapshotting = True
+        try:
+            lsn = self.wal.lsn
+            counts = {name: len(store) for name, store in self._stores().items()}
+            self.wal.rotate()
+            started = time.perf_counter()
+            await asyncio.to_thread(self._write_snapshot, lsn, counts)
+            self.last_snapshot_seconds = round(time.perf_counter() - started, 3)
+            self.snapshot_lsn = lsn
+            self.snapshots += 1
+            # Once the segment switch is on disk, every older segment is covered
+            await self.wal.sync()
+            await asyncio.to_thread(self.wal.prune, lsn)
+        finally:
+            self.snapshotting = False
+
+    def _write_snapshot(self, lsn: int, counts: Dict[str, int]):
+        metas = {}
+        blobs = []
+        for name, store in self._stores().items():
+            metas[name], store_blobs = _dump_store(store, counts[name])
+            blobs += store_blobs
+        header = {
+            "format": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "lsn": lsn,
+            "stores": metas,
+            "chat": self.state.chat_history.unspilled(),
+            "sessions": self.state.sessions.export() if self._persist_sessions() else []
+        }
+        path = os.path.join(self.directory, SNAPSHOT_NAME)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")
+            for blob in blobs:
+                f.write(blob)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        _fsync_directory(self.directory)
+
+    async def close(self):
+        """Flush the log and write a final snapshot (on shutdown)"""
+        if self.wal is None or self.wal.wakeup is None:
+            return
+        await self.wal.sync()
+        await self.snapshot()
+        await self.wal.sync()
+        self.wal.close()
+
+    def stats(self) -> Dict:
+        if self.wal is None:
+            return {"enabled": False}
+        return {
+            "enabled": True,
+            "wal": self.wal.stats(),
+            "snapshot_lsn": self.snapshot_lsn,
+            "snapshots": self.snapshots,
+            "last_snapshot_seconds": self.last_snapshot_seconds,
+            "recovery": self.recovery
+        }
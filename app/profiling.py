@@ -0,0 +1,225 @@
+import contextvars
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app import config
+
+# Trace of the request currently being handled (None outside a profiled request)
+_current_trace: contextvars.ContextVar = contextvars.ContextVar("current_trace", default=None)
+
+
+class Span:
+    """A named, timed phase of a request (tokenize, generate, ...)"""
+
+    __slots__ = ("name", "start", "end", "children")
+
+    def __init__(self, name: str, start: float):
+        self.name = name
+        self.start = start
+        self.end = None
+        self.children = []
+
+    def to_dict(self, origin: float) -> Dict:
+        end = self.end if self.end is not None else time.perf_counter()
+        return {
+            "name": self.name,
+            "start_ms": round((self.start - origin) * 1000, 3),
+            "duration_ms": round((end - self.start) * 1000, 3),
+            "children": [child.to_dict(origin) for child in self.children]
+        }
+
+
+class RequestTrace:
+    """Span tree and stack samples collected for a single request"""
+
+    def __init__(self, method: str, path: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.method = method
+        self.path = path
+        self.timestamp = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.duration_ms = 0.0
+        self.status_code = None
+        self.concurrent_requests = 0
+        self.root = Span(f"{method} {path}", self.start)
+        self.stack = [self.root]
+        self.samples = Counter()
+
+    def folded(self) -> str:
+        """Samples in collapsed-stack format (flamegraph.pl / speedscope)"""
+        return "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+    def summary(self) -> Dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "timestamp": self.timestamp,
+            "duration_ms": round(self.duration_ms, 3),
+            "status_code": self.status_code,
+            "concurrent_requests": self.concurrent_requests,
+            "sample_count": sum(self.samples.values())
+        }
+
+    def to_dict(self) -> Dict:
+        data = self.summary()
+        data["spans"] = self.root.to_dict(self.start)
+        data["folded"] = self.folded()
+        return data
+
+
+@contextmanager
+def span(name: str):
+    """Record a named phase inside the current request trace (no-op when not profiling)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+
+    node = Span(name, time.perf_counter())
+    trace.stack[-1].children.append(node)
+    trace.stack.append(node)
+    try:
+        yield
+    finally:
+        node.end = time.perf_counter()
+        trace.stack.pop()
+
+
+class StackSampler:
+    """Background thread sampling the event loop thread while requests are active"""
+
+    def __init__(self, interval_ms: float):
+        self.interval = interval_ms / 1000
+        self.target_thread_id = None
+        self.active = set()
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def attach(self, trace: RequestTrace):
+        with self.lock:
+            self.target_thread_id = threading.get_ident()
+            self.active.add(trace)
+            trace.concurrent_requests = max(trace.concurrent_requests, len(self.active))
+            if self.thread is None or not self.thread.is_alive():
+                self.thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+                self.thread.start()
+
+    def detach(self, trace: RequestTrace):
+        with self.lock:
+            self.active.discard(trace)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                if not self.active:
+                    # Exit while idle; the next request restarts the thread
+                    self.thread = None
+                    return
+                active = list(self.active)
+                for trace in active:
+                    trace.concurrent_requests = max(trace.concurrent_requests, len(active))
+                thread_id = self.target_thread_id
+
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                continue
+            stack = _fold_frame(frame)
+            # Every in-flight request shares the loop thread, so a sample taken while
+            # another request blocks the loop shows up in this request's profile too
+            for trace in active:
+                trace.samples[stack] += 1
+
+
+def _fold_frame(frame) -> str:
+    """Convert a frame chain into a root-first, semicolon separated stack"""
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        module = frame.f_globals.get("__name__", "?")
+        names.append(f"{module}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SlowRequestProfiler:
+    """Keeps the last N requests slower than the configured threshold"""
+
+    def __init__(self, slow_ms: float, buffer_size: int, interval_ms: float):
+        self.slow_ms = slow_ms
+        self.traces = deque(maxlen=buffer_size)
+        self.sampler = StackSampler(interval_ms)
+        self.total_requests = 0
+        self.slow_requests = 0
+
+    def start(self, method: str, path: str) -> RequestTrace:
+        trace = RequestTrace(method, path)
+        self.sampler.attach(trace)
+        return trace
+
+    def finish(self, trace: RequestTrace):
+        self.sampler.detach(trace)
+        trace.root.end = time.perf_counter()
+        trace.duration_ms = (trace.root.end - trace.start) * 1000
+        self.total_requests += 1
+        if trace.duration_ms >= self.slow_ms:
+            self.slow_requests += 1
+            self.traces.append(trace)
+
+    def get(self, trace_id: str) -> Optional[RequestTrace]:
+        return next((t for t in self.traces if t.id == trace_id), None)
+
+    def list(self) -> List[Dict]:
+        return [t.summary() for t in reversed(self.traces)]
+
+    def folded(self) -> str:
+        """Merged collapsed stacks of every captured trace"""
+        merged = Counter()
+        for trace in self.traces:
+            merged.update(trace.samples)
+        return "\n".join(f"{stack} {count}" for stack, count in merged.most_common())
+
+
+class SlowRequestMiddleware:
+    """ASGI middleware that profiles HTTP requests and keeps the slow ones"""
+
+    def __init__(self, app, profiler: SlowRequestProfiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith("/static"):
+            await self.app(scope, receive, send)
+            return
+
+        trace = self.profiler.start(scope["method"], scope["path"])
+        token = _current_trace.set(trace)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                trace.status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current_trace.reset(token)
+            self.profiler.finish(trace)
+
+
+def create_profiler() -> Optional[SlowRequestProfiler]:
+    """Build the profiler from settings, or None when profiling is disabled"""
+    if not config.PROFILING_ENABLED:
+        return None
+    return SlowRequestProfiler(
+        slow_ms=config.PROFILING_SLOW_MS,
+        buffer_size=config.PROFILING_BUFFER_SIZE,
+        interval_ms=config.PROFILING_INTERVAL_MS
+    )
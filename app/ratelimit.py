@@ -0,0 +1,53 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Tuple
+
+
+class RateLimiter:
+    """Token buckets keyed by client (username, IP, session, ...)
+
+    Each key holds up to ``capacity`` tokens refilled at ``rate`` tokens per
+    second. Idle buckets are evicted LRU-first once ``max_keys`` is reached;
+    an evicted bucket simply starts full again.
+    """
+
+    def __init__(self, capacity: float, rate: float, max_keys: int = 100000):
+        self.capacity = capacity
+        self.rate = rate
+        self.max_keys = max_keys
+        self.buckets = OrderedDict()  # key -> (tokens, updated_at)
+        self.lock = threading.Lock()
+        self.rejected = 0
+
+    def _refill(self, key: str, now: float) -> float:
+        tokens, updated_at = self.buckets.get(key, (self.capacity, now))
+        return min(self.capacity, tokens + (now - updated_at) * self.rate)
+
+    def allow(self, key: str, cost: float = 1.0) -> bool:
+        """Take ``cost`` tokens from the key's bucket if available"""
+        allowed, _ = self.acquire(key, cost)
+        return allowed
+
+    def acquire(self, key: str, cost: float = 1.0) -> Tuple[bool, float]:
+        """Like ``allow`` but also returns seconds until the request would succeed"""
+        now = time.monotonic()
+        with self.lock:
+            tokens = self._refill(key, now)
+            if tokens >= cost:
+                tokens -= cost
+                retry_after = 0.0
+                allowed = True
+            else:
+                retry_after = (cost - tokens) / self.rate if self.rate > 0 else float("inf")
+                allowed = False
+                self.rejected += 1
+            self.buckets[key] = (tokens, now)
+            self.buckets.move_to_end(key)
+            while len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        return allowed, retry_after
+
+    def reset(self, key: str):
+        with self.lock:
+            self.buckets.pop(key, None)
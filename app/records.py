@@ -0,0 +1,225 @@
+from array import array
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional, Tuple
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def naive_local(timestamp: datetime) -> datetime:
+    """Records hold naive local times; timezone-aware datetimes are converted to that"""
+    if timestamp.tzinfo is not None:
+        return timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+
+def to_epoch_us(timestamp) -> int:
+    """Datetime / ISO string -> integer microseconds (exact round trip for naive values)"""
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    return (naive_local(timestamp) - _EPOCH) // _MICROSECOND
+
+
+def from_epoch_us(value: int) -> datetime:
+    return _EPOCH + timedelta(microseconds=value)
+
+
+def iso_from_epoch_us(value: int) -> str:
+    return from_epoch_us(value).isoformat()
+
+
+class Categorical:
+    """Enum table mapping repeated labels ("Positive", "Open", ...) to small ints"""
+
+    def __init__(self, labels: Tuple[str, ...] = ()):
+        self.labels = []
+        self.codes = {}
+        for label in labels:
+            self.encode(label)
+
+    def encode(self, label: str) -> int:
+        code = self.codes.get(label)
+        if code is None:
+            code = len(self.labels)
+            if code > 0xFFFF:
+                raise ValueError("Too many distinct categorical values")
+            self.labels.append(label)
+            self.codes[label] = code
+        return code
+
+    def decode(self, code: int) -> str:
+        return self.labels[code]
+
+
+# Known values are pre-registered so codes are stable across processes
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+STATUSES = ("Open", "Assigned", "In Progress", "Resolved", "Closed")
+PRIORITIES = ("Low", "Medium", "High", "Critical")
+CATEGORIES = ("Infrastructure", "Public Services", "Healthcare", "Education",
+              "Transportation", "Environment", "Safety", "Administrative", "Other")
+
+
+class TextArena:
+    """Append-only UTF-8 text storage: one bytearray plus an offset table"""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = array("Q", [0])
+
+    def add(self, text: str) -> int:
+        self.data += text.encode("utf-8")
+        self.offsets.append(len(self.data))
+        return len(self.offsets) - 2
+
+    def get(self, index: int) -> str:
+        return self.data[self.offsets[index]:self.offsets[index + 1]].decode("utf-8")
+
+    def nbytes(self) -> int:
+        return len(self.data) + self.offsets.itemsize * len(self.offsets)
+
+
+class ColumnarStore:
+    """List-like columnar record store that speaks the same dicts as before
+
+    ``schema`` is a sequence of ``(field, kind)`` pairs where kind is "text",
+    "int", "timestamp" or a tuple of known labels for a categorical field. Record ids
+    are implicit (position + 1), matching the previous ``len(list) + 1`` ids.
+    """
+
+    def __init__(self, schema: Tuple[Tuple[str, object], ...]):
+        self.schema = schema
+        self.fields = [name for name, _ in schema]
+        self.kinds = dict(schema)
+        self.arena = TextArena()
+        self.columns = {}
+        self.categoricals = {}
+        for name, kind in schema:
+            if kind == "text":
+                self.columns[name] = array("I")
+            elif kind in ("int", "timestamp"):
+                self.columns[name] = array("q")
+            else:
+                self.categoricals[name] = Categorical(kind)
+                self.columns[name] = array("H")
+        self.count = 0
+        self.version = 0  # bumped on every change, for cache invalidation
+
+    def append(self, record: Dict) -> Dict:
+        """Store a record (without id) and return it with its assigned id"""
+        return self.row(self.add(record) - 1)
+
+    def add(self, record: Dict) -> int:
+        """Store a record (without id) and return only its id"""
+        for name, kind in self.schema:
+            value = record[name]
+            if kind == "text":
+                self.columns[name].append(self.arena.add(value))
+            elif kind == "int":
+                self.columns[name].append(value)
+            elif kind == "timestamp":
+                self.columns[name].append(to_epoch_us(value))
+            else:
+                self.columns[name].append(self.categoricals[name].encode(value))
+        self.count += 1
+        self.version += 1
+        return self.count
+
+    def update(self, record_id: int, field: str, value):
+        """Update a single field of a stored record"""
+        index = record_id - 1
+        if field in self.categoricals:
+            self.columns[field][index] = self.categoricals[field].encode(value)
+        elif self.kinds[field] == "int":
+            self.columns[field][index] = value
+        elif self.kinds[field] == "timestamp":
+            self.columns[field][index] = to_epoch_us(value)
+        else:
+            self.columns[field][index] = self.arena.add(value)
+        self.version += 1
+
+    def _decode(self, name: str, kind, value):
+        if kind == "text":
+            return self.arena.get(value)
+        if kind == "int":
+            return value
+        if kind == "timestamp":
+            return iso_from_epoch_us(value)
+        return self.categoricals[name].decode(value)
+
+    def row(self, index: int) -> Dict:
+        record = {"id": index + 1}
+        for name, kind in self.schema:
+            record[name] = self._decode(name, kind, self.columns[name][index])
+        return record
+
+    def value(self, record_id: int, field: str):
+        """One field of a record, without decoding the rest of the row"""
+        return self._decode(field, self.kinds[field], self.columns[field][record_id - 1])
+
+    def get(self, record_id: int) -> Optional[Dict]:
+        if 1 <= record_id <= self.count:
+            return self.row(record_id - 1)
+        return None
+
+    def __len__(self):
+        return self.count
+
+    def __bool__(self):
+        return self.count > 0
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(self.count):
+            yield self.row(index)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self.row(i) for i in range(*key.indices(self.count))]
+        if key < 0:
+            key += self.count
+        if not 0 <= key < self.count:
+            raise IndexError("record index out of range")
+        return self.row(key)
+
+    def counts(self, field: str) -> Dict[str, int]:
+        """Value counts of a categorical field without materializing rows"""
+        categorical = self.categoricals[field]
+        return {categorical.decode(code): n for code, n in Counter(self.columns[field]).items()}
+
+    def count_since(self, since: datetime, field: str = "timestamp") -> int:
+        threshold = to_epoch_us(since)
+        return sum(1 for value in self.columns[field] if value > threshold)
+
+    def nbytes(self) -> int:
+        """Approximate payload size of all columns and the text arena"""
+        return self.arena.nbytes() + sum(
+            column.itemsize * len(column) for column in self.columns.values()
+        )
+
+    def to_list(self) -> List[Dict]:
+        return list(self)
+
+
+FEEDBACK_SCHEMA = (
+    ("text", "text"),
+    ("sentiment", SENTIMENTS),
+    ("timestamp", "timestamp"),
+)
+
+CONCERN_SCHEMA = (
+    ("title", "text"),
+    ("description", "text"),
+    ("category", CATEGORIES),
+    ("priority", PRIORITIES),
+    ("sentiment", SENTIMENTS),
+    ("status", STATUSES),
+    ("timestamp", "timestamp"),
+)
+
+
+def create_feedback_store() -> ColumnarStore:
+    return ColumnarStore(FEEDBACK_SCHEMA)
+
+
+def create_concern_store() -> ColumnarStore:
+    return ColumnarStore(CONCERN_SCHEMA)
@@ -0,0 +1,375 @@
+import asyncio
+import json
+import random
+import time
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from app.ai_model import (
+    CITIZEN_SYSTEM_PROMPT, GENERIC_INDICATORS, MAX_PROMPT_TOKENS, SENTIMENT_LABELS, SENTIMENT_PROMPT,
+    GraniteModel, PromptTemplate
+)
+from app.conversation import Conversation
+from app.profiling import span
+
+# HTTP/2 needs the optional h2 package (pip install "httpx[http2]")
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Overloaded or restarting server: worth another try after a pause
+RETRY_STATUS = frozenset((429, 502, 503, 504))
+
+# Errors before the request reached the model (or a dropped keep-alive connection) are safe to retry
+RETRY_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout, httpx.RemoteProtocolError)
+
+# No tokenizer in the web tier: conversation prompts are budgeted by characters
+CHARS_PER_TOKEN = 4
+
+
+class RemoteModelError(Exception):
+    """The model server did not produce a response"""
+
+
+class _ServerBusy(RemoteModelError):
+    pass
+
+
+class CircuitBreaker:
+    """Stops sending requests to a model server that keeps failing
+
+    Closed: requests pass and consecutive failures are counted. After
+    ``failure_threshold`` failures the breaker opens and requests are
+    answered from the local fallback right away. After ``reset_seconds``
+    one probe request is let through (half-open); its success closes the
+    breaker, its failure opens it again.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_seconds: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.opens = 0
+
+    def allow(self) -> bool:
+        if self.state == "closed":
+            return True
+        if self.state == "open":
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.state = "half_open"
+        if self.probing:
+            return False
+        self.probing = True
+        return True
+
+    def success(self):
+        self.state = "closed"
+        self.failures = 0
+        self.probing = False
+
+    def failure(self):
+        self.probing = False
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def trip(self):
+        """Open the breaker now"""
+        if self.state != "open":
+            self.opens += 1
+        self.state = "open"
+        self.opened_at = time.monotonic()
+
+
+class RemoteGraniteModel(GraniteModel):
+    """GraniteModel that generates on a remote OpenAI-compatible model server
+
+    For vLLM, TGI or any server with ``/v1/chat/completions``, so the web
+    tier and inference scale separately. One pooled ``httpx.AsyncClient``
+    keeps connections alive between requests; with HTTP/2 (when ``h2`` is
+    installed) concurrent requests are multiplexed over the same
+    connections instead of each needing its own.
+
+    Connection failures, dropped keep-alive connections and overload
+    responses (429/502/503/504) are retried with exponential backoff and
+    full jitter; read timeouts are not, so a slow server is not sent the
+    same work again. Repeated failures open a circuit breaker: requests get
+    the local fallback immediately and a health check closes it again.
+
+    Answers are streamed, so an answer that is going off track is cut off
+    (closing the stream stops generation on the server) and a sentiment
+    label is taken as soon as it appears, as ``GenerationGuard`` does
+    in-process. Answers pass the same adequacy and confidence checks as
+    local generation; routing, knowledge-base and keyword paths are shared.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        model_name: Optional[str] = None,
+        api_key: str = "",
+        max_connections: int = 32,
+        timeout: float = 60.0,
+        connect_timeout: float = 5.0,
+        retries: int = 2,
+        retry_backoff: float = 0.25,
+        breaker_failures: int = 5,
+        breaker_reset: float = 30.0,
+        http2: bool = True,
+        stream: bool = True,
+        health_interval: float = 10.0
+    ):
+        super().__init__()
+        if model_name:
+            self.model_name = model_name
+            self.answers.model_name = model_name
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        self.http2 = http2 and HTTP2_AVAILABLE
+        if http2 and not HTTP2_AVAILABLE:
+            print('HTTP/2 requested but h2 is not installed (pip install "httpx[http2]"); using HTTP/1.1')
+        self.stream = stream
+        self.health_interval = health_interval
+        self.breaker = CircuitBreaker(breaker_failures, breaker_reset)
+        self.client: Optional[httpx.AsyncClient] = None
+        self.supervisor = None
+        self.http_version = None
+        self.remote_stats = {
+            "requests": 0,
+            "retries": 0,
+            "errors": 0,
+            "failures": 0,
+            "short_circuited": 0,
+            "latency_ms_total": 0.0,
+            "first_token_ms_total": 0.0,
+            "streamed": 0
+        }
+
+    async def load_model(self):
+        """Open the connection pool and check that the server answers"""
+        headers = {"Authorization": f"Bearer {self.api_key}"} if self.api_key else None
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            http2=self.http2,
+            headers=headers,
+            timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+            limits=httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=60.0
+            )
+        )
+        if await self._healthy():
+            print(f"Remote model server ready at {self.base_url} ({self.model_name})")
+        else:
+            print(f"Remote model server at {self.base_url} is not answering; serving fallbacks until it does")
+            self.breaker.trip()
+        self._update_model_flag()
+        self.supervisor = asyncio.create_task(self._supervise())
+
+    async def _healthy(self) -> bool:
+        try:
+            response = await self.client.get("/v1/models", timeout=self.connect_timeout)
+            return response.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def _update_model_flag(self):
+        # Routes check `model is None` to go straight to the fallback path
+        self.model = None if self.breaker.state == "open" else self.base_url
+
+    async def _supervise(self):
+        """Close the breaker once the server answers health checks again"""
+        while True:
+            await asyncio.sleep(self.health_interval)
+            if self.breaker.state != "closed" and await self._healthy():
+                print("Remote model server is answering again")
+                self.breaker.success()
+            self._update_model_flag()
+
+    async def shutdown(self):
+        if self.supervisor is not None:
+            self.supervisor.cancel()
+        if self.client is not None:
+            await self.client.aclose()
+
+    def _conversation_messages(self, conversation: Conversation, user_text: str) -> List[Dict[str, str]]:
+        messages = conversation.messages(CITIZEN_SYSTEM_PROMPT, user_text)
+        budget = MAX_PROMPT_TOKENS * CHARS_PER_TOKEN
+        # Fold half the window at a time, as the local path does, so the prefix
+        # the server may have cached stays unchanged for several turns
+        while conversation.turns and sum(len(message["content"]) for message in messages) > budget:
+            conversation.fold_oldest(max(1, len(conversation.turns) // 2))
+            messages = conversation.messages(CITIZEN_SYSTEM_PROMPT, user_text)
+        return messages
+
+    async def _generate(
+        self,
+        prompt: Optional[str],
+        max_length: int,
+        template: Optional[PromptTemplate] = None,
+        user_text: Optional[str] = None,
+        conversation: Optional[Conversation] = None
+    ) -> Tuple[str, bool]:
+        """Same contract as GraniteModel._generate, generating on the model server"""
+        def fallback():
+            return self._get_fallback_response(prompt if prompt is not None else template.render(user_text))
+
+        if self.client is None:
+            return fallback(), False
+        if not self.breaker.allow():
+            self.remote_stats["short_circuited"] += 1
+            return fallback(), False
+
+        sentiment = template is SENTIMENT_PROMPT if template is not None else self._is_sentiment_prompt(prompt)
+        if conversation is not None:
+            messages = self._conversation_messages(conversation, user_text)
+        else:
+            messages = [{"role": "user", "content": prompt if prompt is not None else template.render(user_text)}]
+
+        try:
+            with span("remote_generate"):
+                response, aborted = await self._complete(messages, max_length, sentiment)
+        except RemoteModelError as e:
+            print(f"Remote model error, using fallback: {e}")
+            return fallback(), False
+
+        stats = self.generation_stats
+        stats["generations"] += 1
+        if aborted:
+            stats["aborted_early"] += 1
+            print("Model response off track, stream closed, using fallback")
+            return fallback(), False
+        response = self._clean_response(response)
+        if sentiment:
+            return response, True
+        user_query = user_text if template is not None else self._extract_query_from_prompt(prompt)
+        if not self._validated(response, user_query):
+            return fallback(), False
+        return response, True
+
+    async def _complete(self, messages: List[Dict[str, str]], max_tokens: int, sentiment: bool) -> Tuple[str, bool]:
+        """(generated text, True if cut off as off track), retrying transient failures"""
+        payload = {
+            "model": self.model_name,
+            "messages": messages,
+            "max_tokens": max_tokens,
+            "temperature": 0.2,
+            "top_p": 0.85,
+            "stream": self.stream
+        }
+        stats = self.remote_stats
+        for attempt in range(self.retries + 1):
+            stats["requests"] += 1
+            started = time.perf_counter()
+            try:
+                if self.stream:
+                    result = await self._stream(payload, sentiment, started)
+                else:
+                    result = await self._request(payload)
+            except (_ServerBusy, *RETRY_ERRORS) as e:
+                stats["errors"] += 1
+                error = e
+                if attempt < self.retries:
+                    stats["retries"] += 1
+                    await asyncio.sleep(random.uniform(0, self.retry_backoff * 2 ** attempt))
+                continue
+            except (httpx.HTTPError, ValueError, KeyError, IndexError) as e:
+                # Read timeouts, server errors and malformed responses are not retried
+                stats["errors"] += 1
+                error = e
+                break
+            except RemoteModelError:
+                # The server answered (a client error); it is not unhealthy
+                self.breaker.success()
+                raise
+            stats["latency_ms_total"] += (time.perf_counter() - started) * 1000
+            self.breaker.success()
+            return result
+        stats["failures"] += 1
+        self.breaker.failure()
+        self._update_model_flag()
+        raise RemoteModelError(f"{type(error).__name__}: {error}")
+
+    def _check_status(self, response: httpx.Response):
+        self.http_version = response.http_version
+        if response.status_code in RETRY_STATUS:
+            raise _ServerBusy(f"model server returned {response.status_code}")
+        if response.status_code >= 500:
+            raise httpx.HTTPStatusError(
+                f"model server returned {response.status_code}", request=response.request, response=response
+            )
+        if response.status_code >= 400:
+            raise RemoteModelError(f"model server rejected the request ({response.status_code}): {response.text[:200]}")
+
+    async def _request(self, payload: Dict) -> Tuple[str, bool]:
+        response = await self.client.post("/v1/chat/completions", json=payload)
+        self._check_status(response)
+        data = response.json()
+        usage = data.get("usage") or {}
+        self.generation_stats["tokens_generated"] += usage.get("completion_tokens", 0)
+        self.generation_stats["prompt_tokens"] += usage.get("prompt_tokens", 0)
+        return data["choices"][0]["message"].get("content") or "", False
+
+    async def _stream(self, payload: Dict, sentiment: bool, started: float) -> Tuple[str, bool]:
+        """Read a server-sent event stream, stopping as soon as the outcome is decided"""
+        parts = []
+        async with self.client.stream("POST", "/v1/chat/completions", json=payload) as response:
+            if response.status_code != 200:
+                await response.aread()
+                self._check_status(response)
+            self.http_version = response.http_version
+            self.remote_stats["streamed"] += 1
+            async for line in response.aiter_lines():
+                if not line.startswith("data:"):
+                    continue
+                data = line[5:].strip()
+                if data == "[DONE]":
+                    # Read on to the end of the body so the connection goes back to the pool
+                    continue
+                choices = json.loads(data).get("choices") or ()
+                delta = choices[0].get("delta", {}).get("content") if choices else None
+                if not delta:
+                    continue
+                if not parts:
+                    self.remote_stats["first_token_ms_total"] += (time.perf_counter() - started) * 1000
+                parts.append(delta)
+                self.generation_stats["tokens_generated"] += 1  # servers send about one token per event
+                # Leaving the block closes the stream, which stops generation on the server
+                if sentiment:
+                    if any(label in "".join(parts).upper() for label in SENTIMENT_LABELS):
+                        self.generation_stats["stopped_on_answer"] += 1
+                        break
+                elif len(parts) % 16 == 0:
+                    partial = self._clean_response("".join(parts)).lower()
+                    if any(indicator in partial for indicator in GENERIC_INDICATORS):
+                        return "".join(parts), True
+        return "".join(parts), False
+
+    def remote_status(self) -> Dict:
+        stats = dict(self.remote_stats)
+        completed = stats["requests"] - stats["errors"]
+        latency = stats.pop("latency_ms_total")
+        stats["avg_latency_ms"] = round(latency / completed, 1) if completed else None
+        first_token = stats.pop("first_token_ms_total")
+        stats["avg_first_token_ms"] = round(first_token / stats["streamed"], 1) if stats["streamed"] else None
+        stats.update(
+            url=self.base_url,
+            model=self.model_name,
+            http_version=self.http_version,
+            breaker=self.breaker.state,
+            breaker_opens=self.breaker.opens
+        )
+        return stats
@@ -1,36 +1,53 @@
 from fastapi import APIRouter, Request, Form, HTTPException, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
-import uuid
 from typing import Optional
+import time
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 def get_current_user(request: Request) -> Optional[str]:
     """Get current user from session"""
-    session_id = request.cookies.get("session_id")
-    if session_id and session_id in request.app.state.sessions:
-        return request.app.state.sessions[session_id]["username"]
+    session = request.app.state.sessions.get(request.cookies.get("session_id"))
+    if session:
+        return session["username"]
     return None
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
     """Login page"""
-    return templates.TemplateResponse("login.html", {"request": request})
+    return request.app.state.static_pages.response(request, "login.html")
 
 @router.post("/login")
 async def login(request: Request, username: str = Form(...), password: str = Form(...)):
     """Process login"""
     users = request.app.state.users
+    limiter = request.app.state.login_limiter
+    client_ip = request.client.host if request.client else "unknown"
+    
+    # Throttle per username and per client IP before doing any hashing work
+    if not limiter.allow(f"user:{username}") or not limiter.allow(f"ip:{client_ip}"):
+        return templates.TemplateResponse(
+            "login.html",
+            {"request": request, "error": "Too many login attempts. Please try again later."},
+            status_code=429
+        )
     
-    if username in users and users[username]["password"] == password:
+    user = users.get(username)
+    verified = await request.app.state.password_verifier.verify(
+        username, password, user["password_hash"] if user else None
+    )
+    
+    if verified:
+        limiter.reset(f"user:{username}")
+        
         # Create session
-        session_id = str(uuid.uuid4())
-        request.app.state.sessions[session_id] = {
-            "username": username,
-            "role": users[username]["role"]
-        }
+        session_data = {"username": username, "role": users[username]["role"]}
+        sessions = request.app.state.sessions
+        session_id = await sessions.run(sessions.create, session_data)
+        await request.app.state.persistence.log(
+            "session", {"id": session_id, "data": session_data, "created": time.time()}
+        )
         
         # Redirect to dashboard with session cookie
         response = RedirectResponse(url="/dashboard/admin", status_code=302)
@@ -46,8 +63,10 @@ async def login(request: Request, username: str = Form(...), password: str = For
 async def logout(request: Request):
     """Logout user"""
     session_id = request.cookies.get("session_id")
-    if session_id and session_id in request.app.state.sessions:
-        del request.app.state.sessions[session_id]
+    if session_id:
+        sessions = request.app.state.sessions
+        await sessions.run(sessions.delete, session_id)
+        await request.app.state.persistence.log("session_end", {"id": session_id})
     
     response = RedirectResponse(url="/", status_code=302)
     response.delete_cookie(key="session_id")
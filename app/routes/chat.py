@@ -1,40 +1,52 @@
-from fastapi import APIRouter, Request, Form, HTTPException
+from fastapi import APIRouter, Request, Form, HTTPException, Depends
 from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
 from datetime import datetime
 import json
+import secrets
+from app.admission import PRIORITY_CHAT, limit_model_client, run_model_call
+from app.delivery import cached_json
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def chat_page(request: Request):
     """Chat interface page"""
-    return templates.TemplateResponse("chat.html", {"request": request})
+    return request.app.state.static_pages.response(request, "chat.html")
 
-@router.post("/ask")
+@router.post("/ask", dependencies=[Depends(limit_model_client)])
 async def ask_question(request: Request, question: str = Form(...)):
     """Process user question and return AI response"""
     try:
         granite_model = request.app.state.granite_model
+        # Identifies the conversation so follow-up questions keep their context
+        conversation_id = request.cookies.get("conversation_id") or secrets.token_urlsafe(16)
         
-        # Generate AI response
-        ai_response = await granite_model.chat_response(question)
+        # Common questions are answered from the precomputed store without queueing for the model
+        ai_response = granite_model.precomputed_answer(question, conversation_id)
+        if ai_response is None:
+            # Generate AI response
+            ai_response = await run_model_call(
+                request,
+                PRIORITY_CHAT,
+                lambda: granite_model.chat_response(question, conversation_id),
+                lambda: granite_model.fallback_answer(question),
+                has_fallback=granite_model._match_fallback(question) is not None
+            )
         
         # Store chat history
-        chat_entry = {
-            "id": len(request.app.state.chat_history) + 1,
-            "user_question": question,
-            "ai_response": ai_response,
-            "timestamp": datetime.now().isoformat()
-        }
-        request.app.state.chat_history.append(chat_entry)
+        chat_entry = await request.app.state.shared.commit(
+            "chat", lambda: request.app.state.chat_history.append(question, ai_response)
+        )
+        request.app.state.search_index.add_chat(chat_entry)
+        await request.app.state.persistence.log("chat", chat_entry)
         
-        return JSONResponse({
+        response = JSONResponse({
             "success": True,
             "response": ai_response,
             "timestamp": chat_entry["timestamp"]
         })
+        response.set_cookie(key="conversation_id", value=conversation_id, httponly=True, samesite="lax")
+        return response
         
     except Exception as e:
         return JSONResponse({
@@ -45,5 +57,5 @@ async def ask_question(request: Request, question: str = Form(...)):
 @router.get("/history")
 async def get_chat_history(request: Request):
     """Get recent chat history"""
-    history = request.app.state.chat_history[-10:]  # Last 10 conversations
-    return JSONResponse({"history": history})
\ No newline at end of file
+    history = request.app.state.chat_history.recent(10)  # Last 10 conversations
+    return cached_json(request, {"history": history})
\ No newline at end of file
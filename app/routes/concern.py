@@ -1,18 +1,22 @@
-from fastapi import APIRouter, Request, Form, HTTPException
+from fastapi import APIRouter, Request, Form, HTTPException, Depends
 from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
 from datetime import datetime
+from typing import Optional
 import json
+from app.admission import PRIORITY_CONCERN, limit_model_client, run_model_call
+from app.delivery import cached_json
+from app.records import CATEGORIES, PRIORITIES
+from app.routes.dashboard import require_admin
+from app.workflow import InvalidTransition, VersionConflict
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def concern_page(request: Request):
     """Concern submission page"""
-    return templates.TemplateResponse("concern.html", {"request": request})
+    return request.app.state.static_pages.response(request, "concern.html")
 
-@router.post("/submit")
+@router.post("/submit", dependencies=[Depends(limit_model_client)])
 async def submit_concern(
     request: Request, 
     title: str = Form(...), 
@@ -21,15 +25,31 @@ async def submit_concern(
     priority: str = Form(...)
 ):
     """Submit a new concern/issue"""
+    # Only known labels: each new value would take a slot in the stores' enum tables
+    if category not in CATEGORIES:
+        raise HTTPException(status_code=400, detail=f"category must be one of {', '.join(CATEGORIES)}")
+    if priority not in PRIORITIES:
+        raise HTTPException(status_code=400, detail=f"priority must be one of {', '.join(PRIORITIES)}")
     try:
         granite_model = request.app.state.granite_model
+        concerns = request.app.state.concerns
+        dedup = request.app.state.concern_dedup
         
-        # Analyze sentiment of the concern
-        sentiment = await granite_model.analyze_sentiment(description)
+        match = dedup.check(title, description)
+        if match is not None and match.exact_duplicate_of is not None:
+            # Same text as an open concern: reuse its sentiment instead of another model call
+            sentiment = concerns.value(match.exact_duplicate_of, "sentiment")
+        else:
+            # Analyze sentiment of the concern
+            sentiment = await run_model_call(
+                request,
+                PRIORITY_CONCERN,
+                lambda: granite_model.analyze_sentiment(description),
+                lambda: granite_model.keyword_sentiment(description)
+            )
         
-        # Create concern entry
-        concern_entry = {
-            "id": len(request.app.state.concerns) + 1,
+        # Create concern entry (through the shared log when web workers share state)
+        concern_entry = await request.app.state.shared.commit("concern", lambda: concerns.append({
             "title": title,
             "description": description,
             "category": category,
@@ -37,12 +57,22 @@ async def submit_concern(
             "sentiment": sentiment,
             "status": "Open",
             "timestamp": datetime.now().isoformat()
-        }
-        request.app.state.concerns.append(concern_entry)
+        }))
+        
+        # Matched against the clusters as of the commit (other reports may have
+        # arrived while the model ran), as every worker replaying the log does
+        dedup.add(concern_entry["id"], title, description, dedup.check(title, description))
+        request.app.state.search_index.add_concern(concern_entry)
+        # Category and urgency are suggested by the triage task, off the request path
+        request.app.state.triage.notify()
+        await request.app.state.persistence.log("concern", concern_entry)
+        cluster_id = dedup.cluster_id(concern_entry["id"])
         
         return JSONResponse({
             "success": True,
             "concern_id": concern_entry["id"],
+            "cluster_id": cluster_id,
+            "similar_reports": dedup.cluster_sizes.get(cluster_id, 1) - 1,
             "message": "Your concern has been submitted successfully!"
         })
         
@@ -53,18 +83,80 @@ async def submit_concern(
         }, status_code=500)
 
 @router.get("/list")
-async def list_concerns(request: Request):
-    """Get list of all concerns"""
+async def list_concerns(
+    request: Request,
+    status: Optional[str] = None,
+    category: Optional[str] = None,
+    priority: Optional[str] = None
+):
+    """Get list of all concerns, optionally filtered by status, category and priority"""
     concerns = request.app.state.concerns
-    return JSONResponse({"concerns": concerns})
+    if status is None and category is None and priority is None:
+        return cached_json(request, {"concerns": concerns.to_list()})
+    ids = request.app.state.workflow.find(status=status, category=category, priority=priority)
+    return cached_json(request, {"concerns": [concerns.get(concern_id) for concern_id in ids]})
 
 @router.get("/{concern_id}")
 async def get_concern(request: Request, concern_id: int):
     """Get specific concern by ID"""
     concerns = request.app.state.concerns
-    concern = next((c for c in concerns if c["id"] == concern_id), None)
+    concern = concerns.get(concern_id)
     
     if not concern:
         raise HTTPException(status_code=404, detail="Concern not found")
     
-    return JSONResponse({"concern": concern})
\ No newline at end of file
+    workflow = request.app.state.workflow
+    return cached_json(request, {
+        "concern": concern,
+        "version": workflow.version(concern_id),
+        "assignee": workflow.assignee(concern_id),
+        "triage": request.app.state.triage.result(concern_id)
+    })
+
+@router.post("/{concern_id}/status")
+async def update_status(
+    request: Request,
+    concern_id: int,
+    status: str = Form(...),
+    version: Optional[int] = Form(None),
+    assignee: Optional[str] = Form(None),
+    note: str = Form(""),
+    user: str = Depends(require_admin)
+):
+    """Move a concern through the workflow (Assigned, In Progress, Resolved, Closed)
+
+    Send the ``version`` returned by ``GET /concern/{id}``; if another admin
+    changed the concern since, the update is rejected with 409.
+    """
+    workflow = request.app.state.workflow
+    try:
+        # With shared state, checked against every worker's changes
+        event = await request.app.state.shared.commit(
+            "concern_status",
+            lambda: workflow.transition(concern_id, status, user, expected_version=version, assignee=assignee, note=note)
+        )
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Concern not found")
+    except VersionConflict as e:
+        return JSONResponse(
+            {"success": False, "error": str(e), "version": e.current_version},
+            status_code=409
+        )
+    except InvalidTransition as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    await request.app.state.persistence.log("concern_status", event)
+    request.app.state.concern_dedup.status_changed(concern_id, event["previous_status"], status)
+
+    return JSONResponse({"success": True, "event": event})
+
+@router.get("/{concern_id}/events")
+async def get_concern_events(request: Request, concern_id: int, user: str = Depends(require_admin)):
+    """Status change history of a concern"""
+    if not request.app.state.concerns.get(concern_id):
+        raise HTTPException(status_code=404, detail="Concern not found")
+    workflow = request.app.state.workflow
+    return JSONResponse({
+        "concern_id": concern_id,
+        "version": workflow.version(concern_id),
+        "events": workflow.history(concern_id)
+    })
\ No newline at end of file
@@ -1,13 +1,17 @@
 from fastapi import APIRouter, Request, Depends, HTTPException
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response
 from app.routes.auth import get_current_user
+from app.export import ExportUnavailable
+from app.search import KINDS
+import asyncio
 from datetime import datetime
 import json
-from collections import Counter
+import time
+from typing import Optional
+
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 def require_auth(request: Request):
     """Require authentication for dashboard access"""
@@ -16,28 +20,35 @@ def require_auth(request: Request):
         raise HTTPException(status_code=401, detail="Authentication required")
     return user
 
-@router.get("/admin", response_class=HTMLResponse)
-async def admin_dashboard(request: Request, user: str = Depends(require_auth)):
-    """Admin dashboard page"""
-    # Get analytics data
-    feedback_data = request.app.state.feedback_data
-    concerns = request.app.state.concerns
-    chat_history = request.app.state.chat_history
+def require_admin(request: Request):
+    """Require an authenticated admin user"""
+    user = require_auth(request)
+    session = request.app.state.sessions.get(request.cookies.get("session_id"))
+    if not session or session.get("role") != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+    return user
+
+def dashboard_data(state) -> dict:
+    """Figures shown on the admin dashboard"""
+    feedback_data = state.feedback_data
+    concerns = state.concerns
+    chat_history = state.chat_history
     
     # Calculate sentiment statistics
-    sentiment_counts = Counter([f["sentiment"] for f in feedback_data])
+    sentiment_counts = feedback_data.counts("sentiment")
     
-    # Calculate concern statistics
-    concern_categories = Counter([c["category"] for c in concerns])
-    concern_priorities = Counter([c["priority"] for c in concerns])
-    concern_statuses = Counter([c["status"] for c in concerns])
+    # Concern statistics, kept up to date by the workflow indexes
+    workflow = state.workflow
+    concern_categories = workflow.counts("category")
+    concern_priorities = workflow.counts("priority")
+    concern_statuses = workflow.counts("status")
     
     # Recent activity
     recent_feedback = feedback_data[-5:] if feedback_data else []
-    recent_concerns = concerns[-5:] if concerns else []
-    recent_chats = chat_history[-5:] if chat_history else []
+    recent_concerns = state.triage.rank_recent(5)  # most urgent of the latest concerns
+    recent_chats = chat_history.recent(5)
     
-    dashboard_data = {
+    return {
         "total_feedback": len(feedback_data),
         "total_concerns": len(concerns),
         "total_chats": len(chat_history),
@@ -47,12 +58,35 @@ async def admin_dashboard(request: Request, user: str = Depends(require_auth)):
         "concern_statuses": dict(concern_statuses),
         "recent_feedback": recent_feedback,
         "recent_concerns": recent_concerns,
-        "recent_chats": recent_chats
+        "recent_chats": recent_chats,
+        "concern_clusters": state.concern_dedup.stats()
     }
+
+class LazyDashboardData:
+    """Dashboard figures computed on first access, so cached fragments skip the work"""
+    
+    def __init__(self, state):
+        self.state = state
+        self.data = None
+    
+    def __getattr__(self, name):
+        if self.data is None:
+            self.data = dashboard_data(self.state)
+        try:
+            return self.data[name]
+        except KeyError:
+            raise AttributeError(name)
+
+@router.get("/admin", response_class=HTMLResponse)
+async def admin_dashboard(request: Request, user: str = Depends(require_auth)):
+    """Admin dashboard page"""
+    state = request.app.state
+    # Data fragments are re-rendered only when one of the stores changed
+    data_version = (state.feedback_data.version, state.concerns.version, len(state.chat_history), state.triage.version)
     
     return templates.TemplateResponse(
         "dashboard.html", 
-        {"request": request, "user": user, "data": dashboard_data}
+        {"request": request, "user": user, "data": LazyDashboardData(state), "data_version": data_version}
     )
 
 @router.get("/analytics")
@@ -63,25 +97,152 @@ async def get_analytics(request: Request, user: str = Depends(require_auth)):
     chat_history = request.app.state.chat_history
     
     # Sentiment analysis
-    sentiment_counts = Counter([f["sentiment"] for f in feedback_data])
+    sentiment_counts = feedback_data.counts("sentiment")
     
     # Concern analysis
-    concern_categories = Counter([c["category"] for c in concerns])
-    concern_priorities = Counter([c["priority"] for c in concerns])
+    workflow = request.app.state.workflow
+    concern_categories = workflow.counts("category")
+    concern_priorities = workflow.counts("priority")
     
     # Time-based analysis (last 7 days)
     from datetime import datetime, timedelta
     week_ago = datetime.now() - timedelta(days=7)
     
-    recent_feedback = [
-        f for f in feedback_data 
-        if datetime.fromisoformat(f["timestamp"]) > week_ago
-    ]
+    weekly_feedback_count = feedback_data.count_since(week_ago)
     
     return JSONResponse({
         "sentiment_distribution": dict(sentiment_counts),
         "concern_categories": dict(concern_categories),
         "concern_priorities": dict(concern_priorities),
-        "weekly_feedback_count": len(recent_feedback),
-        "total_interactions": len(chat_history) + len(feedback_data) + len(concerns)
-    })
\ No newline at end of file
+        "concern_workflow": workflow.stats(),
+        "weekly_feedback_count": weekly_feedback_count,
+        "total_interactions": len(chat_history) + len(feedback_data) + len(concerns),
+        "chat_history": chat_history.stats(),
+        "concern_clusters": request.app.state.concern_dedup.stats(),
+        "search_index": request.app.state.search_index.stats(),
+        "triage": request.app.state.triage.stats(),
+        "persistence": request.app.state.persistence.stats(),
+        "admission": request.app.state.admission.stats(),
+        "degradation": request.app.state.degradation.stats(),
+        "generation": request.app.state.granite_model.get_generation_stats(),
+        "languages": request.app.state.granite_model.language_stats(),
+        "precomputed_answers": request.app.state.granite_model.answers.stats(),
+        "knowledge_corpus": request.app.state.granite_model.corpus.stats(),
+        "model_workers": getattr(request.app.state.granite_model, "worker_status", list)(),
+        "remote_model": getattr(request.app.state.granite_model, "remote_status", dict)(),
+        "cluster": request.app.state.shared.cluster_stats()
+    })
+
+@router.get("/search")
+async def search_records(
+    request: Request,
+    q: str,
+    type: Optional[str] = None,
+    category: Optional[str] = None,
+    status: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    limit: int = 20,
+    user: str = Depends(require_admin)
+):
+    """Full-text search over concerns, feedback and chat questions
+
+    ``q`` supports plain words (all must match), "quoted phrases" and
+    prefix* terms; category and status filters apply to concerns.
+    """
+    if type is not None and type not in KINDS:
+        raise HTTPException(status_code=400, detail=f"type must be one of {', '.join(KINDS)}")
+    index = request.app.state.search_index
+    fields = {name: value for name, value in (("category", category), ("status", status)) if value}
+    started = time.perf_counter()
+    hits = index.search(
+        q,
+        limit=max(1, min(limit, 100)),
+        kinds=(type,) if type else None,
+        fields=fields,
+        start=start,
+        end=end
+    )
+    took_ms = (time.perf_counter() - started) * 1000
+    return JSONResponse({
+        "query": q,
+        "took_ms": round(took_ms, 3),
+        "results": [{**index.document(doc), "score": round(score, 4)} for score, doc in hits]
+    })
+
+@router.get("/debug/slow")
+async def get_slow_requests(
+    request: Request,
+    trace_id: Optional[str] = None,
+    format: str = "json",
+    user: str = Depends(require_admin)
+):
+    """Slow request traces captured by the profiler (format=folded for flamegraphs)"""
+    profiler = request.app.state.profiler
+    if profiler is None:
+        raise HTTPException(status_code=404, detail="Profiling is disabled (set CITIZEN_AI_PROFILING=1)")
+
+    if trace_id:
+        trace = profiler.get(trace_id)
+        if not trace:
+            raise HTTPException(status_code=404, detail="Trace not found")
+        if format == "folded":
+            return PlainTextResponse(trace.folded())
+        return JSONResponse({"trace": trace.to_dict()})
+
+    if format == "folded":
+        return PlainTextResponse(profiler.folded())
+
+    return JSONResponse({
+        "slow_ms": profiler.slow_ms,
+        "total_requests": profiler.total_requests,
+        "slow_requests": profiler.slow_requests,
+        "traces": profiler.list()
+    })
+
+async def _refresh_export(request: Request):
+    """Bring the columnar export up to date before serving it"""
+    exporter = request.app.state.exporter
+    try:
+        await asyncio.to_thread(exporter.export_new, request.app.state)
+    except ExportUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return exporter
+
+@router.get("/export/summary")
+async def get_export_summary(
+    request: Request,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    user: str = Depends(require_admin)
+):
+    """Concern counts by category x priority x sentiment x week"""
+    exporter = await _refresh_export(request)
+    summary = await asyncio.to_thread(exporter.concern_summary, start, end)
+    return JSONResponse({"dimensions": ["category", "priority", "sentiment", "week"], "groups": summary})
+
+@router.get("/export/{dataset}")
+async def download_export(
+    request: Request,
+    dataset: str,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    format: str = "parquet",
+    user: str = Depends(require_admin)
+):
+    """Download a date-range slice of feedback, concerns, concern events or chats as Parquet or Arrow IPC"""
+    if format not in ("parquet", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be parquet or arrow")
+    exporter = await _refresh_export(request)
+    try:
+        table = await asyncio.to_thread(exporter.read, dataset, start, end)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+    payload = await asyncio.to_thread(exporter.serialize, table, format)
+    media_type = "application/vnd.apache.parquet" if format == "parquet" else "application/vnd.apache.arrow.file"
+    return Response(
+        content=payload,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'}
+    )
\ No newline at end of file
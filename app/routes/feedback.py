@@ -1,39 +1,40 @@
-from fastapi import APIRouter, Request, Form, HTTPException
+from fastapi import APIRouter, Request, Form, HTTPException, Depends
 from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
 from datetime import datetime
 import json
+from app.admission import PRIORITY_FEEDBACK, limit_model_client, run_model_call
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def feedback_page(request: Request):
     """Feedback submission page"""
-    return templates.TemplateResponse("feedback.html", {"request": request})
+    return request.app.state.static_pages.response(request, "feedback.html")
 
-@router.post("/submit")
+@router.post("/submit", dependencies=[Depends(limit_model_client)])
 async def submit_feedback(request: Request, feedback_text: str = Form(...)):
     """Submit and analyze feedback sentiment"""
     try:
         granite_model = request.app.state.granite_model
         
         # Analyze sentiment using Granite model
-        # Use fallback if model is not loaded
-        if granite_model.model is None:
-            sentiment = granite_model._enhanced_keyword_sentiment(feedback_text)
-        else:
-            sentiment = await granite_model.analyze_sentiment(feedback_text)
+        # (keyword fallback if the model is not loaded or overloaded)
+        sentiment = await run_model_call(
+            request,
+            PRIORITY_FEEDBACK,
+            lambda: granite_model.analyze_sentiment(feedback_text),
+            lambda: granite_model.keyword_sentiment(feedback_text)
+        )
 
         
-        # Store feedback
-        feedback_entry = {
-            "id": len(request.app.state.feedback_data) + 1,
+        # Store feedback (through the shared log when web workers share state)
+        feedback_entry = await request.app.state.shared.commit("feedback", lambda: request.app.state.feedback_data.append({
             "text": feedback_text,
             "sentiment": sentiment,
             "timestamp": datetime.now().isoformat()
-        }
-        request.app.state.feedback_data.append(feedback_entry)
+        }))
+        request.app.state.search_index.add_feedback(feedback_entry)
+        await request.app.state.persistence.log("feedback", feedback_entry)
         
         return JSONResponse({
             "success": True,
@@ -47,15 +48,17 @@ async def submit_feedback(request: Request, feedback_text: str = Form(...)):
             "error": str(e)
         }, status_code=500)
 
-@router.get("/analyze")
+@router.get("/analyze", dependencies=[Depends(limit_model_client)])
 async def analyze_feedback_sentiment(request: Request, text: str):
     """API endpoint for sentiment analysis"""
     try:
         granite_model = request.app.state.granite_model
-        if granite_model.model is None:
-            sentiment = granite_model._enhanced_keyword_sentiment(text)  # direct fallback
-        else:
-            sentiment = await granite_model.analyze_sentiment(text)
+        sentiment = await run_model_call(
+            request,
+            PRIORITY_FEEDBACK,
+            lambda: granite_model.analyze_sentiment(text),
+            lambda: granite_model.keyword_sentiment(text)
+        )
 
         
         return JSONResponse({
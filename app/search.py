@@ -0,0 +1,631 @@
+import heapq
+import json
+import math
+import os
+import re
+import sys
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.dedup import STOPWORDS
+from app.records import ColumnarStore, TextArena, iso_from_epoch_us, to_epoch_us
+
+KINDS = ("concern", "feedback", "chat")
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+# Impact-ordered segments are cached once this many postings are waiting (see Postings.segments)
+SEGMENT_SIZE = 1024
+MAX_PREFIX_EXPANSIONS = 32
+# Date-range queries read matching postings in doc order when there are at most this many
+WINDOW_SCAN = 8 * SEGMENT_SIZE
+FORMAT_VERSION = 1
+
+_WORD = re.compile(r"\w+")
+_QUERY = re.compile(r'"([^"]*)"|(\S+)')
+
+
+def normalize(word: str) -> str:
+    """Same light stemming as the duplicate detector: drop a trailing plural "s" """
+    return word[:-1] if len(word) > 3 and word.endswith("s") else word
+
+
+def tokenize(text: str) -> List[Tuple[int, str]]:
+    """(position, term) pairs; stopwords are dropped but keep their positions"""
+    return [
+        (position, normalize(word))
+        for position, word in enumerate(_WORD.findall(text.lower()))
+        if word not in STOPWORDS
+    ]
+
+
+class Postings:
+    """Documents containing one term, in ascending doc id order
+
+    ``starts[i]`` is where document i's positions begin in ``positions``,
+    so its term frequency is the distance to the next start. ``max_tf`` and
+    ``min_ratio`` (document length per occurrence) bound the term's BM25
+    score in any document.
+
+    ``segments`` is a query-time cache of the same postings in impact order:
+    consecutive ranges of the list, each split by term frequency (1, 2, 3,
+    4+) and sorted by length / tf. Within a group the score can only fall,
+    so a search can stop reading a group once it cannot beat the k-th
+    result. Ranges are built as the list grows and merged like a binary
+    counter, so each posting is re-sorted O(log n) times.
+    """
+
+    __slots__ = ("docs", "starts", "positions", "max_tf", "min_ratio", "segments")
+
+    def __init__(self):
+        self.docs = array("I")
+        self.starts = array("I")
+        self.positions = array("H")
+        self.max_tf = 0
+        self.min_ratio = float("inf")
+        self.segments = []  # (start, end, [(max_tf, doc ids, length / tf)])
+
+    def add(self, doc: int, positions: List[int], length: int):
+        tf = len(positions)
+        self.max_tf = max(self.max_tf, tf)
+        self.min_ratio = min(self.min_ratio, length / tf)
+        self.docs.append(doc)
+        self.starts.append(len(self.positions))
+        self.positions.extend(positions)
+
+    def find(self, doc: int) -> int:
+        """Index of ``doc`` in the list, or -1"""
+        docs = self.docs
+        i = bisect_left(docs, doc)
+        return i if i < len(docs) and docs[i] == doc else -1
+
+    def end(self, i: int) -> int:
+        return self.starts[i + 1] if i + 1 < len(self.starts) else len(self.positions)
+
+    def tf(self, i: int) -> int:
+        return self.end(i) - self.starts[i]
+
+    def find_tf(self, doc: int) -> int:
+        """Term frequency in ``doc``, 0 if absent (the hot path of every query)"""
+        docs = self.docs
+        i = bisect_left(docs, doc)
+        if i == len(docs) or docs[i] != doc:
+            return 0
+        starts = self.starts
+        return (starts[i + 1] if i + 1 < len(starts) else len(self.positions)) - starts[i]
+
+    def positions_of(self, i: int) -> array:
+        return self.positions[self.starts[i]:self.end(i)]
+
+    def _impact_groups(self, start: int, end: int, lengths: array) -> list:
+        keyed = ([], [], [], [])
+        max_tf = 0
+        docs, starts = self.docs, self.starts
+        for i in range(start, end):
+            tf = self.end(i) - starts[i]
+            max_tf = max(max_tf, tf)
+            keyed[min(tf, 4) - 1].append((lengths[docs[i]] / tf, i))
+        groups = []
+        for group_tf, items in zip((1, 2, 3, max_tf), keyed):
+            if items:
+                items.sort()
+                groups.append((group_tf, array("I", [docs[i] for _, i in items]), array("d", [r for r, _ in items])))
+        return groups
+
+    def impact_groups(self, count: int, lengths: array) -> list:
+        """Impact-ordered groups covering postings of documents below ``count``"""
+        size = bisect_left(self.docs, count)
+        covered = self.segments[-1][1] if self.segments else 0
+        if size - covered >= SEGMENT_SIZE:
+            self.segments.append((covered, size, self._impact_groups(covered, size, lengths)))
+            while len(self.segments) > 1 and (
+                self.segments[-2][1] - self.segments[-2][0] <= self.segments[-1][1] - self.segments[-1][0]
+            ):
+                merged_start = self.segments[-2][0]
+                del self.segments[-2:]
+                self.segments.append((merged_start, size, self._impact_groups(merged_start, size, lengths)))
+            covered = size
+        groups = [group for _, _, segment_groups in self.segments for group in segment_groups]
+        # Postings added since the last segment are few; order them on the fly
+        return groups + self._impact_groups(covered, size, lengths)
+
+
+class _Scorer:
+    """BM25 for one query: idf per term, length normalisation per document"""
+
+    def __init__(self, index: "SearchIndex", k1: float = 1.2, b: float = 0.75):
+        self.index = index
+        self.k1 = k1
+        self.base = k1 * (1 - b)
+        self.per_length = k1 * b / max(index.total_length / max(index.count, 1), 1.0)
+
+    def idf(self, postings: Postings) -> float:
+        df = len(postings.docs)
+        return math.log(1 + (self.index.count - df + 0.5) / (df + 0.5))
+
+    def norm(self, length: int) -> float:
+        return self.base + self.per_length * length
+
+    def bound(self, idf: float, max_tf: int, ratio: float) -> float:
+        """Highest score of a term occurring at most ``max_tf`` times, ``ratio`` = length / tf
+
+        BM25 divided through by tf: it rises with tf and falls with length / tf.
+        """
+        return idf * (self.k1 + 1) / (1 + self.base / max_tf + self.per_length * ratio)
+
+
+class _TermClause:
+    def __init__(self, postings: Postings, scorer: _Scorer):
+        self.postings = postings
+        self.idf = scorer.idf(postings)
+        self.k1p1 = scorer.k1 + 1
+        self.max_score = scorer.bound(self.idf, postings.max_tf, postings.min_ratio)
+        self.cost = len(postings.docs)
+
+    def score(self, doc: int, norm: float) -> Optional[float]:
+        tf = self.postings.find_tf(doc)
+        if not tf:
+            return None
+        return self.idf * tf * self.k1p1 / (tf + norm)
+
+    def candidates(self, index: "SearchIndex", scorer: _Scorer, window):
+        return _impact_order([(self.postings, self.idf)], 0.0, index, scorer, window)
+
+
+class _PhraseClause:
+    """Terms at fixed offsets from each other; scored as the sum of its terms"""
+
+    def __init__(self, terms: List[Tuple[_TermClause, int]]):
+        self.terms = terms
+        self.max_score = sum(term.max_score for term, _ in terms)
+        self.driver = min(terms, key=lambda item: item[0].cost)[0]
+        self.cost = self.driver.cost
+
+    def score(self, doc: int, norm: float) -> Optional[float]:
+        total = 0.0
+        found = []
+        for term, offset in self.terms:
+            i = term.postings.find(doc)
+            if i < 0:
+                return None
+            tf = term.postings.tf(i)
+            total += term.idf * tf * term.k1p1 / (tf + norm)
+            found.append((term.postings, i, offset))
+        postings, i, offset = found[0]
+        rest = [(set(p.positions_of(j)), o - offset) for p, j, o in found[1:]]
+        for position in postings.positions_of(i):
+            if all(position + delta in positions for positions, delta in rest):
+                return total
+        return None
+
+    def candidates(self, index: "SearchIndex", scorer: _Scorer, window):
+        driver = self.driver
+        extra = self.max_score - driver.max_score
+        return _impact_order([(driver.postings, driver.idf)], extra, index, scorer, window)
+
+
+class _PrefixClause:
+    """Any vocabulary term starting with a prefix; scored by the best matching term"""
+
+    def __init__(self, terms: List[_TermClause]):
+        self.terms = terms
+        self.max_score = max(term.max_score for term in terms)
+        self.cost = sum(term.cost for term in terms)
+
+    def score(self, doc: int, norm: float) -> Optional[float]:
+        best = None
+        for term in self.terms:
+            score = term.score(doc, norm)
+            if score is not None and (best is None or score > best):
+                best = score
+        return best
+
+    def candidates(self, index: "SearchIndex", scorer: _Scorer, window):
+        return _impact_order([(term.postings, term.idf) for term in self.terms], 0.0, index, scorer, window)
+
+
+def _impact_order(sources, extra: float, index: "SearchIndex", scorer: _Scorer, window=None):
+    """Yield (score bound, doc id) from the given (postings, idf) in non-increasing bound order
+
+    A k-way merge over the impact-ordered groups of every source; a
+    document reached through several sources (prefix expansions) is
+    yielded once. With a doc id ``window`` (a date range) that holds few
+    postings, those are simply yielded in doc order without a bound.
+    """
+    if window is not None:
+        lo, hi = window
+        slices = [postings.docs[bisect_left(postings.docs, lo):bisect_left(postings.docs, hi)] for postings, _ in sources]
+        if sum(len(docs) for docs in slices) <= WINDOW_SCAN:
+            docs = slices[0] if len(slices) == 1 else sorted(set().union(*slices))
+            for doc in docs:
+                yield math.inf, doc
+            return
+    cursors = []
+    for postings, idf in sources:
+        for max_tf, docs, ratios in postings.impact_groups(index.count, index.doc_length):
+            # bound = scale / (offset + per_length * ratio), see _Scorer.bound
+            cursors.append((docs, ratios, idf * (scorer.k1 + 1), 1 + scorer.base / max_tf))
+    per_length = scorer.per_length
+
+    heap = [(-(scale / (offset + per_length * ratios[0]) + extra), n, 0) for n, (_, ratios, scale, offset) in enumerate(cursors)]
+    heapq.heapify(heap)
+    seen = set() if len(sources) > 1 else None
+    while heap:
+        negative_bound, n, position = heap[0]
+        docs, ratios, scale, offset = cursors[n]
+        doc = docs[position]
+        position += 1
+        if position < len(docs):
+            heapq.heapreplace(heap, (-(scale / (offset + per_length * ratios[position]) + extra), n, position))
+        else:
+            heapq.heappop(heap)
+        if seen is not None:
+            if doc in seen:
+                continue
+            seen.add(doc)
+        yield -negative_bound, doc
+
+
+class SearchIndex:
+    """Inverted index over concern text, feedback text and chat questions
+
+    Every stored record becomes one document with a positional posting list
+    per term, updated as records are written. Queries are conjunctive:
+    plain words, ``"quoted phrases"`` and ``prefix*`` terms must all match;
+    results are ranked by BM25 and can be filtered by type, date range and
+    categorical fields of the source record (category, status, ...).
+
+    Top-k retrieval reads each clause's postings in impact order (highest
+    possible score first) and stops as soon as no unread document can beat
+    the current k-th result, so a common term does not mean scoring every
+    document containing it. Chat questions are kept in the index (the chat store
+    spills old entries to disk); concerns and feedback are read back from
+    their stores.
+    """
+
+    def __init__(self, concerns: ColumnarStore, feedback: ColumnarStore, chat_history):
+        self.concerns = concerns
+        self.feedback = feedback
+        self.chat_history = chat_history
+        self.terms: Dict[str, Postings] = {}
+        self.vocabulary: List[str] = []  # sorted, for prefix queries
+        self.doc_kind = array("B")
+        self.doc_source = array("I")  # record id in the source store
+        self.doc_time = array("q")  # epoch microseconds
+        self.doc_length = array("H")
+        self.doc_ref = array("I")  # chat question index in ``questions``
+        self.questions = TextArena()
+        self.count = 0
+        self.total_length = 0
+        self.chronological = True  # doc ids in timestamp order, so a date range is a doc id range
+        self.indexed = {kind: 0 for kind in KINDS}  # highest source id indexed per kind
+        self.version = 0
+        self.saved_version = 0
+
+    # Indexing
+
+    def add(self, kind: str, source_id: int, text: str, timestamp, stored: Optional[str] = None):
+        tokens = tokenize(text)
+        length = min(len(tokens), 0xFFFF)
+        doc = self.count
+        grouped: Dict[str, List[int]] = {}
+        for position, term in tokens:
+            if position > 0xFFFF:
+                break
+            grouped.setdefault(term, []).append(position)
+        for term, positions in grouped.items():
+            postings = self.terms.get(term)
+            if postings is None:
+                postings = self.terms[term] = Postings()
+                insort(self.vocabulary, term)
+            postings.add(doc, positions, length)
+        timestamp = to_epoch_us(timestamp)
+        if self.doc_time and timestamp < self.doc_time[-1]:
+            self.chronological = False
+        self.doc_kind.append(KIND_CODES[kind])
+        self.doc_source.append(source_id)
+        self.doc_time.append(timestamp)
+        self.doc_length.append(length)
+        self.doc_ref.append(self.questions.add(stored) if stored is not None else 0)
+        self.total_length += length
+        self.indexed[kind] = max(self.indexed[kind], source_id)
+        self.version += 1
+        # Counted last: a snapshot that reads ``count`` first only sees complete documents
+        self.count += 1
+
+    def add_concern(self, record: Dict):
+        self.add("concern", record["id"], f"{record['title']}\n{record['description']}", record["timestamp"])
+
+    def add_feedback(self, record: Dict):
+        self.add("feedback", record["id"], record["text"], record["timestamp"])
+
+    def add_chat(self, entry: Dict):
+        self.add("chat", entry["id"], entry["user_question"], entry["timestamp"], stored=entry["user_question"])
+
+    def catch_up(self) -> int:
+        """Index records written since the index was last saved"""
+        before = self.count
+        # Interleaved by time, as they were written, so doc ids stay in timestamp order
+        pending = heapq.merge(
+            ((to_epoch_us(r["timestamp"]), self.add_concern, r) for r in self.concerns[self.indexed["concern"]:]),
+            ((to_epoch_us(r["timestamp"]), self.add_feedback, r) for r in self.feedback[self.indexed["feedback"]:]),
+            ((to_epoch_us(e["timestamp"]), self.add_chat, e) for e in self.chat_history.entries_after(self.indexed["chat"])),
+            key=lambda item: item[0]
+        )
+        for _, add, record in pending:
+            add(record)
+        return self.count - before
+
+    def is_consistent(self) -> bool:
+        """False when a store holds fewer records than were indexed (it was reset)"""
+        return (
+            self.indexed["concern"] <= len(self.concerns)
+            and self.indexed["feedback"] <= len(self.feedback)
+            and self.indexed["chat"] <= len(self.chat_history)
+        )
+
+    # Querying
+
+    def _clauses(self, query: str, scorer: _Scorer) -> Optional[list]:
+        """Parse a query; None when some clause matches nothing"""
+        clauses = []
+        for phrase, word in _QUERY.findall(query):
+            if word.endswith("*") and len(word.rstrip("*")) >= 2:
+                prefix = word.rstrip("*").lower()
+                vocabulary = self.vocabulary
+                matches = []
+                for i in range(bisect_left(vocabulary, prefix), len(vocabulary)):
+                    if not vocabulary[i].startswith(prefix):
+                        break
+                    matches.append(self.terms[vocabulary[i]])
+                if not matches:
+                    return None
+                matches.sort(key=lambda postings: -len(postings.docs))
+                clauses.append(_PrefixClause([_TermClause(p, scorer) for p in matches[:MAX_PREFIX_EXPANSIONS]]))
+                continue
+            terms = []
+            for offset, term in tokenize(phrase or word):
+                postings = self.terms.get(term)
+                if postings is None:
+                    return None
+                terms.append((_TermClause(postings, scorer), offset))
+            if len(terms) > 1 and phrase:
+                clauses.append(_PhraseClause(terms))
+            else:
+                clauses.extend(term for term, _ in terms)
+        return clauses
+
+    def _field_checks(self, kinds: Optional[Iterable[str]], fields: Dict[str, str]):
+        """Per kind code: None if excluded, else [(column, code)] the record must match"""
+        stores = {"concern": self.concerns, "feedback": self.feedback, "chat": None}
+        checks = []
+        for kind in KINDS:
+            store = stores[kind]
+            if kinds is not None and kind not in kinds:
+                checks.append(None)
+                continue
+            if not fields:
+                checks.append([])
+                continue
+            if store is None or any(field not in store.categoricals for field in fields):
+                checks.append(None)
+                continue
+            codes = [(store.columns[f], store.categoricals[f].codes.get(v)) for f, v in fields.items()]
+            checks.append(None if any(code is None for _, code in codes) else codes)
+        return checks
+
+    def search(
+        self,
+        query: str,
+        limit: int = 20,
+        kinds: Optional[Iterable[str]] = None,
+        fields: Optional[Dict[str, str]] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[Tuple[float, int]]:
+        """Top ``limit`` (score, doc id) pairs, best first"""
+        scorer = _Scorer(self)
+        clauses = self._clauses(query, scorer)
+        if not clauses:
+            return []
+        checks = self._field_checks(kinds, fields or {})
+        start_us = to_epoch_us(start) if start else -(1 << 63)
+        end_us = to_epoch_us(end) if end else (1 << 63) - 1
+        doc_kind, doc_source, doc_time, doc_length = self.doc_kind, self.doc_source, self.doc_time, self.doc_length
+
+        window = None
+        if (start or end) and self.chronological:
+            window = (bisect_left(doc_time, start_us), bisect_left(doc_time, end_us + 1))
+
+        # Threshold algorithm: read the clauses' candidates in impact order,
+        # always from the clause with the highest remaining bound, scoring
+        # each new document fully. Unread documents score at most the sum of
+        # the bounds last read; and once one clause runs out, every document
+        # matching all clauses has been seen.
+        clauses.sort(key=lambda clause: clause.cost)
+        streams = [clause.candidates(self, scorer, window) for clause in clauses]
+        bounds = [clause.max_score for clause in clauses]
+        seen = set() if len(streams) > 1 else None
+        # Position checks last: most candidates are rejected by a cheaper clause first
+        evaluation = sorted(clauses, key=lambda clause: isinstance(clause, _PhraseClause))
+        heap = []
+        reads = 0
+        while True:
+            n = reads % len(streams)
+            reads += 1
+            item = next(streams[n], None)
+            if item is None:
+                break
+            bounds[n], doc = item
+            if len(heap) == limit and sum(bounds) < heap[0][0]:
+                break
+            if seen is not None:
+                if doc in seen:
+                    continue
+                seen.add(doc)
+            check = checks[doc_kind[doc]]
+            if check is None or not start_us <= doc_time[doc] <= end_us:
+                continue
+            if check:
+                row = doc_source[doc] - 1
+                if any(column[row] != code for column, code in check):
+                    continue
+            norm = scorer.norm(doc_length[doc])
+            total = 0.0
+            for clause in evaluation:
+                score = clause.score(doc, norm)
+                if score is None:
+                    break
+                total += score
+            else:
+                item = (total, doc)
+                if len(heap) < limit:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+        return sorted(heap, reverse=True)
+
+    def document(self, doc: int) -> Dict:
+        """Search hit as returned by the API: the source record plus its type"""
+        kind = KINDS[self.doc_kind[doc]]
+        source_id = self.doc_source[doc]
+        if kind == "chat":
+            record = {
+                "id": source_id,
+                "user_question": self.questions.get(self.doc_ref[doc]),
+                "timestamp": iso_from_epoch_us(self.doc_time[doc])
+            }
+        else:
+            record = (self.concerns if kind == "concern" else self.feedback).get(source_id) or {"id": source_id}
+        return {"type": kind, **record}
+
+    # Persistence
+
+    def save(self, path: str):
+        """Write the index to ``path`` (atomically replaced)
+
+        Safe to run in a worker thread while requests keep adding documents:
+        only documents below the count read at the start are written, and
+        posting lists are append-only, so their prefixes are stable.
+        """
+        count = self.count
+        version = self.version
+        offsets = self.questions.offsets[:]
+        data = bytes(self.questions.data[:offsets[-1]])
+        indexed = dict(self.indexed)
+        term_rows = []
+        blobs = [
+            self.doc_kind[:count].tobytes(),
+            self.doc_source[:count].tobytes(),
+            self.doc_time[:count].tobytes(),
+            self.doc_length[:count].tobytes(),
+            self.doc_ref[:count].tobytes(),
+            offsets.tobytes(),
+            data
+        ]
+        for term, postings in list(self.terms.items()):
+            k = bisect_left(postings.docs, count)
+            if k == 0:
+                continue
+            end = postings.starts[k] if k < len(postings.starts) else len(postings.positions)
+            # The bounds may include documents added since ``count`` was read; they stay valid
+            term_rows.append([term, k, end, postings.max_tf, postings.min_ratio])
+            blobs += [
+                postings.docs[:k].tobytes(),
+                postings.starts[:k].tobytes(),
+                postings.positions[:end].tobytes()
+            ]
+        header = {
+            "format": FORMAT_VERSION,
+            "byteorder": sys.byteorder,
+            "count": count,
+            "total_length": sum(self.doc_length[:count]),
+            "chronological": self.chronological,
+            "indexed": indexed,
+            "questions": [len(offsets), len(data)],
+            "terms": term_rows
+        }
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(json.dumps(header, ensure_ascii=False).encode("utf-8") + b"\n")
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp_path, path)
+        self.saved_version = version
+
+    @classmethod
+    def load(cls, path: str, concerns: ColumnarStore, feedback: ColumnarStore, chat_history) -> Optional["SearchIndex"]:
+        """Read an index written by ``save``; None if missing or unreadable"""
+        if not os.path.exists(path):
+            return None
+        with open(path, "rb") as f:
+            header = json.loads(f.readline())
+            if header.get("format") != FORMAT_VERSION or header.get("byteorder") != sys.byteorder:
+                return None
+            view = memoryview(f.read())
+        position = 0
+
+        def take(typecode: str, n: int) -> array:
+            nonlocal position
+            result = array(typecode)
+            size = n * result.itemsize
+            result.frombytes(view[position:position + size])
+            position += size
+            return result
+
+        index = cls(concerns, feedback, chat_history)
+        count = header["count"]
+        index.doc_kind = take("B", count)
+        index.doc_source = take("I", count)
+        index.doc_time = take("q", count)
+        index.doc_length = take("H", count)
+        index.doc_ref = take("I", count)
+        n_offsets, n_data = header["questions"]
+        index.questions.offsets = take("Q", n_offsets)
+        index.questions.data = bytearray(view[position:position + n_data])
+        position += n_data
+        for term, k, n_positions, max_tf, min_ratio in header["terms"]:
+            postings = Postings()
+            postings.docs = take("I", k)
+            postings.starts = take("I", k)
+            postings.positions = take("H", n_positions)
+            postings.max_tf = max_tf
+            postings.min_ratio = min_ratio
+            index.terms[term] = postings
+        index.vocabulary = sorted(index.terms)
+        index.count = count
+        index.total_length = header["total_length"]
+        index.chronological = header["chronological"]
+        index.indexed.update(header["indexed"])
+        return index
+
+    @classmethod
+    def open(cls, path: Optional[str], concerns: ColumnarStore, feedback: ColumnarStore, chat_history) -> "SearchIndex":
+        """Load the saved index and index what was written since; rebuild if it no longer matches the stores"""
+        index = None
+        if path:
+            try:
+                index = cls.load(path, concerns, feedback, chat_history)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Could not read search index {path}: {e}")
+            if index is not None and not index.is_consistent():
+                print("Search index does not match stored records, rebuilding")
+                index = None
+        if index is None:
+            index = cls(concerns, feedback, chat_history)
+        index.saved_version = index.version
+        added = index.catch_up()
+        print(f"Search index ready: {index.count} documents ({added} indexed at startup)")
+        return index
+
+    def stats(self) -> Dict:
+        return {
+            "documents": self.count,
+            "terms": len(self.terms),
+            "by_type": dict(zip(KINDS, (self.doc_kind.count(code) for code in range(len(KINDS))))),
+            "unsaved_changes": self.version != self.saved_version
+        }
@@ -0,0 +1,117 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Optional
+
+# scrypt cost parameters (~50 ms and 16 MB per hash on a typical server core)
+SCRYPT_N = 2 ** 14
+SCRYPT_R = 8
+SCRYPT_P = 1
+
+
+def _b64(data: bytes) -> str:
+    return base64.b64encode(data).decode("ascii")
+
+
+def hash_password(password: str, n: int = SCRYPT_N, r: int = SCRYPT_R, p: int = SCRYPT_P) -> str:
+    """Hash a password with scrypt into a self-describing string"""
+    salt = os.urandom(16)
+    digest = hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p, maxmem=128 * r * n * 2)
+    return f"scrypt${n}${r}${p}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password: str, stored_hash: str) -> bool:
+    """Check a password against a hash produced by ``hash_password``"""
+    try:
+        scheme, n, r, p, salt, expected = stored_hash.split("$")
+        n, r, p = int(n), int(r), int(p)
+    except ValueError:
+        return False
+    if scheme != "scrypt":
+        return False
+    expected = base64.b64decode(expected)
+    digest = hashlib.scrypt(
+        password.encode("utf-8"), salt=base64.b64decode(salt), n=n, r=r, p=p,
+        maxmem=128 * r * n * 2, dklen=len(expected)
+    )
+    return hmac.compare_digest(digest, expected)
+
+
+@lru_cache(maxsize=1)
+def _dummy_hash() -> str:
+    """Verified against when the username does not exist, so timing does not reveal valid users
+
+    Created on first use rather than at import, as hashing takes ~50 ms.
+    """
+    return hash_password(os.urandom(16).hex())
+
+
+class PasswordVerifier:
+    """Runs password verification in a bounded thread pool off the event loop
+
+    hashlib.scrypt releases the GIL, so verification runs in parallel with
+    other requests. At most ``max_pending`` verifications are queued; further
+    logins wait for a slot instead of piling up work. Successful checks are
+    cached for ``cache_ttl`` seconds keyed on a keyed digest of the
+    credentials, so repeated logins skip the expensive hash.
+    """
+
+    def __init__(self, max_workers: int = 4, max_pending: int = 64, cache_ttl: float = 60.0, inline: bool = False):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-verify")
+        self.max_pending = max_pending
+        self.semaphore = None
+        self.cache_ttl = cache_ttl
+        self.cache = {}
+        self.cache_key = os.urandom(32)
+        self.inline = inline
+        self.verifications = 0
+        self.cache_hits = 0
+
+    def _fingerprint(self, username: str, password: str, stored_hash: str) -> bytes:
+        message = "\0".join((username, password, stored_hash)).encode("utf-8")
+        return hmac.new(self.cache_key, message, hashlib.sha256).digest()
+
+    async def verify(self, username: str, password: str, stored_hash: Optional[str]) -> bool:
+        if stored_hash is None:
+            stored_hash = _dummy_hash()
+            known_user = False
+        else:
+            known_user = True
+
+        fingerprint = self._fingerprint(username, password, stored_hash)
+        cached_until = self.cache.get(fingerprint)
+        if cached_until is not None:
+            if cached_until > time.monotonic():
+                self.cache_hits += 1
+                return True
+            del self.cache[fingerprint]
+
+        self.verifications += 1
+        if self.inline:
+            valid = verify_password(password, stored_hash)
+        else:
+            if self.semaphore is None:
+                self.semaphore = asyncio.Semaphore(self.max_pending)
+            async with self.semaphore:
+                loop = asyncio.get_running_loop()
+                valid = await loop.run_in_executor(self.executor, verify_password, password, stored_hash)
+
+        valid = valid and known_user
+        if valid:
+            self._prune()
+            self.cache[fingerprint] = time.monotonic() + self.cache_ttl
+        return valid
+
+    def _prune(self):
+        if len(self.cache) < 1024:
+            return
+        now = time.monotonic()
+        self.cache = {key: until for key, until in self.cache.items() if until > now}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
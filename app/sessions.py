@@ -0,0 +1,326 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import redis
+except ImportError:  # only needed for the redis backend
+    redis = None
+
+from app import config
+
+
+class SessionStore(ABC):
+    """Common interface for session backends
+
+    Sessions expire ``ttl`` seconds after their last use (sliding expiry).
+    Backends that do disk or network I/O set ``blocking``; async code calls
+    them through ``run`` so the I/O happens in a thread. Sync dependencies
+    (``require_auth``, ``limit_model_client``) call them directly, as
+    FastAPI already runs those in its thread pool.
+    """
+
+    blocking = False
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    async def run(self, method: Callable, *args):
+        """Call one of this store's methods from async code"""
+        if self.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    @abstractmethod
+    def create(self, data: Dict) -> str:
+        """Store ``data`` under a new session id and return the id"""
+
+    @abstractmethod
+    def get(self, session_id: str) -> Optional[Dict]:
+        """Session data, or None if unknown or expired"""
+
+    @abstractmethod
+    def delete(self, session_id: str):
+        """End a session"""
+
+    def sweep(self) -> int:
+        """Remove expired sessions; returns how many were dropped"""
+        return 0
+
+    def __len__(self):
+        return 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return self.get(session_id) is not None
+
+    @staticmethod
+    def new_id() -> str:
+        return secrets.token_urlsafe(32)
+
+
+class MemorySessionStore(SessionStore):
+    """In-process sessions with TTL and LRU eviction (single worker only)"""
+
+    def __init__(self, ttl: float, max_size: int):
+        super().__init__(ttl)
+        self.max_size = max_size
+        self.sessions = OrderedDict()  # session_id -> (expires_at, data)
+        self.lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def create(self, data: Dict) -> str:
+        session_id = self.new_id()
+        with self.lock:
+            self.sessions[session_id] = (time.monotonic() + self.ttl, data)
+            while len(self.sessions) > self.max_size:
+                self.sessions.popitem(last=False)
+                self.evicted += 1
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        if not session_id:
+            return None
+        now = time.monotonic()
+        with self.lock:
+            entry = self.sessions.get(session_id)
+            if entry is None:
+                return None
+            expires_at, data = entry
+            if expires_at < now:
+                del self.sessions[session_id]
+                self.expired += 1
+                return None
+            self.sessions[session_id] = (now + self.ttl, data)
+            self.sessions.move_to_end(session_id)
+            return data
+
+    def delete(self, session_id: str):
+        with self.lock:
+            self.sessions.pop(session_id, None)
+
+    def export(self) -> List[Tuple[str, Dict, float]]:
+        """Live sessions as (id, data, wall-clock expiry), least recently used first"""
+        offset = time.time() - time.monotonic()
+        with self.lock:
+            return [(session_id, data, expires_at + offset) for session_id, (expires_at, data) in self.sessions.items()]
+
+    def restore(self, session_id: str, data: Dict, expires_at: float):
+        """Re-create a session saved by ``export`` (e.g. after a restart), unless it has expired"""
+        remaining = expires_at - time.time()
+        if remaining <= 0:
+            return
+        with self.lock:
+            self.sessions[session_id] = (time.monotonic() + min(remaining, self.ttl), data)
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_size:
+                self.sessions.popitem(last=False)
+
+    def sweep(self) -> int:
+        now = time.monotonic()
+        removed = 0
+        with self.lock:
+            # LRU order is also expiry order, so stop at the first live session
+            while self.sessions:
+                session_id, (expires_at, _) = next(iter(self.sessions.items()))
+                if expires_at >= now:
+                    break
+                del self.sessions[session_id]
+                removed += 1
+            self.expired += removed
+        return removed
+
+    def __len__(self):
+        return len(self.sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a local SQLite file shared by every worker on the host"""
+
+    blocking = True
+
+    def __init__(self, ttl: float, max_size: int, path: str):
+        super().__init__(ttl)
+        self.max_size = max_size
+        self.path = path
+        self.local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS sessions ("
+                "id TEXT PRIMARY KEY, data TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires_at ON sessions (expires_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+        return conn
+
+    def create(self, data: Dict) -> str:
+        session_id = self.new_id()
+        conn = self._connection()
+        conn.execute(
+            "INSERT INTO sessions (id, data, expires_at) VALUES (?, ?, ?)",
+            (session_id, json.dumps(data), time.time() + self.ttl)
+        )
+        # Expiry tracks last use, so the soonest-expiring sessions are least recently used
+        conn.execute(
+            "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY expires_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_size,)
+        )
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        if not session_id:
+            return None
+        now = time.time()
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT data FROM sessions WHERE id = ? AND expires_at >= ?", (session_id, now)
+        ).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE sessions SET expires_at = ? WHERE id = ?", (now + self.ttl, session_id))
+        return json.loads(row[0])
+
+    def delete(self, session_id: str):
+        self._connection().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def sweep(self) -> int:
+        cursor = self._connection().execute("DELETE FROM sessions WHERE expires_at < ?", (time.time(),))
+        return cursor.rowcount
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+class RedisSessionStore(SessionStore):
+    """Sessions in Redis (or any server speaking its protocol); expiry is native
+
+    A sorted set of session ids scored by expiry enforces ``max_size``:
+    the sessions expiring soonest, i.e. least recently used, are evicted.
+    """
+
+    blocking = True
+
+    def __init__(self, ttl: float, max_size: int, url: str):
+        super().__init__(ttl)
+        if redis is None:
+            raise RuntimeError("The redis session backend requires the redis package")
+        self.max_size = max_size
+        self.client = redis.Redis.from_url(url)
+        self.prefix = "citizen_ai:session:"
+        self.index = "citizen_ai:sessions"
+
+    def create(self, data: Dict) -> str:
+        session_id = self.new_id()
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.set(self.prefix + session_id, json.dumps(data), ex=int(self.ttl))
+        pipe.zadd(self.index, {session_id: now + self.ttl})
+        pipe.zremrangebyscore(self.index, "-inf", now)
+        pipe.zcard(self.index)
+        size = pipe.execute()[-1]
+        if size > self.max_size:
+            evicted = self.client.zrange(self.index, 0, size - self.max_size - 1)
+            if evicted:
+                pipe = self.client.pipeline()
+                pipe.delete(*(self.prefix + session.decode("ascii") for session in evicted))
+                pipe.zrem(self.index, *evicted)
+                pipe.execute()
+        return session_id
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        if not session_id:
+            return None
+        key = self.prefix + session_id
+        pipe = self.client.pipeline()
+        pipe.get(key)
+        pipe.expire(key, int(self.ttl))
+        pipe.zadd(self.index, {session_id: time.time() + self.ttl}, xx=True)
+        value, _, _ = pipe.execute()
+        return json.loads(value) if value is not None else None
+
+    def delete(self, session_id: str):
+        pipe = self.client.pipeline()
+        pipe.delete(self.prefix + session_id)
+        pipe.zrem(self.index, session_id)
+        pipe.execute()
+
+    def sweep(self) -> int:
+        # The keys expire by themselves; this only trims the index
+        return self.client.zremrangebyscore(self.index, "-inf", time.time())
+
+    def __len__(self):
+        return self.client.zcount(self.index, time.time(), "+inf")
+
+
+class SignedSessionStore(SessionStore):
+    """Stateless sessions: the cookie is an HMAC-signed, expiring token
+
+    No lookup is needed and every worker holding the secret can validate the
+    token. Logout only clears the cookie; a copied token stays valid until it
+    expires, so keep the TTL short with this backend.
+    """
+
+    def __init__(self, ttl: float, secret: str):
+        super().__init__(ttl)
+        if not secret:
+            raise RuntimeError("The signed session backend requires CITIZEN_AI_SESSION_SECRET")
+        self.key = secret.encode("utf-8")
+
+    def _sign(self, payload: bytes) -> str:
+        digest = hmac.new(self.key, payload, hashlib.sha256).digest()
+        return base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+    def create(self, data: Dict) -> str:
+        body = dict(data, exp=round(time.time() + self.ttl, 3))
+        payload = base64.urlsafe_b64encode(json.dumps(body, separators=(",", ":")).encode("utf-8"))
+        return payload.rstrip(b"=").decode("ascii") + "." + self._sign(payload.rstrip(b"="))
+
+    def get(self, session_id: str) -> Optional[Dict]:
+        # Tampered cookies can hold anything; only ASCII tokens can carry a valid signature
+        if not session_id or not session_id.isascii() or "." not in session_id:
+            return None
+        payload, signature = session_id.rsplit(".", 1)
+        if not hmac.compare_digest(signature, self._sign(payload.encode("ascii"))):
+            return None
+        try:
+            body = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+        except ValueError:
+            return None
+        if body.pop("exp", 0) < time.time():
+            return None
+        return body
+
+    def delete(self, session_id: str):
+        pass
+
+
+def create_session_store() -> SessionStore:
+    """Build the configured session backend"""
+    backend = config.SESSION_BACKEND
+    if backend == "sqlite":
+        return SQLiteSessionStore(config.SESSION_TTL_SECONDS, config.SESSION_MAX_SIZE, config.SESSION_SQLITE_PATH)
+    if backend == "redis":
+        return RedisSessionStore(config.SESSION_TTL_SECONDS, config.SESSION_MAX_SIZE, config.SESSION_REDIS_URL)
+    if backend == "signed":
+        return SignedSessionStore(config.SESSION_TTL_SECONDS, config.SESSION_SECRET)
+    return MemorySessionStore(config.SESSION_TTL_SECONDS, config.SESSION_MAX_SIZE)
@@ -0,0 +1,389 @@
+import asyncio
+import json
+import os
+import socket
+import sqlite3
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.sessions import MemorySessionStore
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS log ("
+    "seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, data TEXT NOT NULL, "
+    "worker TEXT NOT NULL, created_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS workers ("
+    "id TEXT PRIMARY KEY, pid INTEGER NOT NULL, started_at REAL NOT NULL, updated_at REAL NOT NULL, "
+    "stats TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS conversations ("
+    "id TEXT PRIMARY KEY, version INTEGER NOT NULL, data TEXT NOT NULL, updated_at REAL NOT NULL)",
+)
+
+# Background jobs that must run in one worker only (export, answer regeneration)
+LEADER_LEASE = "leader"
+
+# Averages, percentiles and targets do not add up across workers
+_NOT_SUMMED = ("avg_", "p90_", "p99_", "slo_")
+
+
+def _add_counters(total: Dict, stats: Dict):
+    """Sum the numeric values of ``stats`` into ``total``, recursing into nested dicts"""
+    for key, value in stats.items():
+        if isinstance(value, dict):
+            _add_counters(total.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)) and not isinstance(value, bool) and not key.startswith(_NOT_SUMMED):
+            total[key] = total.get(key, 0) + value
+
+
+class SharedState:
+    """Records, conversations, leadership and metrics shared by every web worker on the host
+
+    Each worker keeps its own in-memory stores and indexes, and all of them
+    are replicas of one mutation log in a SQLite database (WAL mode).
+    ``commit`` runs a write inside an immediate transaction: the worker
+    first applies what other workers logged, so its stores are current and
+    the new record gets the next id, then mutates and appends the change to
+    the log before the transaction commits. Version checks (concern status)
+    therefore see every other worker's changes. Before each request
+    ``catch_up`` applies new log entries, which costs one ``PRAGMA
+    data_version`` check when nothing changed, so a request sees every
+    write acknowledged before it started, whichever worker took it.
+
+    Writes go through a second connection, one at a time per worker; waiting
+    for another worker's write lock happens in a thread, so the event loop
+    keeps serving meanwhile. Reads never wait for writers in WAL mode.
+
+    Derived state (search index, duplicate clusters, triage) is updated in
+    log order on every worker, so it comes out the same everywhere. The log
+    is replayed at startup. Jobs that must run once (export, answer
+    regeneration) run in the worker holding the leader lease; each worker
+    publishes its counters for ``cluster_stats``.
+
+    With ``path`` unset, ``commit`` just runs the mutation.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str],
+        state,
+        heartbeat_seconds: float = 5.0,
+        lease_seconds: float = 15.0,
+        conversation_ttl: float = 1800.0
+    ):
+        self.path = path or None
+        self.state = state
+        self.heartbeat_seconds = heartbeat_seconds
+        self.lease_seconds = lease_seconds
+        self.conversation_ttl = conversation_ttl
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self.started_at = time.time()
+        self.conn: Optional[sqlite3.Connection] = None  # reads, on the event loop
+        self.writer: Optional[sqlite3.Connection] = None  # writes, under write_lock
+        self.write_lock = asyncio.Lock()
+        self.conversation_writes: Dict[str, tuple] = {}  # saved turns not yet written
+        self.conversation_flush = None
+        self.applied = 0  # last log sequence number applied to this worker's stores
+        self.data_version = None
+        self.leader = False
+        self.counts = {"commits": 0, "applied": 0, "catch_ups": 0, "requests": 0, "request_seconds": 0.0}
+        self.recovery = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def open(self):
+        """Connect to the shared database; sessions must already live outside the process"""
+        if isinstance(self.state.sessions, MemorySessionStore):
+            raise RuntimeError(
+                "Shared state requires a shared session backend (CITIZEN_AI_SESSION_BACKEND=sqlite, redis or signed)"
+            )
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Autocommit mode: transactions are begun explicitly in ``commit``
+        self.writer = sqlite3.connect(self.path, timeout=10, isolation_level=None, check_same_thread=False)
+        self.writer.execute("PRAGMA journal_mode=WAL")
+        self.writer.execute("PRAGMA synchronous=NORMAL")
+        for statement in SCHEMA:
+            self.writer.execute(statement)
+        self.conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+
+    # Records
+
+    async def commit(self, kind: str, mutate: Callable[[], Optional[Dict]]) -> Optional[Dict]:
+        """Run ``mutate`` on up-to-date stores and log its result for the other workers
+
+        ``mutate`` must not await; an exception from it rolls the transaction
+        back and propagates. Conversation turns saved since the last write
+        are written in the same transaction.
+        """
+        if self.conn is None:
+            return mutate()
+        conn = self.writer
+        async with self.write_lock:
+            await self._begin()
+            # From here on nothing waits: this worker holds the database write lock
+            try:
+                self._apply_new(conn)
+                data = mutate()
+                if data is not None:
+                    cursor = conn.execute(
+                        "INSERT INTO log (kind, data, worker, created_at) VALUES (?, ?, ?, ?)",
+                        (kind, json.dumps(data, ensure_ascii=False, separators=(",", ":")), self.worker_id, time.time())
+                    )
+                    self.applied = cursor.lastrowid
+                self._write_conversations(self._take_conversation_writes())
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+        self.counts["commits"] += 1
+        return data
+
+    async def _begin(self):
+        """BEGIN IMMEDIATE in a thread: it waits while another worker writes"""
+        begin = asyncio.ensure_future(asyncio.to_thread(self.writer.execute, "BEGIN IMMEDIATE"))
+        try:
+            await asyncio.shield(begin)
+        except asyncio.CancelledError:
+            # The thread still gets the lock eventually; release it before giving up
+            try:
+                await begin
+            except sqlite3.Error:
+                pass
+            else:
+                self.writer.execute("ROLLBACK")
+            raise
+
+    def catch_up(self) -> int:
+        """Apply what other workers logged since the last call; returns how many entries"""
+        if self.conn is None:
+            return 0
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        if version == self.data_version:
+            return 0
+        self.data_version = version
+        return self._apply_new(self.conn)
+
+    def _apply_new(self, conn: sqlite3.Connection) -> int:
+        rows = conn.execute(
+            "SELECT seq, kind, data FROM log WHERE seq > ? ORDER BY seq", (self.applied,)
+        ).fetchall()
+        for seq, kind, data in rows:
+            self.apply(kind, json.loads(data))
+            self.applied = seq
+        if rows:
+            self.counts["catch_ups"] += 1
+            self.counts["applied"] += len(rows)
+        return len(rows)
+
+    def apply(self, kind: str, data: Dict):
+        """Apply one logged change to the stores and the state derived from them"""
+        state = self.state
+        state.persistence.apply(kind, data)
+        if kind == "feedback":
+            state.search_index.add_feedback(data)
+        elif kind == "concern":
+            dedup = state.concern_dedup
+            dedup.add(data["id"], data["title"], data["description"], dedup.check(data["title"], data["description"]))
+            state.search_index.add_concern(data)
+            state.triage.notify()
+        elif kind == "concern_status":
+            state.concern_dedup.status_changed(data["concern_id"], data["previous_status"], data["status"])
+        elif kind == "chat":
+            state.search_index.add_chat(data)
+
+    def recover(self) -> Dict:
+        """Replay the whole log into empty stores; call before serving requests"""
+        started = time.perf_counter()
+        replayed = self._apply_new(self.conn)
+        self.recovery = {"replayed": replayed, "seconds": round(time.perf_counter() - started, 3)}
+        print(
+            f"Shared state: replayed {replayed} log entries in {self.recovery['seconds']}s "
+            f"({len(self.state.feedback_data)} feedback, {len(self.state.concerns)} concerns)"
+        )
+        return self.recovery
+
+    # Conversations
+
+    def load_conversation(self, session_id: str, conversation) -> bool:
+        """Take over turns another worker saved since; True if ``conversation`` changed"""
+        if self.conn is None:
+            return False
+        row = self.conn.execute(
+            "SELECT version, data FROM conversations WHERE id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.conversation_ttl)
+        ).fetchone()
+        if row is None or row[0] <= conversation.version:
+            return False
+        data = json.loads(row[1])
+        conversation.turns = [tuple(turn) for turn in data["turns"]]
+        conversation.summarized = data["summarized"]
+        conversation.service = data["service"]
+        conversation.version = row[0]
+        return True
+
+    def save_conversation(self, session_id: str, conversation):
+        """Queue a conversation's new turn for the next write (the chat route's ``commit``)"""
+        if self.conn is None:
+            return
+        conversation.version += 1
+        data = {"turns": conversation.turns, "summarized": conversation.summarized, "service": conversation.service}
+        self.conversation_writes[session_id] = (
+            session_id, conversation.version, json.dumps(data, ensure_ascii=False), time.time()
+        )
+        if self.conversation_flush is None:
+            # Written on its own if no commit comes first
+            self.conversation_flush = asyncio.get_running_loop().create_task(self._flush_conversations())
+
+    def _take_conversation_writes(self) -> List[tuple]:
+        rows = list(self.conversation_writes.values())
+        self.conversation_writes.clear()
+        return rows
+
+    def _write_conversations(self, rows: List[tuple]):
+        if rows:
+            self.writer.executemany(
+                "INSERT OR REPLACE INTO conversations (id, version, data, updated_at) VALUES (?, ?, ?, ?)", rows
+            )
+
+    async def _flush_conversations(self):
+        try:
+            async with self.write_lock:
+                rows = self._take_conversation_writes()
+                if rows and self.writer is not None:
+                    await asyncio.to_thread(self._write_conversations, rows)
+        except Exception as e:
+            print(f"Error saving shared conversations: {e}")
+        finally:
+            self.conversation_flush = None
+
+    # Leadership and metrics
+
+    def is_leader(self) -> bool:
+        """Whether this worker runs the once-per-deployment jobs (always True without shared state)"""
+        return self.conn is None or self.leader
+
+    def _renew_lease(self, now: float):
+        conn = self.writer
+        conn.execute(
+            "INSERT OR IGNORE INTO leases (name, owner, expires_at) VALUES (?, ?, ?)",
+            (LEADER_LEASE, self.worker_id, now + self.lease_seconds)
+        )
+        cursor = conn.execute(
+            "UPDATE leases SET owner = ?, expires_at = ? WHERE name = ? AND (owner = ? OR expires_at < ?)",
+            (self.worker_id, now + self.lease_seconds, LEADER_LEASE, self.worker_id, now)
+        )
+        leader = cursor.rowcount == 1
+        if leader and not self.leader:
+            print(f"Worker {self.worker_id} is now the leader")
+        self.leader = leader
+
+    async def heartbeat(self, stats: Dict):
+        """Renew the lease, publish this worker's counters and drop expired shared rows"""
+        async with self.write_lock:
+            await asyncio.to_thread(self._heartbeat, dict(stats, shared=self.stats()))
+
+    def _heartbeat(self, stats: Dict):
+        now = time.time()
+        self._renew_lease(now)
+        self.writer.execute(
+            "INSERT OR REPLACE INTO workers (id, pid, started_at, updated_at, stats) VALUES (?, ?, ?, ?, ?)",
+            (self.worker_id, os.getpid(), self.started_at, now, json.dumps(stats))
+        )
+        if self.leader:
+            self.writer.execute("DELETE FROM workers WHERE updated_at < ?", (now - 10 * self.heartbeat_seconds,))
+            self.writer.execute("DELETE FROM conversations WHERE updated_at < ?", (now - self.conversation_ttl,))
+
+    async def run(self, stats: Callable[[], Dict]):
+        """Background task: stay caught up between requests and send heartbeats"""
+        while True:
+            try:
+                self.catch_up()
+                await self.heartbeat(stats())
+            except Exception as e:
+                print(f"Error updating shared state: {e}")
+            await asyncio.sleep(self.heartbeat_seconds)
+
+    def close(self):
+        """Hand over leadership right away and leave the worker list (on shutdown)"""
+        if self.conn is None:
+            return
+        self._write_conversations(self._take_conversation_writes())
+        self.writer.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (LEADER_LEASE, self.worker_id))
+        self.writer.execute("DELETE FROM workers WHERE id = ?", (self.worker_id,))
+        self.writer.close()
+        self.conn.close()
+        self.conn = self.writer = None
+
+    def stats(self) -> Dict:
+        if self.conn is None:
+            return {"enabled": False}
+        return dict(
+            self.counts,
+            enabled=True,
+            worker=self.worker_id,
+            leader=self.leader,
+            applied_seq=self.applied,
+            recovery=self.recovery
+        )
+
+    def cluster_stats(self) -> Dict:
+        """Every live worker's published counters, and their totals"""
+        if self.conn is None:
+            return {"enabled": False}
+        now = time.time()
+        rows = self.conn.execute(
+            "SELECT id, pid, started_at, updated_at, stats FROM workers ORDER BY started_at"
+        ).fetchall()
+        last_seq = self.conn.execute("SELECT COALESCE(MAX(seq), 0) FROM log").fetchone()[0]
+        workers: List[Dict] = []
+        totals: Dict = {}
+        for worker_id, pid, started_at, updated_at, stats in rows:
+            if now - updated_at > 3 * self.heartbeat_seconds:
+                continue  # stopped or stuck; removed by the leader later
+            stats = json.loads(stats)
+            _add_counters(totals, stats)
+            workers.append({
+                "id": worker_id,
+                "pid": pid,
+                "uptime_seconds": round(now - started_at),
+                "seconds_since_heartbeat": round(now - updated_at, 1),
+                "log_lag": last_seq - stats.get("shared", {}).get("applied_seq", 0),
+                **stats
+            })
+        leader = self.conn.execute(
+            "SELECT owner FROM leases WHERE name = ? AND expires_at >= ?", (LEADER_LEASE, now)
+        ).fetchone()
+        totals.pop("shared", None)
+        return {
+            "enabled": True,
+            "log_entries": last_seq,
+            "leader": leader[0] if leader else None,
+            "live_workers": len(workers),
+            "totals": totals,
+            "workers": workers
+        }
+
+
+class SharedStateMiddleware:
+    """ASGI middleware applying other workers' writes before each request, and counting requests"""
+
+    def __init__(self, app, shared: SharedState):
+        self.app = app
+        self.shared = shared
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        shared = self.shared
+        started = time.perf_counter()
+        shared.catch_up()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            shared.counts["requests"] += 1
+            shared.counts["request_seconds"] += time.perf_counter() - started
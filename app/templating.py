@@ -0,0 +1,88 @@
+import os
+from collections import OrderedDict
+from typing import Dict, Iterable
+
+from fastapi import Request
+from fastapi.responses import Response
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+
+from app import config
+from app.delivery import StaticAsset, asset_response
+
+
+class FragmentCacheExtension(Extension):
+    """``{% cache "name", version %}...{% endcache %}`` caches rendered HTML
+
+    The fragment is rendered once per (name, version); pass a value that
+    changes with the data the fragment shows (e.g. store versions) and
+    stale entries simply stop being hit. Old entries are evicted LRU-first.
+    """
+
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=OrderedDict(), fragment_cache_size=64)
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        else:
+            args.append(nodes.Const(None))
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        return nodes.CallBlock(self.call_method("_cache_support", args), [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, name, version, caller):
+        cache = self.environment.fragment_cache
+        key = (name, version)
+        rendered = cache.get(key)
+        if rendered is not None:
+            cache.move_to_end(key)
+            return rendered
+        rendered = caller()
+        cache[key] = rendered
+        while len(cache) > self.environment.fragment_cache_size:
+            cache.popitem(last=False)
+        return rendered
+
+
+def create_templates(directory: str = "app/templates") -> Jinja2Templates:
+    """The app's single template environment, with compiled templates cached on disk"""
+    templates = Jinja2Templates(directory=directory)
+    env = templates.env
+    if config.TEMPLATE_CACHE_DIR:
+        os.makedirs(config.TEMPLATE_CACHE_DIR, exist_ok=True)
+        env.bytecode_cache = FileSystemBytecodeCache(config.TEMPLATE_CACHE_DIR)
+    # Without auto reload, templates are not re-checked on disk for every render
+    env.auto_reload = config.TEMPLATE_AUTO_RELOAD
+    env.add_extension(FragmentCacheExtension)
+    return templates
+
+
+templates = create_templates()
+
+
+class StaticPages:
+    """Pages whose HTML does not depend on the request, rendered once at startup
+
+    Each page is kept as bytes with precompressed variants and an ETag, so a
+    request is a dictionary lookup; browsers revalidate with If-None-Match.
+    """
+
+    def __init__(self, templates: Jinja2Templates, names: Iterable[str]):
+        self.templates = templates
+        self.names = list(names)
+        self.pages: Dict[str, StaticAsset] = {}
+
+    def render(self):
+        self.pages = {
+            name: StaticAsset(name, self.templates.get_template(name).render().encode("utf-8"))
+            for name in self.names
+        }
+
+    def response(self, request: Request, name: str) -> Response:
+        return asset_response(request.scope, self.pages[name], "no-cache")
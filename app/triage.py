@@ -0,0 +1,204 @@
+import asyncio
+import math
+import time
+from array import array
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from app.records import CATEGORIES, PRIORITIES, ColumnarStore
+from app.search import tokenize
+
+# Expected urgency of each priority class, 0 (Low) to 1 (Critical)
+PRIORITY_URGENCY = {"Low": 0.0, "Medium": 1 / 3, "High": 2 / 3, "Critical": 1.0}
+
+# Cold-start examples so suggestions are sensible before any concern is stored
+SEED_EXAMPLES = {
+    "category": {
+        "Infrastructure": "road pothole bridge footpath street light drain sewage pipe building repair construction",
+        "Public Services": "water supply electricity power outage garbage collection ration card certificate office",
+        "Healthcare": "hospital doctor clinic medicine ambulance patient health nurse vaccination treatment",
+        "Education": "school teacher college student fees admission exam classroom books scholarship",
+        "Transportation": "bus train metro route timing ticket traffic signal parking auto taxi",
+        "Environment": "pollution smoke dust noise tree park waste burning dumping river lake",
+        "Safety": "crime theft police harassment unsafe dark assault fire danger stray dogs",
+        "Administrative": "application delay bribe corruption staff rude website portal document verification",
+        "Other": "general query suggestion information feedback request"
+    },
+    "priority": {
+        "Low": "suggestion request information minor cosmetic improvement would be nice",
+        "Medium": "delay pending not working slow inconvenience repeated complaint",
+        "High": "broken blocked overflow outage unsafe no water days urgent",
+        "Critical": "fire gas leak collapse electrocution accident injured emergency flood life threatening danger"
+    }
+}
+
+
+def vectorize(title: str, description: str) -> Dict[str, float]:
+    """Sparse, L2-normalised bag of words (title words count twice)"""
+    counts = Counter()
+    for _, term in tokenize(title):
+        counts[term] += 2
+    counts.update(term for _, term in tokenize(description))
+    vector = {term: 1 + math.log(n) for term, n in counts.items()}
+    norm = math.sqrt(sum(x * x for x in vector.values())) or 1.0
+    return {term: x / norm for term, x in vector.items()}
+
+
+class NearestCentroid:
+    """Cosine nearest-centroid classifier over sparse word vectors, trained incrementally
+
+    Each class keeps the sum of its training vectors as one row per word,
+    so learning a concern is O(words) and the centroid norms are updated in
+    place; nothing is ever retrained from scratch.
+    """
+
+    def __init__(self, labels: Iterable[str], temperature: float = 0.1):
+        self.labels = list(labels)
+        self.index = {label: i for i, label in enumerate(self.labels)}
+        self.temperature = temperature
+        self.rows: Dict[str, List[float]] = {}  # word -> per-class weight sum
+        self.squared_norms = [0.0] * len(self.labels)
+        self.counts = [0] * len(self.labels)
+
+    def learn(self, vector: Dict[str, float], label: str, weight: float = 1.0):
+        c = self.index.get(label)
+        if c is None:
+            return
+        dot = 0.0
+        for word, x in vector.items():
+            row = self.rows.get(word)
+            if row is None:
+                row = self.rows[word] = [0.0] * len(self.labels)
+            dot += row[c] * x
+            row[c] += weight * x
+        # |s + w x|^2 = |s|^2 + 2 w (s . x) + w^2 |x|^2, with |x| = 1
+        self.squared_norms[c] += 2 * weight * dot + weight * weight
+        self.counts[c] += 1
+
+    def probabilities(self, vector: Dict[str, float]) -> List[float]:
+        dots = [0.0] * len(self.labels)
+        for word, x in vector.items():
+            row = self.rows.get(word)
+            if row is not None:
+                dots = [d + w * x for d, w in zip(dots, row)]
+        similarities = [d / math.sqrt(n) if n > 0 else 0.0 for d, n in zip(dots, self.squared_norms)]
+        top = max(similarities)
+        exps = [math.exp((s - top) / self.temperature) for s in similarities]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+
+class TriagePipeline:
+    """Suggested category and urgency for stored concerns, computed in micro-batches
+
+    The request path only calls ``notify()``. A background task waits up to
+    ``max_delay_ms`` for ``batch_size`` new concerns to accumulate, then
+    classifies them in a worker thread: each concern is scored against the
+    category and priority centroids and then added to the centroids under
+    the labels the citizen chose, so the model keeps learning from stored
+    concerns. Urgency is the expected priority (0 = Low, 1 = Critical).
+    """
+
+    def __init__(self, concerns: ColumnarStore, batch_size: int = 64, max_delay_ms: float = 200.0):
+        self.concerns = concerns
+        self.batch_size = batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.category = NearestCentroid(CATEGORIES)
+        self.priority = NearestCentroid(PRIORITIES)
+        for label, text in SEED_EXAMPLES["category"].items():
+            self.category.learn(vectorize("", text), label, weight=3.0)
+        for label, text in SEED_EXAMPLES["priority"].items():
+            self.priority.learn(vectorize("", text), label, weight=3.0)
+        self.urgency_weights = [PRIORITY_URGENCY[label] for label in self.priority.labels]
+        # Per concern (id - 1); only the first ``processed`` entries exist
+        self.suggested_category = array("B")
+        self.suggested_priority = array("B")
+        self.urgency = array("f")
+        self.processed = 0
+        self.version = 0  # bumped per batch, for cache invalidation
+        self.batches = 0
+        self.busy_seconds = 0.0
+        self.wakeup: Optional[asyncio.Event] = None
+
+    def notify(self):
+        """A concern was stored; wake the background task"""
+        if self.wakeup is not None:
+            self.wakeup.set()
+
+    def pending(self) -> int:
+        return len(self.concerns) - self.processed
+
+    def process(self, limit: Optional[int] = None) -> int:
+        """Triage the next batch of stored concerns (called from a worker thread)"""
+        start = self.processed
+        end = min(len(self.concerns), start + (limit or self.batch_size))
+        started = time.perf_counter()
+        concerns = self.concerns
+        for concern_id in range(start + 1, end + 1):
+            vector = vectorize(concerns.value(concern_id, "title"), concerns.value(concern_id, "description"))
+            categories = self.category.probabilities(vector)
+            priorities = self.priority.probabilities(vector)
+            self.suggested_category.append(categories.index(max(categories)))
+            self.suggested_priority.append(priorities.index(max(priorities)))
+            self.urgency.append(sum(p * w for p, w in zip(priorities, self.urgency_weights)))
+            self.category.learn(vector, concerns.value(concern_id, "category"))
+            self.priority.learn(vector, concerns.value(concern_id, "priority"))
+        self.processed = end
+        self.version += 1
+        self.batches += 1
+        self.busy_seconds += time.perf_counter() - started
+        return end - start
+
+    async def run(self):
+        """Background task: classify new concerns in micro-batches off the request path"""
+        self.wakeup = asyncio.Event()
+        while True:
+            if not self.pending():
+                self.wakeup.clear()
+                await self.wakeup.wait()
+            if self.pending() < self.batch_size:
+                # Let a batch build up, but never hold a concern longer than max_delay
+                await asyncio.sleep(self.max_delay)
+            try:
+                while self.pending():
+                    await asyncio.to_thread(self.process)
+            except Exception as e:
+                print(f"Error triaging concerns: {e}")
+                await asyncio.sleep(self.max_delay)
+
+    def result(self, concern_id: int) -> Optional[Dict]:
+        if not 0 < concern_id <= self.processed:
+            return None
+        index = concern_id - 1
+        return {
+            "suggested_category": self.category.labels[self.suggested_category[index]],
+            "suggested_priority": self.priority.labels[self.suggested_priority[index]],
+            "urgency": round(self.urgency[index], 3)
+        }
+
+    def rank_recent(self, count: int = 5, window: int = 50) -> List[Dict]:
+        """The ``count`` most urgent of the last ``window`` concerns
+
+        Concerns not triaged yet rank by the urgency of the citizen's priority.
+        """
+        total = len(self.concerns)
+        ranked = []
+        for concern in self.concerns[max(total - window, 0):total]:
+            triage = self.result(concern["id"])
+            if triage is None:
+                triage = {"urgency": PRIORITY_URGENCY.get(concern["priority"], 0.0)}
+            ranked.append({**concern, **triage})
+        ranked.sort(key=lambda concern: (concern["urgency"], concern["id"]), reverse=True)
+        return ranked[:count]
+
+    def stats(self) -> Dict:
+        return {
+            "triaged": self.processed,
+            "pending": self.pending(),
+            "batches": self.batches,
+            "concerns_per_second": round(self.processed / self.busy_seconds, 1) if self.busy_seconds else None,
+            "training_examples": {
+                "category": dict(zip(self.category.labels, self.category.counts)),
+                "priority": dict(zip(self.priority.labels, self.priority.counts))
+            }
+        }
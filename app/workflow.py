@@ -0,0 +1,234 @@
+from array import array
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+
+from app.records import CATEGORIES, PRIORITIES, STATUSES, ColumnarStore
+
+# Allowed status changes; "Assigned" -> "Assigned" hands a concern to someone else
+TRANSITIONS = {
+    "Open": ("Assigned", "In Progress", "Resolved", "Closed"),
+    "Assigned": ("Open", "Assigned", "In Progress", "Resolved", "Closed"),
+    "In Progress": ("Assigned", "Resolved", "Closed"),
+    "Resolved": ("Open", "Closed"),
+    "Closed": ("Open",),
+}
+
+EVENT_SCHEMA = (
+    ("concern_id", "int"),
+    ("status", STATUSES),
+    ("previous_status", STATUSES),
+    ("version", "int"),
+    ("assignee", "text"),
+    ("actor", "text"),
+    ("note", "text"),
+    ("timestamp", "timestamp"),
+)
+
+
+class InvalidTransition(ValueError):
+    """The requested status change is not allowed from the concern's current status"""
+
+
+class VersionConflict(Exception):
+    """The concern changed since the client read it"""
+
+    def __init__(self, current_version: int):
+        super().__init__(f"Concern was updated by someone else (now at version {current_version})")
+        self.current_version = current_version
+
+
+class ConcernWorkflow:
+    """Status changes of concerns, with an event log and secondary indexes
+
+    Every change is checked against ``TRANSITIONS`` and the concern's
+    version number (optimistic concurrency: a change made with a stale
+    version is rejected), written to the concern store and appended to an
+    append-only event log.
+
+    Concerns are indexed by status, category and priority, so filtered
+    listings walk the smallest matching index entry and check the other
+    filters in the store's columns instead of scanning every concern.
+    Category and priority never change and are kept as sorted id arrays,
+    status as one set per status. The index sizes double as the dashboard
+    counters. New concerns are picked up from the store on the next access.
+    """
+
+    def __init__(self, concerns: ColumnarStore):
+        self.concerns = concerns
+        self.by_status: Dict[str, Set[int]] = {status: set() for status in STATUSES}
+        self.by_field: Dict[str, Dict[str, array]] = {
+            "category": {label: array("I") for label in CATEGORIES},
+            "priority": {label: array("I") for label in PRIORITIES}
+        }
+        self.versions = array("I")  # concern id - 1 -> number of status changes
+        self.assignees: Dict[int, str] = {}
+        self.events = ColumnarStore(EVENT_SCHEMA)
+        self.events_of: Dict[int, List[int]] = {}  # concern id -> event ids
+        self.indexed = 0
+
+    def catch_up(self):
+        """Index concerns added to the store since the last call"""
+        concerns = self.concerns
+        count = len(concerns)
+        if self.indexed == count:
+            return
+        labels = concerns.categoricals["status"].labels
+        codes = concerns.columns["status"]
+        for concern_id in range(self.indexed + 1, count + 1):
+            self.by_status.setdefault(labels[codes[concern_id - 1]], set()).add(concern_id)
+        for field, index in self.by_field.items():
+            labels = concerns.categoricals[field].labels
+            codes = concerns.columns[field]
+            for concern_id in range(self.indexed + 1, count + 1):
+                label = labels[codes[concern_id - 1]]
+                ids = index.get(label)
+                if ids is None:
+                    ids = index[label] = array("I")
+                ids.append(concern_id)
+        self.versions.extend([0] * (count - self.indexed))
+        self.indexed = count
+
+    def version(self, concern_id: int) -> int:
+        self.catch_up()
+        return self.versions[concern_id - 1]
+
+    def assignee(self, concern_id: int) -> Optional[str]:
+        return self.assignees.get(concern_id)
+
+    def transition(
+        self,
+        concern_id: int,
+        status: str,
+        actor: str,
+        expected_version: Optional[int] = None,
+        assignee: Optional[str] = None,
+        note: str = ""
+    ) -> Dict:
+        """Move a concern to ``status`` and return the logged event
+
+        Runs without awaiting, so the version check and the update are atomic
+        with respect to other requests on the event loop.
+        """
+        self.catch_up()
+        if not 0 < concern_id <= self.indexed:
+            raise KeyError(concern_id)
+        if status not in TRANSITIONS:
+            raise InvalidTransition(f"Unknown status {status!r}; expected one of {', '.join(TRANSITIONS)}")
+        version = self.versions[concern_id - 1]
+        if expected_version is not None and expected_version != version:
+            raise VersionConflict(version)
+        previous = self.concerns.value(concern_id, "status")
+        if status not in TRANSITIONS.get(previous, ()):
+            raise InvalidTransition(f"Cannot move a concern from {previous} to {status}")
+        if status == "Assigned" and not assignee:
+            raise InvalidTransition("An assignee is required to assign a concern")
+
+        return self.apply({
+            "concern_id": concern_id,
+            "status": status,
+            "previous_status": previous,
+            "version": version + 1,
+            "assignee": assignee or self.assignees.get(concern_id, ""),
+            "actor": actor,
+            "note": note,
+            "timestamp": datetime.now().isoformat()
+        })
+
+    def apply(self, event: Dict) -> Optional[Dict]:
+        """Record a status change event from ``transition`` or a replayed log
+
+        Events at or below the concern's current version were applied
+        already and are ignored, so replaying a log twice is harmless.
+        """
+        self.catch_up()
+        concern_id = event["concern_id"]
+        if event["version"] <= self.versions[concern_id - 1]:
+            return None
+        previous = self.concerns.value(concern_id, "status")
+        self.concerns.update(concern_id, "status", event["status"])
+        self.by_status[previous].discard(concern_id)
+        self.by_status.setdefault(event["status"], set()).add(concern_id)
+        if event["assignee"]:
+            self.assignees[concern_id] = event["assignee"]
+        self.versions[concern_id - 1] = event["version"]
+        stored = self.events.append({name: event[name] for name in self.events.fields})
+        self.events_of.setdefault(concern_id, []).append(stored["id"])
+        return stored
+
+    def restore_events(self):
+        """Rebuild versions and assignees from an event log loaded into ``events``"""
+        self.catch_up()
+        self.events_of.clear()
+        events = self.events
+        concern_ids = events.columns["concern_id"]
+        versions = events.columns["version"]
+        assignees = events.columns["assignee"]
+        offsets = events.arena.offsets
+        for index in range(len(events)):
+            concern_id = concern_ids[index]
+            self.versions[concern_id - 1] = max(self.versions[concern_id - 1], versions[index])
+            text = assignees[index]
+            if offsets[text + 1] > offsets[text]:  # non-empty assignee
+                self.assignees[concern_id] = events.arena.get(text)
+            self.events_of.setdefault(concern_id, []).append(index + 1)
+
+    def history(self, concern_id: int) -> List[Dict]:
+        return [self.events.get(event_id) for event_id in self.events_of.get(concern_id, ())]
+
+    def find(
+        self,
+        status: Optional[str] = None,
+        category: Optional[str] = None,
+        priority: Optional[str] = None
+    ) -> List[int]:
+        """Ids of concerns matching every given filter, oldest first"""
+        self.catch_up()
+        filters = {
+            field: label
+            for field, label in (("status", status), ("category", category), ("priority", priority))
+            if label is not None
+        }
+        if not filters:
+            return list(range(1, self.indexed + 1))
+        # Walk the smallest index entry and check the other fields in the store's columns
+        driver = min(filters, key=lambda field: len(self._ids(field, filters[field])))
+        ids = self._ids(driver, filters.pop(driver))
+        checks = []
+        for field, label in filters.items():
+            code = self.concerns.categoricals[field].codes.get(label)
+            if code is None:
+                return []
+            checks.append((self.concerns.columns[field], code))
+        if not checks:
+            matches = list(ids)
+        elif len(checks) == 1:
+            column, code = checks[0]
+            matches = [concern_id for concern_id in ids if column[concern_id - 1] == code]
+        else:
+            (first, first_code), (second, second_code) = checks
+            matches = [
+                concern_id for concern_id in ids
+                if first[concern_id - 1] == first_code and second[concern_id - 1] == second_code
+            ]
+        if driver == "status":
+            matches.sort()
+        return matches
+
+    def _ids(self, field: str, label: str):
+        if field == "status":
+            return self.by_status.get(label, ())
+        return self.by_field[field].get(label, ())
+
+    def counts(self, field: str) -> Dict[str, int]:
+        """Concerns per status, category or priority (zero counts left out)"""
+        self.catch_up()
+        index = self.by_status if field == "status" else self.by_field[field]
+        return {label: len(ids) for label, ids in index.items() if ids}
+
+    def stats(self) -> Dict:
+        self.catch_up()
+        return {
+            "statuses": self.counts("status"),
+            "events": len(self.events),
+            "assigned": len(self.assignees)
+        }
@@ -0,0 +1,94 @@
+"""
+Concern workflow benchmark: filtered listings by index intersection vs store scan
+
+Fills the concern store, moves a share of concerns through the workflow,
+then times "status + priority + category" listings answered from the
+workflow indexes against a scan of the store's columns, and the cost of a
+status change.
+
+    python -m benchmarks.concern_workflow --concerns 1000000
+"""
+
+import argparse
+import random
+import statistics
+import time
+from datetime import datetime, timedelta
+
+from app.records import CATEGORIES, PRIORITIES, create_concern_store
+from app.workflow import ConcernWorkflow
+
+FILTERS = [
+    {"status": "Open", "priority": "High", "category": "Infrastructure"},
+    {"status": "In Progress", "priority": "Critical"},
+    {"status": "Assigned", "category": "Healthcare"},
+    {"category": "Safety", "priority": "Low"},
+]
+
+
+def scan(concerns, filters):
+    """Same result as ConcernWorkflow.find, by decoding the filtered columns of every row"""
+    return [
+        concern_id for concern_id in range(1, len(concerns) + 1)
+        if all(concerns.value(concern_id, field) == label for field, label in filters.items())
+    ]
+
+
+def timed(function, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = function()
+        timings.append((time.perf_counter() - started) * 1000)
+    return result, statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concerns", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    concerns = create_concern_store()
+    start = datetime(2024, 1, 1)
+    for i in range(args.concerns):
+        concerns.append({
+            "title": "Concern",
+            "description": "",
+            "category": rng.choice(CATEGORIES),
+            "priority": rng.choice(PRIORITIES),
+            "sentiment": "Neutral",
+            "status": "Open",
+            "timestamp": (start + timedelta(seconds=i)).isoformat()
+        })
+
+    workflow = ConcernWorkflow(concerns)
+    started = time.perf_counter()
+    workflow.catch_up()
+    print(f"Indexed {len(concerns)} concerns in {time.perf_counter() - started:.2f}s")
+
+    changes = args.concerns // 2
+    started = time.perf_counter()
+    for concern_id in rng.sample(range(1, len(concerns) + 1), changes):
+        workflow.transition(concern_id, "Assigned", "admin", assignee="ward office")
+        if rng.random() < 0.5:
+            workflow.transition(concern_id, "In Progress", "admin", expected_version=1)
+    seconds = time.perf_counter() - started
+    print(f"{len(workflow.events)} status changes at {len(workflow.events) / seconds:,.0f}/s")
+
+    print(f"\n{'Filter':<48} {'hits':>7} {'index ms':>9} {'scan ms':>9}")
+    for filters in FILTERS:
+        found, index_ms = timed(lambda: workflow.find(**filters), args.repeat)
+        expected, scan_ms = timed(lambda: scan(concerns, filters), max(1, args.repeat // 5))
+        assert found == expected
+        name = " + ".join(filters.values())
+        print(f"{name:<48} {len(found):>7} {index_ms:9.2f} {scan_ms:9.2f}")
+
+    _, counts_ms = timed(lambda: workflow.counts("status"), args.repeat)
+    _, column_ms = timed(lambda: concerns.counts("status"), args.repeat)
+    print(f"\nStatus counts: {counts_ms:.3f} ms from the indexes, {column_ms:.2f} ms counting the column")
+
+
+if __name__ == "__main__":
+    main()
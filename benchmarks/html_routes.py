@@ -0,0 +1,117 @@
+"""
+HTML route benchmark: requests/s of page routes before/after template caching
+
+Compares rendering the public pages with Jinja on every request (the old
+behaviour, served from /rendered/...) against the pre-rendered page bytes,
+and the admin dashboard with and without its fragment cache. Records are
+pre-filled so the dashboard has data to summarise.
+
+    python -m benchmarks.html_routes --requests 2000 --records 5000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse
+
+from app.chat_store import ChatHistoryStore
+from app.delivery import StaticAssets
+from app.records import CATEGORIES, PRIORITIES, SENTIMENTS, create_concern_store, create_feedback_store
+from app.routes.auth import router as auth_router
+from app.routes.chat import router as chat_router
+from app.routes.concern import router as concern_router
+from app.routes.dashboard import router as dashboard_router
+from app.routes.feedback import router as feedback_router
+from app.sessions import MemorySessionStore
+from app.templating import StaticPages, templates
+
+PAGES = {
+    "/chat/": "chat.html",
+    "/feedback/": "feedback.html",
+    "/concern/": "concern.html",
+    "/auth/login": "login.html"
+}
+
+
+def build_app(records: int) -> FastAPI:
+    app = FastAPI()
+    app.state.static_assets = StaticAssets("app/static")
+    templates.env.globals["static_url"] = app.state.static_assets.url
+    app.state.static_pages = StaticPages(templates, PAGES.values())
+    app.state.static_pages.render()
+    app.include_router(auth_router, prefix="/auth")
+    app.include_router(chat_router, prefix="/chat")
+    app.include_router(feedback_router, prefix="/feedback")
+    app.include_router(concern_router, prefix="/concern")
+    app.include_router(dashboard_router, prefix="/dashboard")
+
+    @app.get("/rendered/{name}", response_class=HTMLResponse)
+    async def rendered(request: Request, name: str):
+        return HTMLResponse(templates.get_template(name).render(request=request))
+
+    rng = random.Random(0)
+    now = datetime.now()
+    app.state.feedback_data = create_feedback_store()
+    app.state.concerns = create_concern_store()
+    app.state.chat_history = ChatHistoryStore(hot_size=1000, segment_size=1000, spill_dir=None, retention_days=30)
+    for i in range(records):
+        timestamp = now - timedelta(minutes=rng.randrange(60 * 24 * 30))
+        app.state.feedback_data.append({
+            "text": f"Feedback {i} about the passport office",
+            "sentiment": rng.choice(SENTIMENTS),
+            "timestamp": timestamp
+        })
+        app.state.concerns.append({
+            "title": f"Concern {i}",
+            "description": "Street lights not working",
+            "category": rng.choice(CATEGORIES),
+            "priority": rng.choice(PRIORITIES),
+            "sentiment": rng.choice(SENTIMENTS),
+            "status": "Open",
+            "timestamp": timestamp
+        })
+    app.state.sessions = MemorySessionStore(ttl=3600, max_size=100)
+    return app
+
+
+async def throughput(client: httpx.AsyncClient, url: str, requests: int) -> float:
+    start = time.perf_counter()
+    for _ in range(requests):
+        response = await client.get(url)
+        response.raise_for_status()
+    return requests / (time.perf_counter() - start)
+
+
+async def run(args):
+    app = build_app(args.records)
+    session_id = app.state.sessions.create({"username": "admin", "role": "admin"})
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", cookies={"session_id": session_id}) as client:
+        print(f"{'Route':<20} {'rendered/s':>12} {'cached/s':>12}")
+        for url, page in PAGES.items():
+            before = await throughput(client, f"/rendered/{page}", args.requests)
+            after = await throughput(client, url, args.requests)
+            print(f"{url:<20} {before:12.0f} {after:12.0f}")
+
+        dashboard_requests = max(1, args.requests // 10)
+        templates.env.fragment_cache_size = 0
+        before = await throughput(client, "/dashboard/admin", dashboard_requests)
+        templates.env.fragment_cache_size = 64
+        after = await throughput(client, "/dashboard/admin", dashboard_requests)
+        print(f"{'/dashboard/admin':<20} {before:12.0f} {after:12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--records", type=int, default=5000, help="feedback and concern records to pre-fill")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
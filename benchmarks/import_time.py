@@ -0,0 +1,78 @@
+"""
+Import time report: where the web process spends its start-up imports
+
+Runs ``python -X importtime -c "import <module>"`` in a fresh interpreter
+(so nothing is cached in sys.modules), parses the per-module timings and
+prints the slowest modules by cumulative and by self time, plus a per
+top-level package breakdown.
+
+    python -m benchmarks.import_time --module app.main --top 20
+    CITIZEN_AI_MODEL_ENABLED=0 python -m benchmarks.import_time
+"""
+
+import argparse
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+
+def measure(module: str):
+    """Return (wall seconds, [(module, self_us, cumulative_us, depth)])"""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise SystemExit(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time:   self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3:
+            continue
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return wall, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    wall, rows = measure(args.module)
+    total_us = sum(self_us for _, self_us, _, _ in rows)
+
+    packages = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        packages[name.split(".")[0]] += self_us
+
+    print(f"import {args.module}: {wall:.2f}s wall (interpreter start included), "
+          f"{total_us / 1e6:.2f}s in {len(rows)} module imports")
+    heavy = [name for name in ("torch", "transformers", "pyarrow") if name in packages]
+    print(f"Heavy libraries imported: {', '.join(heavy) if heavy else 'none'}")
+
+    print(f"\nTop {args.top} by cumulative time")
+    for name, _, cumulative_us, depth in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"  {cumulative_us / 1000:10.1f} ms  {'  ' * depth}{name}")
+
+    print(f"\nTop {args.top} by self time")
+    for name, self_us, _, _ in sorted(rows, key=lambda r: -r[1])[:args.top]:
+        print(f"  {self_us / 1000:10.1f} ms  {name}")
+
+    print(f"\nTop {args.top} packages (self time summed)")
+    for name, self_us in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f"  {self_us / 1000:10.1f} ms  {name:<30} {100 * self_us / total_us:5.1f}%")
+
+
+if __name__ == "__main__":
+    main()
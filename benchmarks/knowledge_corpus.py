@@ -0,0 +1,75 @@
+"""
+Knowledge corpus benchmark: keyword-indexed service matching and reload cost
+
+Times matching chat questions against the corpus keyword index against
+the substring scan over every keyword it replaced, and how long loading a
+new corpus version takes (the work done in a thread before the swap).
+
+    python -m benchmarks.knowledge_corpus --queries 100000
+"""
+
+import argparse
+import random
+import time
+
+from app.corpus import KnowledgeCorpus
+
+QUESTIONS = [
+    "How do I apply for an Aadhaar card?",
+    "What documents are needed for a new PAN card",
+    "my pension has not been credited for three months",
+    "The streetlight on our road has been broken for weeks",
+    "how long does passport verification take",
+    "where do I register a birth certificate for my daughter",
+    "bus route 42 is always late in the morning",
+    "Is there a fee for a duplicate driving license?",
+    "income tax return filing deadline",
+    "water supply only comes for one hour a day",
+]
+
+
+def scan(keywords, question: str):
+    """Match the way the inline keyword list did: first service with any keyword as a substring"""
+    question = question.lower()
+    for service, words in keywords:
+        if any(keyword in question for keyword in words):
+            return service
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--queries", type=int, default=100000)
+    parser.add_argument("--reloads", type=int, default=50)
+    args = parser.parse_args()
+
+    corpus = KnowledgeCorpus()
+    snapshot = corpus.current
+    keywords = sorted(
+        ((service, snapshot.keywords[service]) for service in snapshot.answers if snapshot.keywords[service]),
+        key=lambda item: snapshot.order[item[0]]
+    )
+    rng = random.Random(5)
+    queries = [rng.choice(QUESTIONS) for _ in range(args.queries)]
+
+    started = time.perf_counter()
+    for query in queries:
+        scan(keywords, query)
+    scan_us = (time.perf_counter() - started) / len(queries) * 1e6
+    started = time.perf_counter()
+    for query in queries:
+        snapshot.match(query)
+    index_us = (time.perf_counter() - started) / len(queries) * 1e6
+    print(f"{len(snapshot)} answers, {sum(len(words) for _, words in keywords)} keywords")
+    print(f"Match: {index_us:.2f} us indexed, {scan_us:.2f} us substring scan")
+
+    started = time.perf_counter()
+    for _ in range(args.reloads):
+        corpus.signature = ()  # force a full load
+        corpus.reload()
+    print(f"Reload: {(time.perf_counter() - started) / args.reloads * 1000:.2f} ms per version "
+          f"(now version {corpus.current.version})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Login flood benchmark: login throughput and latency of unrelated routes
+
+Fires concurrent logins at POST /auth/login while a second client polls
+GET /concern/list, then reports logins/s and p50/p99 of the unrelated route.
+Run once with the thread pool and once with --inline (hashing on the event
+loop) to see the difference.
+
+    python -m benchmarks.login_flood --logins 400 --concurrency 32
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from app.ratelimit import RateLimiter
+from app.records import create_concern_store
+from app.routes.auth import router as auth_router
+from app.routes.concern import router as concern_router
+from app.security import PasswordVerifier, hash_password
+from app.sessions import MemorySessionStore
+
+
+def build_app(inline: bool, workers: int, cache_ttl: float) -> FastAPI:
+    app = FastAPI()
+    app.include_router(auth_router, prefix="/auth")
+    app.include_router(concern_router, prefix="/concern")
+    app.state.users = {"admin": {"password_hash": hash_password("admin123"), "role": "admin"}}
+    app.state.sessions = MemorySessionStore(ttl=3600, max_size=100000)
+    app.state.concerns = create_concern_store()
+    app.state.password_verifier = PasswordVerifier(max_workers=workers, cache_ttl=cache_ttl, inline=inline)
+    # The flood comes from one client, so lift the limiter to measure raw throughput
+    app.state.login_limiter = RateLimiter(capacity=1e9, rate=1e9)
+    return app
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+async def run(args):
+    app = build_app(args.inline, args.workers, args.cache_ttl)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        remaining = args.logins
+        done = asyncio.Event()
+        latencies = []
+
+        async def login_worker():
+            nonlocal remaining
+            while remaining > 0:
+                remaining -= 1
+                await client.post("/auth/login", data={"username": "admin", "password": "admin123"})
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                await client.get("/concern/list")
+                latencies.append((time.perf_counter() - start) * 1000)
+                await asyncio.sleep(0.005)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(login_worker() for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+
+    mode = "inline" if args.inline else f"pool ({args.workers} workers)"
+    print(f"Mode:                 {mode}, cache ttl {args.cache_ttl}s")
+    print(f"Logins:               {args.logins} in {elapsed:.2f}s ({args.logins / elapsed:.1f}/s)")
+    print(f"/concern/list p50:    {statistics.median(latencies):.2f} ms")
+    print(f"/concern/list p99:    {percentile(latencies, 99):.2f} ms ({len(latencies)} samples)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--cache-ttl", type=float, default=0.0, help="0 disables the verification cache")
+    parser.add_argument("--inline", action="store_true", help="hash on the event loop")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
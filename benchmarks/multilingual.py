@@ -0,0 +1,129 @@
+"""
+Multilingual benchmark: cheap-path hit rates with and without query normalization
+
+Runs sample Hindi, Telugu, Hinglish and English questions and feedback
+through the fallback service matcher and the keyword sentiment, once with
+the normalizer and once with plain English keyword matching (the previous
+behaviour), and times normalization with a cold and a warm cache.
+
+    python -m benchmarks.multilingual --repeat 20000
+"""
+
+import argparse
+import time
+
+from app.ai_model import GraniteModel
+from app.language import Normalized
+
+QUESTIONS = {
+    "en": [
+        ("How do I apply for an Aadhaar card?", "aadhaar"),
+        ("What documents are needed for a passport?", "passport"),
+        ("How to get a ration card", "ration_card"),
+        ("Old age pension eligibility", "pension"),
+        ("How do I file a complaint about my area?", "grievance_redressal"),
+    ],
+    "hi": [
+        ("आधार कार्ड के लिए आवेदन कैसे करें?", "aadhaar"),
+        ("मुझे पैन कार्ड कैसे मिलेगा?", "pan_card"),
+        ("राशन कार्ड बनवाने के लिए क्या चाहिए", "ration_card"),
+        ("वृद्धावस्था पेंशन की जानकारी", "pension"),
+        ("ड्राइविंग लाइसेंस कैसे बनवाएं", "driving_license"),
+        ("जन्म प्रमाण पत्र कहाँ मिलेगा", "birth_death_certificate"),
+        ("शिकायत कैसे दर्ज करें", "grievance_redressal"),
+        ("वोटर कार्ड में नाम कैसे जोड़ें", "voter_id"),
+    ],
+    "hinglish": [
+        ("mera pan card kaise banega", "pan_card"),
+        ("rashan card ke liye kya karna hai", "ration_card"),
+        ("budhapa pension kab milegi", "pension"),
+        ("shikayat kahan karu", "grievance_redressal"),
+        ("janam praman patra kaise milega", "birth_death_certificate"),
+        ("matdata suchi mein naam kaise jode", "voter_id"),
+    ],
+    "te": [
+        ("ఆధార్ కార్డు ఎలా పొందాలి?", "aadhaar"),
+        ("పింఛను కోసం దరఖాస్తు ఎలా చేయాలి", "pension"),
+        ("రేషన్ కార్డు కావాలి", "ration_card"),
+        ("పాస్‌పోర్ట్ దరఖాస్తు", "passport"),
+        ("ఫిర్యాదు ఎక్కడ ఇవ్వాలి", "grievance_redressal"),
+        ("జనన ధృవీకరణ పత్రం ఎలా పొందాలి", "birth_death_certificate"),
+    ],
+    "tenglish": [
+        ("pinchan ela apply cheyali", "pension"),
+        ("ration card kavali ela", "ration_card"),
+        ("firyadu ekkada ivvali", "grievance_redressal"),
+        ("votu ela veyali naku teliyadu", "voter_id"),
+    ],
+}
+
+FEEDBACK = {
+    "en": [("The staff were very helpful, thank you", "Positive"), ("The portal is slow and confusing", "Negative")],
+    "hi": [
+        ("सेवा बहुत अच्छी थी, धन्यवाद", "Positive"),
+        ("कर्मचारी बहुत बढ़िया थे", "Positive"),
+        ("पोर्टल बहुत धीमा है और बहुत परेशानी हुई", "Negative"),
+        ("सबसे खराब अनुभव, कोई जवाब नहीं", "Negative"),
+    ],
+    "hinglish": [
+        ("service bahut achhi thi, shukriya", "Positive"),
+        ("staff ne bahut kharab behave kiya", "Negative"),
+        ("website kaam nahi kar raha, bahut pareshan hu", "Negative"),
+    ],
+    "te": [
+        ("సేవ చాలా బాగుంది, ధన్యవాదాలు", "Positive"),
+        ("పని చేయడం లేదు, చాలా ఇబ్బంది", "Negative"),
+        ("అధికారులు కోపంగా మాట్లాడారు, నిరాశ", "Negative"),
+    ],
+    "tenglish": [
+        ("seva chala bagundi", "Positive"),
+        ("office lo chala ibbandi, pani cheyadam ledu", "Negative"),
+    ],
+}
+
+
+def hit_rates(model: GraniteModel):
+    rates = {}
+    for language in QUESTIONS:
+        questions = QUESTIONS[language]
+        feedback = FEEDBACK[language]
+        services = sum(model._match_fallback(query) == expected for query, expected in questions)
+        sentiments = sum(model._enhanced_keyword_sentiment(text) == expected for text, expected in feedback)
+        rates[language] = (services / len(questions), sentiments / len(feedback))
+    return rates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5000, help="normalizations per timing")
+    args = parser.parse_args()
+
+    model = GraniteModel()
+    normalized = hit_rates(model)
+    baseline_model = GraniteModel()
+    baseline_model.normalizer.normalize = lambda text: Normalized("en", text, 0)
+    baseline = hit_rates(baseline_model)
+
+    print(f"{'Language':<10} {'service matches':>22} {'keyword sentiment':>22}")
+    print(f"{'':<10} {'before':>10} {'after':>11} {'before':>10} {'after':>11}")
+    for language in QUESTIONS:
+        (service_before, sentiment_before), (service_after, sentiment_after) = baseline[language], normalized[language]
+        print(f"{language:<10} {service_before:>10.0%} {service_after:>11.0%} "
+              f"{sentiment_before:>10.0%} {sentiment_after:>11.0%}")
+
+    texts = [text for samples in (QUESTIONS, FEEDBACK) for items in samples.values() for text, _ in items]
+    normalize = model.normalizer._normalize
+    started = time.perf_counter()
+    for i in range(args.repeat):
+        normalize(texts[i % len(texts)])
+    cold_us = (time.perf_counter() - started) / args.repeat * 1e6
+    cached = model.normalizer.normalize
+    started = time.perf_counter()
+    for i in range(args.repeat):
+        cached(texts[i % len(texts)])
+    warm_us = (time.perf_counter() - started) / args.repeat * 1e6
+    print(f"\nNormalization: {cold_us:.1f} us uncached, {warm_us:.2f} us cached")
+
+
+if __name__ == "__main__":
+    main()
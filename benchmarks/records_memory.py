@@ -0,0 +1,80 @@
+"""
+Memory benchmark: bytes per stored concern/feedback record
+
+Compares the original list-of-dicts storage with the columnar record store.
+
+    python -m benchmarks.records_memory --records 200000
+"""
+
+import argparse
+import random
+import tracemalloc
+from datetime import datetime, timedelta
+
+from app.records import CATEGORIES, PRIORITIES, SENTIMENTS, create_concern_store, create_feedback_store
+
+TITLES = ["Road Repair Needed", "Streetlight not working", "Garbage not collected",
+          "Water supply interrupted", "Library Hours", "Broken footpath"]
+
+
+def generate(count: int):
+    start = datetime(2024, 1, 1)
+    rng = random.Random(42)
+    for i in range(count):
+        timestamp = (start + timedelta(seconds=i * 37)).isoformat()
+        title = rng.choice(TITLES)
+        yield {
+            "title": title,
+            "description": f"{title} near ward {rng.randint(1, 200)}, reported by resident #{i}",
+            "category": rng.choice(CATEGORIES),
+            "priority": rng.choice(PRIORITIES),
+            "sentiment": rng.choice(SENTIMENTS),
+            "status": "Open",
+            "timestamp": timestamp
+        }
+
+
+def measure(build) -> int:
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    data = build()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del data
+    return size
+
+
+def build_dicts(count: int):
+    concerns = []
+    for record in generate(count):
+        # Mirrors the old route: text arrives fresh from the form, labels too
+        entry = {key: "".join(value) if isinstance(value, str) else value for key, value in record.items()}
+        entry["id"] = len(concerns) + 1
+        concerns.append(entry)
+    return concerns
+
+
+def build_columnar(count: int):
+    store = create_concern_store()
+    for record in generate(count):
+        store.append(record)
+    return store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    dict_bytes = measure(lambda: build_dicts(args.records))
+    columnar_bytes = measure(lambda: build_columnar(args.records))
+
+    print(f"Records:          {args.records:,}")
+    print(f"list of dicts:    {dict_bytes / args.records:8.1f} bytes/record")
+    print(f"columnar store:   {columnar_bytes / args.records:8.1f} bytes/record")
+    print(f"reduction:        {dict_bytes / max(columnar_bytes, 1):8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
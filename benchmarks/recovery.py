@@ -0,0 +1,139 @@
+"""
+Persistence benchmark: write-ahead log throughput, snapshot cost and recovery time
+
+Concurrent writers store feedback, concerns and concern status changes and
+wait for each to be logged, as the routes do. The state is then recovered
+twice into fresh stores: from the log alone, and from a snapshot plus a
+log tail.
+
+    python -m benchmarks.recovery --records 1000000
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from app.chat_store import ChatHistoryStore
+from app.persistence import SNAPSHOT_NAME, Persistence
+from app.records import CATEGORIES, PRIORITIES, SENTIMENTS, create_concern_store, create_feedback_store
+from app.sessions import MemorySessionStore
+from app.workflow import ConcernWorkflow
+
+WORDS = ("road water light garbage drain bus hospital school pension ration tax bill power meter "
+         "queue delay portal refund noise park tree dust smoke signal parking bridge").split()
+
+
+def create_state() -> SimpleNamespace:
+    concerns = create_concern_store()
+    return SimpleNamespace(
+        feedback_data=create_feedback_store(),
+        concerns=concerns,
+        workflow=ConcernWorkflow(concerns),
+        chat_history=ChatHistoryStore(spill_dir=None),
+        sessions=MemorySessionStore(ttl=3600, max_size=1000)
+    )
+
+
+async def write(persistence: Persistence, records: int, writers: int, seed: int):
+    state = persistence.state
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    remaining = [records]
+
+    async def writer():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            timestamp = (start + timedelta(seconds=remaining[0])).isoformat()
+            kind = rng.random()
+            if kind < 0.5:
+                entry = state.feedback_data.append({
+                    "text": " ".join(rng.choices(WORDS, k=rng.randint(5, 20))),
+                    "sentiment": rng.choice(SENTIMENTS),
+                    "timestamp": timestamp
+                })
+                await persistence.log("feedback", entry)
+            elif kind < 0.9 or not state.concerns:
+                entry = state.concerns.append({
+                    "title": " ".join(rng.choices(WORDS, k=4)),
+                    "description": " ".join(rng.choices(WORDS, k=rng.randint(10, 30))),
+                    "category": rng.choice(CATEGORIES),
+                    "priority": rng.choice(PRIORITIES),
+                    "sentiment": rng.choice(SENTIMENTS),
+                    "status": "Open",
+                    "timestamp": timestamp
+                })
+                await persistence.log("concern", entry)
+            else:
+                concern_id = rng.randint(1, len(state.concerns))
+                if state.concerns.value(concern_id, "status") == "Open":
+                    event = state.workflow.transition(concern_id, "In Progress", "admin")
+                    await persistence.log("concern_status", event)
+
+    await asyncio.gather(*(writer() for _ in range(writers)))
+
+
+def recover(directory: str) -> Persistence:
+    persistence = Persistence(directory, create_state())
+    persistence.recover()
+    return persistence
+
+
+def fingerprint(state):
+    return (
+        len(state.feedback_data), len(state.concerns), len(state.workflow.events),
+        state.concerns.columns["status"].tobytes(), bytes(state.feedback_data.arena.data)
+    )
+
+
+async def run(args, directory: str):
+    persistence = Persistence(directory, create_state(), commit_delay_ms=args.commit_delay_ms)
+    persistence.recover()
+    flusher = asyncio.create_task(persistence.wal.run())
+
+    started = time.perf_counter()
+    await write(persistence, args.records, args.writers, seed=1)
+    seconds = time.perf_counter() - started
+    wal = persistence.wal.stats()
+    print(f"Logged {wal['records']} mutations with {args.writers} writers in {seconds:.1f}s "
+          f"({wal['records'] / seconds:,.0f}/s, {wal['records_per_commit']} records per fsync, "
+          f"{wal['bytes'] / 2 ** 20:.0f} MiB)")
+
+    started = time.perf_counter()
+    recovered = await asyncio.to_thread(recover, directory)
+    print(f"Recovery from the log alone: {time.perf_counter() - started:.2f}s")
+    assert fingerprint(recovered.state) == fingerprint(persistence.state)
+
+    started = time.perf_counter()
+    await persistence.snapshot()
+    size = os.path.getsize(os.path.join(directory, SNAPSHOT_NAME))
+    print(f"Snapshot: {time.perf_counter() - started:.2f}s, {size / 2 ** 20:.0f} MiB")
+
+    tail = args.records // 10
+    await write(persistence, tail, args.writers, seed=2)
+    await persistence.wal.sync()
+    started = time.perf_counter()
+    recovered = await asyncio.to_thread(recover, directory)
+    print(f"Recovery from snapshot + {tail} log records: {time.perf_counter() - started:.2f}s "
+          f"(snapshot load {recovered.recovery['snapshot_seconds']}s)")
+    assert fingerprint(recovered.state) == fingerprint(persistence.state)
+    flusher.cancel()
+    persistence.wal.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--records", type=int, default=200000)
+    parser.add_argument("--writers", type=int, default=64, help="concurrent requests waiting on the log")
+    parser.add_argument("--commit-delay-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(args, directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+"""
+Remote model benchmark: pooled HTTP client against a stub OpenAI-compatible server
+
+Starts a local stub model server (``/v1/models`` and streaming or
+non-streaming ``/v1/chat/completions`` with a per-token delay) and sends
+concurrent chat questions through RemoteGraniteModel. Reports throughput,
+latency and time to first token, the number of TCP connections the server
+saw (keep-alive reuse), retries of injected 503s and dropped connections,
+early stream cut-off of off-track answers, and the circuit breaker opening
+when the server goes away and closing when it returns.
+
+    python -m benchmarks.remote_model --requests 2000 --concurrency 64
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import time
+
+import uvicorn
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from app.ai_model import CITIZEN_PROMPT
+from app.remote_model import RemoteGraniteModel
+
+ANSWER = (
+    "SUMMARY: Apply online or at the nearest service centre. STEP-BY-STEP PROCEDURE: fill the form, attach the "
+    "required documents, pay the fee of ₹100 and collect the receipt. REQUIRED DOCUMENTS: identity proof, address "
+    "proof and two photographs. PROCESSING TIME & FEES: 15-30 days, ₹100. CONTACT INFORMATION: visit the official "
+    "website or call the helpline; the local office can also help with the procedure."
+)
+OFF_TRACK = "As an AI language model I cannot provide official details, " + "please consult the office. " * 20
+
+QUESTIONS = [
+    "How do I apply for a PAN card?",
+    "What documents are needed for a passport?",
+    "How long does a ration card take?",
+    "Tell me about the Ayushman Bharat scheme eligibility",
+]
+
+
+class StubServer:
+    """OpenAI-compatible model server stand-in with injectable failures"""
+
+    def __init__(self, token_delay: float, failure_rate: float, drop_rate: float):
+        self.token_delay = token_delay
+        self.failure_rate = failure_rate
+        self.drop_rate = drop_rate
+        self.connections = set()
+        self.requests = 0
+        self.cancelled = 0
+        self.rng = random.Random(7)
+        self.app = Starlette(routes=[
+            Route("/v1/models", self.models),
+            Route("/v1/chat/completions", self.completions, methods=["POST"]),
+        ])
+
+    async def models(self, request: Request):
+        return JSONResponse({"object": "list", "data": [{"id": "stub"}]})
+
+    async def completions(self, request: Request):
+        self.connections.add(request.scope["client"])
+        self.requests += 1
+        body = await request.json()
+        if self.rng.random() < self.failure_rate:
+            return Response(status_code=503)
+        if self.rng.random() < self.drop_rate:
+            # Short body: the server closes the connection mid-response, as a dropped keep-alive connection does
+            return Response(status_code=200, headers={"content-length": "10", "connection": "close"})
+        prompt = body["messages"][-1]["content"]
+        if "Classification" in prompt:
+            text = "POSITIVE"
+        elif "off track" in prompt:
+            text = OFF_TRACK
+        else:
+            text = ANSWER
+        tokens = text.split(" ")
+        if not body.get("stream"):
+            await asyncio.sleep(self.token_delay * len(tokens))
+            return JSONResponse({
+                "choices": [{"message": {"role": "assistant", "content": text}}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(tokens)}
+            })
+
+        async def events():
+            try:
+                for i, token in enumerate(tokens):
+                    await asyncio.sleep(self.token_delay)
+                    delta = token if i == 0 else " " + token
+                    yield f"data: {json.dumps({'choices': [{'delta': {'content': delta}}]})}\n\n"
+                yield "data: [DONE]\n\n"
+            except asyncio.CancelledError:
+                self.cancelled += 1  # client closed the stream: generation stops
+                raise
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+
+async def start(stub: StubServer, port: int) -> uvicorn.Server:
+    server = uvicorn.Server(uvicorn.Config(stub.app, host="127.0.0.1", port=port, log_level="critical"))
+    asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+    return server
+
+
+async def load(model: RemoteGraniteModel, requests: int, concurrency: int, question=None):
+    latencies = []
+    remaining = [requests]
+    rng = random.Random(3)
+
+    async def client():
+        while remaining[0] > 0:
+            remaining[0] -= 1
+            started = time.perf_counter()
+            await model._generate(None, 400, template=CITIZEN_PROMPT, user_text=question or rng.choice(QUESTIONS))
+            latencies.append((time.perf_counter() - started) * 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return time.perf_counter() - started, latencies
+
+
+def report(name: str, seconds: float, latencies, model: RemoteGraniteModel):
+    status = model.remote_status()
+    latencies.sort()
+    print(f"{name:<28} {len(latencies) / seconds:8.0f}/s  p50 {statistics.median(latencies):6.1f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:6.1f} ms  first token {status['avg_first_token_ms']} ms")
+
+
+async def run(args):
+    stub = StubServer(args.token_delay_ms / 1000, 0.0, 0.0)
+    server = await start(stub, args.port)
+    url = f"http://127.0.0.1:{args.port}"
+
+    for stream in (False, True):
+        model = RemoteGraniteModel(url, max_connections=args.concurrency, stream=stream, health_interval=0.5)
+        await model.load_model()
+        stub.connections.clear()
+        seconds, latencies = await load(model, args.requests, args.concurrency)
+        report("streaming" if stream else "non-streaming", seconds, latencies, model)
+        print(f"{'':<28} {len(stub.connections)} TCP connections for {args.requests} requests "
+              f"(HTTP/{model.http_version.split('/')[-1] if model.http_version else '?'})")
+        await model.shutdown()
+
+    model = RemoteGraniteModel(url, max_connections=args.concurrency, health_interval=0.5)
+    await model.load_model()
+    stub.failure_rate, stub.drop_rate = 0.1, 0.05
+    seconds, latencies = await load(model, args.requests // 2, args.concurrency)
+    status = model.remote_status()
+    report("10% 503s + 5% dropped", seconds, latencies, model)
+    print(f"{'':<28} {status['retries']} retries, {status['failures']} requests fell back, "
+          f"breaker {status['breaker']}")
+    stub.failure_rate = stub.drop_rate = 0.0
+
+    cancelled = stub.cancelled
+    generated = model.generation_stats["tokens_generated"]
+    await load(model, 20, 4, question="off track")
+    print(f"{'off-track answers':<28} {model.generation_stats['aborted_early']} cut off, "
+          f"{stub.cancelled - cancelled} streams stopped on the server, "
+          f"{(model.generation_stats['tokens_generated'] - generated) / 20:.0f} of {len(OFF_TRACK.split())} tokens each")
+
+    server.should_exit = True
+    await asyncio.sleep(0.2)
+    seconds, latencies = await load(model, 200, 16)
+    report("server down", seconds, latencies, model)
+    print(f"{'':<28} breaker {model.breaker.state} after {model.remote_status()['failures']} failures, "
+          f"{model.remote_status()['short_circuited']} requests short-circuited")
+    server = await start(stub, args.port)
+    await asyncio.sleep(1.0)
+    print(f"{'server back':<28} breaker {model.breaker.state}, model flag {'set' if model.model else 'cleared'}")
+    await model.shutdown()
+    server.should_exit = True
+    await asyncio.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--token-delay-ms", type=float, default=1.0, help="stub generation time per token")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
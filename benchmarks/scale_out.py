@@ -0,0 +1,230 @@
+"""
+Scale-out benchmark: non-LLM route throughput with 1, 2, 4, ... web workers sharing state
+
+For each worker count, starts ``uvicorn app.main:app --workers N`` with
+shared state and SQLite sessions in a temporary directory and the model
+disabled, seeds concerns, then drives a mix of non-LLM requests (concern
+listings and lookups, chat history, the home page and feedback submissions
+answered by keyword sentiment) from several load-generator processes over
+keep-alive connections. Reports requests/s, latency and scaling efficiency
+against one worker, how the requests spread over the workers (from the
+aggregated metrics, read with one admin login that every worker accepts),
+and checks that concerns submitted through any worker are listed by all
+of them.
+
+Throughput only scales while there are free cores for the extra workers
+and for the load generators; the core count is printed with the results.
+
+    python -m benchmarks.scale_out --workers 1 2 4 --clients 4 --seconds 10
+"""
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+# (weight, method, path): mostly reads, as on the public pages, plus some writes
+MIX = [
+    (30, "GET", "/concern/list?status=Open"),
+    (25, "GET", "/concern/{id}"),
+    (20, "GET", "/chat/history"),
+    (15, "GET", "/"),
+    (10, "POST", "/feedback/submit"),
+]
+
+FEEDBACK = ["The new bus route is very helpful", "Water supply has been poor this week", "Quick passport service"]
+
+
+def server_environment(directory: str, heartbeat: float):
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.getcwd(),
+        CITIZEN_AI_MODEL_ENABLED="0",
+        CITIZEN_AI_SHARED_STATE_DB=os.path.join(directory, "state.db"),
+        CITIZEN_AI_SHARED_HEARTBEAT_INTERVAL=str(heartbeat),
+        CITIZEN_AI_SESSION_BACKEND="sqlite",
+        CITIZEN_AI_SESSION_DB=os.path.join(directory, "sessions.db"),
+        CITIZEN_AI_TEMPLATE_CACHE_DIR=os.path.join(directory, "templates"),
+        CITIZEN_AI_SEARCH_INDEX="",
+        CITIZEN_AI_CHAT_DIR="",
+        CITIZEN_AI_PERSISTENCE_DIR="",
+        CITIZEN_AI_EXPORT_INTERVAL="0",
+        CITIZEN_AI_ANSWER_REFRESH_INTERVAL="0",
+        CITIZEN_AI_KNOWLEDGE_RELOAD_INTERVAL="0",
+        CITIZEN_AI_CLIENT_BURST="1000000000",
+        CITIZEN_AI_CLIENT_PER_MINUTE="1000000000"
+    )
+    return env
+
+
+def start_server(workers: int, port: int, directory: str, heartbeat: float) -> subprocess.Popen:
+    log = open(os.path.join(directory, "server.log"), "wb")
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        env=server_environment(directory, heartbeat),
+        stdout=log,
+        stderr=subprocess.STDOUT
+    )
+
+
+def wait_for_workers(client: httpx.Client, workers: int, timeout: float = 120.0):
+    """Wait until every worker has published a heartbeat"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if client.get("/dashboard/analytics").json()["cluster"]["live_workers"] >= workers:
+                return
+        except (httpx.HTTPError, ValueError, KeyError):
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"{workers} workers did not come up within {timeout:.0f}s")
+
+
+def login(base_url: str) -> httpx.Client:
+    """Admin client; the session lives in the shared session store, so every worker accepts it"""
+    deadline = time.monotonic() + 120
+    while True:
+        try:
+            client = httpx.Client(base_url=base_url, timeout=30)
+            client.post("/auth/login", data={"username": "admin", "password": "admin123"})
+            if "session_id" in client.cookies:
+                return client
+        except httpx.HTTPError:
+            if time.monotonic() > deadline:
+                raise
+        time.sleep(0.2)
+
+
+def generate_load(base_url: str, concurrency: int, seconds: float, concern_count: int, seed: int, results):
+    """One load-generator process: ``concurrency`` keep-alive connections for ``seconds``"""
+    rng = random.Random(seed)
+    weights = [weight for weight, _, _ in MIX]
+
+    async def run():
+        latencies = []
+        errors = 0
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+            deadline = time.perf_counter() + seconds
+
+            async def worker():
+                nonlocal errors
+                while time.perf_counter() < deadline:
+                    _, method, path = rng.choices(MIX, weights)[0]
+                    started = time.perf_counter()
+                    try:
+                        if method == "POST":
+                            response = await client.post(path, data={"feedback_text": rng.choice(FEEDBACK)})
+                        else:
+                            response = await client.get(path.format(id=rng.randint(1, concern_count)))
+                        if response.status_code >= 400:
+                            errors += 1
+                    except httpx.HTTPError:
+                        errors += 1
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+            await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return latencies, errors
+
+    results.put(asyncio.run(run()))
+
+
+def seed_concerns(client: httpx.Client, count: int):
+    for i in range(count):
+        client.post("/concern/submit", data={
+            "title": f"Streetlight {i} not working",
+            "description": f"The streetlight near house number {i} has been off for {i % 7 + 1} days",
+            "category": "Infrastructure",
+            "priority": "Medium"
+        })
+
+
+def check_consistency(base_url: str, expected: int, reads: int) -> int:
+    """Listings on fresh connections (any worker) that do not show every concern"""
+    stale = 0
+    for _ in range(reads):
+        with httpx.Client(base_url=base_url, timeout=30) as client:
+            if len(client.get("/concern/list").json()["concerns"]) != expected:
+                stale += 1
+    return stale
+
+
+def measure(args, workers: int) -> float:
+    base_url = f"http://127.0.0.1:{args.port}"
+    with tempfile.TemporaryDirectory() as directory:
+        server = start_server(workers, args.port, directory, args.heartbeat)
+        try:
+            admin = login(base_url)
+            wait_for_workers(admin, workers)
+            seed_concerns(admin, args.concerns)
+
+            results = multiprocessing.Queue()
+            generators = [
+                multiprocessing.Process(
+                    target=generate_load,
+                    args=(base_url, args.concurrency, args.seconds, args.concerns, seed, results)
+                )
+                for seed in range(args.clients)
+            ]
+            started = time.perf_counter()
+            for generator in generators:
+                generator.start()
+            outcomes = [results.get() for _ in generators]
+            elapsed = time.perf_counter() - started
+            for generator in generators:
+                generator.join()
+
+            latencies = sorted(latency for outcome, _ in outcomes for latency in outcome)
+            errors = sum(errors for _, errors in outcomes)
+            throughput = len(latencies) / elapsed
+
+            # Writes through random workers, then reads through random workers
+            with httpx.Client(base_url=base_url, timeout=30) as client:
+                seed_concerns(client, 20)
+            stale = check_consistency(base_url, args.concerns + 20, 50)
+
+            time.sleep(args.heartbeat * 2)  # let every worker publish its final counters
+            cluster = admin.get("/dashboard/analytics").json()["cluster"]
+            spread = sorted(worker["shared"]["requests"] for worker in cluster["workers"])
+            admin.close()
+        finally:
+            server.terminate()
+            server.wait(timeout=60)
+
+    print(f"{workers:>3} workers  {throughput:8.0f} req/s  p50 {statistics.median(latencies):6.1f} ms  "
+          f"p99 {latencies[int(len(latencies) * 0.99) - 1]:6.1f} ms  errors {errors}  "
+          f"stale reads {stale}/50  requests per worker {spread}")
+    return throughput
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=4, help="load-generator processes")
+    parser.add_argument("--concurrency", type=int, default=16, help="connections per load generator")
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--concerns", type=int, default=200, help="concerns seeded before measuring")
+    parser.add_argument("--heartbeat", type=float, default=0.5)
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} cores, {args.clients} load generators x {args.concurrency} connections, "
+          f"{args.seconds:.0f}s per run")
+    baseline = None
+    for workers in args.workers:
+        throughput = measure(args, workers)
+        baseline = baseline or throughput / workers
+        print(f"{'':<13}scaling efficiency {throughput / (baseline * workers):.0%} of linear")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Search benchmark: index build time, size on disk, load time and query latency
+
+Fills the concern, feedback and chat stores with synthetic civic text
+(Zipf-distributed vocabulary plus ward numbers and street names), indexes
+everything, then times a mix of term, multi-term, phrase, prefix and
+filtered queries.
+
+    python -m benchmarks.search_index --documents 1000000 --queries 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.chat_store import ChatHistoryStore
+from app.records import CATEGORIES, PRIORITIES, SENTIMENTS, create_concern_store, create_feedback_store
+from app.search import SearchIndex
+
+WORDS = (
+    "road pothole street light water supply garbage collection drain sewage overflow park tree "
+    "bus stop route timing ticket hospital doctor medicine clinic school teacher fees admission "
+    "pension ration card license permit certificate birth death property tax bill electricity "
+    "power outage meter connection complaint office staff queue delay website portal payment "
+    "refund application form document verification police noise traffic signal parking footpath "
+    "encroachment stray dogs mosquito fogging flooding rain waterlogging bridge repair construction "
+    "dust pollution smoke burning market vendor toilet public cleanliness library hours playground "
+    "ward councillor officer response helpline service slow rude helpful quick excellent poor "
+    "broken damaged leaking blocked dirty unsafe dark dangerous missing pending rejected approved"
+).split()
+STREETS = ["Main", "Station", "Market", "Temple", "Lake", "Gandhi", "Nehru", "Park", "Church", "Mill"]
+ZIPF = list(__import__("itertools").accumulate(1 / rank for rank in range(1, len(WORDS) + 1)))
+QUESTIONS = ["How do I apply for a {}?", "What documents are needed for {}?", "Status of my {} application",
+             "Where can I pay {}?", "Who handles {} complaints?"]
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    picked = rng.choices(WORDS, cum_weights=ZIPF, k=words)
+    if rng.random() < 0.5:
+        picked.insert(rng.randrange(len(picked) + 1), f"near {rng.choice(STREETS)} Road ward {rng.randint(1, 400)}")
+    return " ".join(picked)
+
+
+def fill(documents: int, seed: int = 7):
+    rng = random.Random(seed)
+    concerns, feedback = create_concern_store(), create_feedback_store()
+    chats = ChatHistoryStore(hot_size=1000, segment_size=1000, spill_dir=None)
+    index = SearchIndex(concerns, feedback, chats)
+    start = datetime(2024, 1, 1)
+    for i in range(documents):
+        timestamp = (start + timedelta(seconds=i * 30)).isoformat()
+        kind = rng.random()
+        if kind < 0.4:
+            index.add_concern(concerns.append({
+                "title": sentence(rng, 4).capitalize(),
+                "description": sentence(rng, rng.randint(10, 30)),
+                "category": rng.choice(CATEGORIES),
+                "priority": rng.choice(PRIORITIES),
+                "sentiment": rng.choice(SENTIMENTS),
+                "status": rng.choice(("Open", "Open", "In Progress", "Resolved")),
+                "timestamp": timestamp
+            }))
+        elif kind < 0.8:
+            index.add_feedback(feedback.append({
+                "text": sentence(rng, rng.randint(5, 25)),
+                "sentiment": rng.choice(SENTIMENTS),
+                "timestamp": timestamp
+            }))
+        else:
+            question = rng.choice(QUESTIONS).format(" ".join(rng.sample(WORDS[:60], 2)))
+            index.add_chat(chats.append(question, "See the portal.", timestamp))
+    return index
+
+
+QUERIES = [
+    ("term", {"query": "pothole"}),
+    ("common term", {"query": "road"}),
+    ("two terms", {"query": "water leaking"}),
+    ("three terms", {"query": "street light broken"}),
+    ("phrase", {"query": '"Station Road"'}),
+    ("phrase + term", {"query": '"Station Road" drain'}),
+    ("prefix", {"query": "pollut*"}),
+    ("prefix + term", {"query": "garb* ward"}),
+    ("filtered", {"query": "water", "kinds": ("concern",), "fields": {"status": "Open", "category": "Infrastructure"}}),
+    ("date range", {"query": "pension", "start": datetime(2024, 1, 10), "end": datetime(2024, 1, 20)}),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--documents", type=int, default=200000)
+    parser.add_argument("--queries", type=int, default=100, help="repetitions of each query")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    index = fill(args.documents)
+    print(f"Indexed {index.count} documents, {len(index.terms)} terms in {time.perf_counter() - started:.1f}s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "search.idx")
+        started = time.perf_counter()
+        index.save(path)
+        print(f"Saved {os.path.getsize(path) / 2 ** 20:.1f} MiB in {time.perf_counter() - started:.2f}s")
+        started = time.perf_counter()
+        loaded = SearchIndex.load(path, index.concerns, index.feedback, index.chat_history)
+        print(f"Loaded in {time.perf_counter() - started:.2f}s")
+        assert loaded.search("water leaking") == index.search("water leaking")
+
+    print(f"\n{'Query':<16} {'hits':>5} {'first ms':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, params in QUERIES:
+        # The first query on a term also puts its postings in impact order
+        started = time.perf_counter()
+        index.search(limit=20, **params)
+        first = (time.perf_counter() - started) * 1000
+        timings = []
+        for _ in range(args.queries):
+            started = time.perf_counter()
+            hits = index.search(limit=20, **params)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        print(f"{name:<16} {len(hits):>5} {first:9.2f} {statistics.median(timings):8.2f} {p99:8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Prompt tokenization benchmark: per-request tokenize time before/after
+
+Compares tokenizing the full rendered prompt (the old path) with splicing
+pre-tokenized template ids around the user text, for both a cold and a warm
+user-text cache. Needs the Granite tokenizer (downloaded on first run).
+
+    python -m benchmarks.tokenize_prompts --requests 2000
+"""
+
+import argparse
+import random
+import time
+
+from transformers import AutoTokenizer
+
+from app.ai_model import CITIZEN_PROMPT, MAX_PROMPT_TOKENS, SENTIMENT_PROMPT, GraniteModel, load_ml_libraries
+
+QUERIES = [
+    "How to apply for PAN card?",
+    "Documents needed for Ayushman Bharat?",
+    "Voter ID address change process",
+    "File grievance against government department",
+    "What is the fee for passport renewal under tatkal?",
+    "How do I add my daughter's name to our ration card?",
+]
+
+
+def timed(fn, items) -> float:
+    start = time.perf_counter()
+    for item in items:
+        fn(item)
+    return (time.perf_counter() - start) / len(items) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    load_ml_libraries()
+    model = GraniteModel()
+    model.tokenizer = AutoTokenizer.from_pretrained(model.model_name, trust_remote_code=True)
+    model.device = "cpu"
+
+    rng = random.Random(0)
+    repeated = [rng.choice(QUERIES) for _ in range(args.requests)]
+    unique = [f"{rng.choice(QUERIES)} (ref {i})" for i in range(args.requests)]
+
+    def full_prompt(query):
+        model.tokenizer(CITIZEN_PROMPT.render(query), return_tensors="pt",
+                        truncation=True, max_length=MAX_PROMPT_TOKENS, padding=False)
+
+    def spliced(query):
+        model._encode_template(CITIZEN_PROMPT, query)
+
+    CITIZEN_PROMPT.compile(model.tokenizer)
+    SENTIMENT_PROMPT.compile(model.tokenizer)
+
+    # Check the splice produces the same ids as tokenizing the whole prompt
+    mismatches = sum(
+        model.tokenizer(CITIZEN_PROMPT.render(q))["input_ids"] != model._encode_template(CITIZEN_PROMPT, q)["input_ids"][0].tolist()
+        for q in QUERIES
+    )
+
+    baseline = timed(full_prompt, repeated)
+    model._encode_user_text_cached.cache_clear()
+    cold = timed(spliced, unique)
+    warm = timed(spliced, repeated)
+
+    print(f"Requests:                    {args.requests}")
+    print(f"Full prompt tokenization:    {baseline:8.1f} us/request")
+    print(f"Template splice, cache miss: {cold:8.1f} us/request")
+    print(f"Template splice, cache hit:  {warm:8.1f} us/request")
+    print(f"Splice/full id mismatches:   {mismatches}/{len(QUERIES)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+Triage benchmark: concerns/s classified on CPU and agreement with the true labels
+
+Generates synthetic concerns whose words depend on a true category and
+urgency; the citizen-chosen labels the model learns from are wrong for a
+share of them (``--label-noise``). Concerns are triaged in micro-batches
+through ``asyncio.to_thread`` as in the app, for several batch sizes.
+
+    python -m benchmarks.triage --concerns 100000
+"""
+
+import argparse
+import asyncio
+import random
+import time
+from datetime import datetime, timedelta
+
+from app.records import CATEGORIES, PRIORITIES, create_concern_store
+from app.triage import TriagePipeline
+
+VOCABULARY = {
+    "Infrastructure": "road potholes cracked bridge footpath streetlight drainage manhole sewer pipeline repairs",
+    "Public Services": "water tap supply electricity transformer garbage bins ration certificate meter billing",
+    "Healthcare": "hospital doctors clinic medicines ambulance ward nurses vaccine dispensary patients",
+    "Education": "school teachers college students fees admission exams classrooms textbooks midday meal",
+    "Transportation": "bus depot train route timings tickets traffic signals parking autorickshaw conductor",
+    "Environment": "pollution smoke dust noise trees park waste burning dumping lake sewage smell",
+    "Safety": "theft police harassment chain snatching unsafe dark lane assault drunk gang",
+    "Administrative": "application pending bribe officials staff rude portal documents verification queue",
+    "Other": "general question suggestion information request enquiry clarification"
+}
+URGENT = {
+    "Low": "whenever possible minor suggestion",
+    "Medium": "since last week not working",
+    "High": "urgent for days blocked overflowing",
+    "Critical": "emergency injured fire danger collapse accident"
+}
+FILLER = "please kindly the area near our colony residents facing issue sir madam local".split()
+
+
+def generate(count: int, noise: float, seed: int = 11):
+    rng = random.Random(seed)
+    words = {category: text.split() for category, text in VOCABULARY.items()}
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        category = rng.choice(CATEGORIES)
+        priority = rng.choices(PRIORITIES, weights=(4, 4, 2, 1))[0]
+        # Category words mixed with another category's, urgency words only sometimes
+        body = rng.sample(words[category], 2) + rng.sample(words[rng.choice(CATEGORIES)], 2) + rng.sample(FILLER, 4)
+        if rng.random() < 0.7:
+            body += rng.sample(URGENT[priority].split(), 2)
+        rng.shuffle(body)
+        yield {
+            "title": " ".join(rng.sample(words[category], 1) + rng.sample(FILLER, 2)).capitalize(),
+            "description": " ".join(body),
+            "category": category if rng.random() > noise else rng.choice(CATEGORIES),
+            "priority": priority if rng.random() > noise else rng.choice(PRIORITIES),
+            "sentiment": "Negative",
+            "status": "Open",
+            "timestamp": (start + timedelta(seconds=i)).isoformat()
+        }, category, priority
+
+
+async def triage_all(pipeline: TriagePipeline) -> float:
+    started = time.perf_counter()
+    while pipeline.pending():
+        await asyncio.to_thread(pipeline.process)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concerns", type=int, default=100000)
+    parser.add_argument("--label-noise", type=float, default=0.2, help="share of citizen labels that are random")
+    args = parser.parse_args()
+
+    concerns = create_concern_store()
+    truth = []
+    for record, category, priority in generate(args.concerns, args.label_noise):
+        concerns.append(record)
+        truth.append((category, priority))
+
+    print(f"{'batch':>6} {'concerns/s':>11} {'category acc':>13} {'priority acc':>13}")
+    for batch_size in (1, 16, 64, 256):
+        pipeline = TriagePipeline(concerns, batch_size=batch_size)
+        seconds = asyncio.run(triage_all(pipeline))
+        # Agreement over the last fifth, once the model has learned from the rest
+        tail = range(len(truth) * 4 // 5, len(truth))
+        category_acc = sum(
+            pipeline.result(i + 1)["suggested_category"] == truth[i][0] for i in tail
+        ) / len(tail)
+        priority_acc = sum(
+            pipeline.result(i + 1)["suggested_priority"] == truth[i][1] for i in tail
+        ) / len(tail)
+        print(f"{batch_size:>6} {args.concerns / seconds:>11.0f} {category_acc:>13.1%} {priority_acc:>13.1%}")
+
+    cited = sum(
+        concerns.value(i + 1, "category") == truth[i][0] for i in range(len(truth))
+    ) / len(truth)
+    print(f"\nCitizen-selected category matches the true category for {cited:.1%} of concerns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,48 @@
+import os
+import tempfile
+from datetime import datetime, timezone
+
+import pytest
+
+from app.records import to_epoch_us
+
+
+def test_to_epoch_us_accepts_aware_timestamps():
+    aware = datetime(2026, 10, 1, 12, 30, tzinfo=timezone.utc)
+    assert to_epoch_us(aware) == to_epoch_us(aware.astimezone().replace(tzinfo=None))
+    assert to_epoch_us("2026-10-01T12:30:00+00:00") == to_epoch_us(aware)
+
+
+@pytest.fixture(scope="module")
+def admin_client():
+    directory = tempfile.mkdtemp()
+    os.environ.update({
+        "CITIZEN_AI_MODEL_ENABLED": "0",
+        "CITIZEN_AI_TEMPLATE_CACHE_DIR": os.path.join(directory, "templates"),
+        "CITIZEN_AI_SEARCH_INDEX": "",
+        "CITIZEN_AI_CHAT_DIR": "",
+        "CITIZEN_AI_PERSISTENCE_DIR": "",
+        "CITIZEN_AI_EXPORT_INTERVAL": "0",
+    })
+    from fastapi.testclient import TestClient
+    from app.main import app
+
+    with TestClient(app) as client:
+        client.post("/auth/login", data={"username": "admin", "password": "admin123"}, follow_redirects=False)
+        yield client
+
+
+def test_search_with_z_suffixed_start(admin_client):
+    admin_client.post("/concern/submit", data={
+        "title": "Pothole on main road",
+        "description": "A deep pothole near the bus stop",
+        "category": "Infrastructure",
+        "priority": "High"
+    })
+    response = admin_client.get("/dashboard/search", params={"q": "pothole", "start": "2020-01-01T00:00:00Z"})
+    assert response.status_code == 200
+    assert [hit["id"] for hit in response.json()["results"]] == [1]
+
+    response = admin_client.get("/dashboard/search", params={"q": "pothole", "start": "2999-01-01T00:00:00Z"})
+    assert response.status_code == 200
+    assert response.json()["results"] == []